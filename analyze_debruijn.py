@@ -2,12 +2,10 @@
 """
 Analyze and complete the De Bruijn graph Excel file
 """
-import pandas as pd
-import openpyxl
+from table_cache import load_table
 
-# Read the Excel file
-file_path = 'debruijn_graph_complete.xlsx'
-df = pd.read_excel(file_path)
+# Read the De Bruijn node table (parsed from the Excel file once, then cached)
+df = load_table('debruijn')
 
 print("Current De Bruijn Graph Data:")
 print("="*80)
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Enumerate the best paths through the contig graph, best first
+
+Paths are generated from contig_graph.txt by a depth-first branch and bound
+search ordered by total length (or k-mer coverage).  An upper bound on how
+much score can still be added after each contig is computed per strongly
+connected component, and a partial path that cannot beat the K-th best path
+found so far is dropped, so the search keeps K paths instead of enumerating
+every path.  Sequences are only built for the paths that are written.
+
+Weakly connected components are searched independently and their paths
+merged by (score, component, rank within component); a component is only
+searched once its bound could reach the output, and --processes runs the
+components in a process pool with the same output.  The table goes to
+best_paths.txt unless --out names another file, so the shipped
+assembled_paths.txt is only replaced when asked for.
+"""
+import argparse
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import instrument
+from compact_unitigs import weak_components
+from count_kmers import encode_kmers
+from sequence_arena import SequenceArena
+
+DEFAULT_K = 6
+
+
+def parse_contig_list(value):
+    """Parse an INCOMING/OUTGOING_CONTIGS cell ('57,58', 57, 57.0 or empty) into ints"""
+    if pd.isna(value) or value == '':
+        return []
+    return [int(float(v)) for v in str(value).split(',') if v.strip()]
+
+
+def load_contig_graph(path='contig_graph.txt'):
+    """Read contig_graph.txt into (successor lists, sequences) indexed by CONTIG_ID"""
+    contig_graph = pd.read_csv(path, sep='\t').sort_values('CONTIG_ID')
+    if not (contig_graph['CONTIG_ID'].to_numpy() == np.arange(len(contig_graph))).all():
+        raise ValueError(f"{path}: CONTIG_ID must run from 0 to {len(contig_graph) - 1}")
+
+    successors = [parse_contig_list(v) for v in contig_graph['OUTGOING_CONTIGS']]
+    sequences = contig_graph['SEQUENCE'].astype(str).tolist()
+    return successors, sequences
+
+
+def strongly_connected_components(successors):
+    """Iterative Tarjan; returns component labels in reverse topological order
+
+    Component 0 is a sink component, and every edge goes from a component to
+    one with an equal or smaller label.
+    """
+    n = len(successors)
+    index = [-1] * n
+    lowlink = [0] * n
+    on_stack = [False] * n
+    component = [-1] * n
+    stack = []
+    counter = 0
+    num_components = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            if child < len(successors[node]):
+                work.append((node, child + 1))
+                nxt = successors[node][child]
+                if index[nxt] == -1:
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    lowlink[node] = min(lowlink[node], index[nxt])
+                continue
+            if lowlink[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = num_components
+                    if member == node:
+                        break
+                num_components += 1
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+    return np.array(component, dtype=np.int64), num_components
+
+
+# Edge relaxations spent on the walk bound of one strongly connected component
+MAX_WALK_WORK = 10**7
+# Partial paths one component's search may extend before it settles for the best found
+DEFAULT_MAX_EXPANSIONS = 10**6
+
+
+def suffix_bounds(successors, weights, max_revisits=0):
+    """Upper bounds on the score a path can still gain after each contig
+
+    Returns (bounds, component, capacity, downstream).  downstream[c] is the
+    best score reachable after leaving component c and capacity[c] the total
+    weight a path can collect inside it (each contig at most max_revisits + 1
+    times).  Inside a cyclic component a path makes at most
+    size * (max_revisits + 1) - 1 more steps before it leaves or ends, so
+    bounds[v] is the best walk of that many steps from v (then leaving),
+    capped by capacity[c] - weights[v] + downstream[c].
+    """
+    component, num_components = strongly_connected_components(successors)
+    weights = np.asarray(weights, dtype=np.float64)
+    visits = max_revisits + 1
+
+    size = np.bincount(component, minlength=num_components)
+    cyclic = size > 1
+    for node, nexts in enumerate(successors):
+        if node in nexts:
+            cyclic[component[node]] = True
+    totals = np.bincount(component, weights=weights, minlength=num_components)
+    capacity = np.where(cyclic, totals * visits, totals)
+
+    members = [[] for _ in range(num_components)]
+    for node in range(len(successors)):
+        members[component[node]].append(node)
+
+    # Components are labelled sinks first, so downstream bounds are ready in order
+    bounds = np.zeros(len(successors))
+    downstream = np.zeros(num_components)
+    for comp in range(num_components):
+        nodes = np.array(members[comp])
+        local = {node: i for i, node in enumerate(members[comp])}
+        leave = np.zeros(len(nodes))
+        inner_src, inner_dst = [], []
+        for i, node in enumerate(members[comp]):
+            for nxt in successors[node]:
+                if component[nxt] != comp:
+                    leave[i] = max(leave[i], weights[nxt] + bounds[nxt])
+                else:
+                    inner_src.append(i)
+                    inner_dst.append(local[nxt])
+        downstream[comp] = leave.max()
+        if not cyclic[comp]:
+            bounds[nodes] = leave
+            continue
+
+        # Best walk of `steps` edges inside the component, leaving it at any point
+        inner_src, inner_dst = np.array(inner_src), np.array(inner_dst)
+        order = np.argsort(inner_src, kind='stable')
+        inner_src, inner_dst = inner_src[order], inner_dst[order]
+        heads = np.flatnonzero(np.concatenate(([True], inner_src[1:] != inner_src[:-1])))
+        local_weights = weights[nodes]
+        max_steps = size[comp] * visits - 1
+        steps = min(max_steps, max(1, MAX_WALK_WORK // len(inner_src)))
+        walk = leave.copy()
+        for _ in range(steps):
+            step = np.maximum.reduceat(local_weights[inner_dst] + walk[inner_dst], heads)
+            walk = leave.copy()
+            walk[inner_src[heads]] = np.maximum(leave[inner_src[heads]], step)
+        # Steps not walked can add at most the heaviest contig each
+        walk += (max_steps - steps) * local_weights.max()
+        bounds[nodes] = np.minimum(walk, capacity[comp] - local_weights + downstream[comp])
+
+    return bounds, component, capacity, downstream
+
+
+def default_starts(successors, component):
+    """Contigs in components that no other component points into"""
+    has_incoming = np.zeros(component.max() + 1 if len(component) else 0, dtype=bool)
+    for node, nexts in enumerate(successors):
+        for nxt in nexts:
+            if component[nxt] != component[node]:
+                has_incoming[component[nxt]] = True
+    return [node for node in range(len(successors)) if not has_incoming[component[node]]]
+
+
+def best_paths(successors, weights, first_weights=None, max_revisits=0, limit=None, starts=None,
+               max_expansions=DEFAULT_MAX_EXPANSIONS):
+    """The best `limit` complete paths as (score, path) pairs, best first, ties in search order
+
+    Returns (paths, proven).
+
+    weights[c] is what contig c adds when it extends a path and
+    first_weights[c] what it scores when it starts one.  A path is complete
+    when it reaches a contig with no successor it may still visit.
+
+    Depth-first branch and bound: successors are tried best bound first, so
+    good paths are found early, and once `limit` paths are known a partial
+    path is dropped when its score plus its bound cannot beat the worst of
+    them.  The bound of a partial path is the smaller of the static suffix
+    bound and what is left unvisited in the current component.  Visit counts
+    are kept per contig for the current path, so memory is O(path length +
+    limit).  Without a limit every complete path is enumerated.
+
+    Longest simple paths are NP-hard, and in a large repeat tangle no cheap
+    bound is tight enough to prove the best paths.  After max_expansions
+    partial paths (None or 0 = no cap) the search stops with the best paths
+    found so far and proven is False.
+    """
+    if first_weights is None:
+        first_weights = weights
+    bounds, component, capacity, downstream = suffix_bounds(successors, weights, max_revisits)
+    if starts is None:
+        starts = default_starts(successors, component)
+    max_visits = max_revisits + 1
+
+    weights = np.asarray(weights, dtype=np.float64).tolist()
+    first_weights = np.asarray(first_weights, dtype=np.float64).tolist()
+    priority = [w + b for w, b in zip(weights, bounds.tolist())]
+    ordered = [sorted(nexts, key=lambda c: -priority[c]) for nexts in successors]
+    bounds = bounds.tolist()
+    component = component.tolist()
+    downstream = downstream.tolist()
+    remaining = capacity.tolist()
+    visits = [0] * len(successors)
+
+    # Min-heap of (score, -serial, path): the worst kept path is on top
+    found = []
+    serial = 0
+    expanded = 0
+
+    def bound(contig):
+        comp = component[contig]
+        return min(bounds[contig], remaining[comp] + downstream[comp])
+
+    def cannot_win(score, contig):
+        return limit is not None and len(found) >= limit and score + bound(contig) <= found[0][0]
+
+    proven = True
+    try:
+        for start in starts:
+            if not proven:
+                break
+            score = first_weights[start]
+            visits[start] += 1
+            remaining[component[start]] -= weights[start]
+            if cannot_win(score, start):
+                visits[start] -= 1
+                remaining[component[start]] += weights[start]
+                continue
+            path, scores, child = [start], [score], [0]
+            complete = [not any(visits[c] < max_visits for c in ordered[start])]
+
+            while path:
+                node = path[-1]
+                if complete[-1]:
+                    serial += 1
+                    entry = (scores[-1], -serial, path[:])
+                    if limit is None or len(found) < limit:
+                        heapq.heappush(found, entry)
+                    else:
+                        heapq.heappushpop(found, entry)
+                    complete[-1] = False
+                    child[-1] = len(ordered[node])
+
+                nexts = ordered[node]
+                i = child[-1]
+                while i < len(nexts) and visits[nexts[i]] >= max_visits:
+                    i += 1
+                if i == len(nexts):
+                    # Done with this contig: backtrack
+                    path.pop()
+                    scores.pop()
+                    child.pop()
+                    complete.pop()
+                    visits[node] -= 1
+                    remaining[component[node]] += weights[node]
+                    continue
+
+                child[-1] = i + 1
+                nxt = nexts[i]
+                score = scores[-1] + weights[nxt]
+                visits[nxt] += 1
+                remaining[component[nxt]] -= weights[nxt]
+                if cannot_win(score, nxt):
+                    visits[nxt] -= 1
+                    remaining[component[nxt]] += weights[nxt]
+                    continue
+                if max_expansions and expanded >= max_expansions:
+                    proven = False
+                    break
+                expanded += 1
+                path.append(nxt)
+                scores.append(score)
+                child.append(0)
+                complete.append(not any(visits[c] < max_visits for c in ordered[nxt]))
+    finally:
+        instrument.count('paths_expanded', expanded)
+        instrument.count('paths_completed', serial)
+
+    paths = [(score, path) for score, _, path in sorted(found, key=lambda e: (-e[0], -e[1]))]
+    return paths, proven
+
+
+def contig_components(successors):
+    """Contig index lists of each weakly connected component, ordered by smallest contig"""
+    sources = [node for node, nexts in enumerate(successors) for _ in nexts]
+    targets = [nxt for nexts in successors for nxt in nexts]
+    labels = weak_components(len(successors), sources, targets)
+    order = np.argsort(labels, kind='stable')
+    starts = np.flatnonzero(np.concatenate(([True], labels[order][1:] != labels[order][:-1])))
+    return [members.tolist() for members in np.split(order, starts[1:])] if len(order) else []
+
+
+def component_graph(successors, weights, first_weights, members):
+    """Successor lists and weights of one component, renumbered from 0"""
+    local = {contig: i for i, contig in enumerate(members)}
+    return ([[local[nxt] for nxt in successors[contig]] for contig in members],
+            np.asarray(weights)[members], np.asarray(first_weights)[members])
+
+
+def component_paths(successors, weights, first_weights, max_revisits, limit, max_expansions):
+    """Worker task: best_paths() of one component, in local contig numbering"""
+    return best_paths(successors, weights, first_weights, max_revisits, limit, max_expansions=max_expansions)
+
+
+def component_bounds(successors, weights, first_weights, max_revisits, components):
+    """Upper bound on the best path score of each component"""
+    bounds, component, _, _ = suffix_bounds(successors, weights, max_revisits)
+    best = np.full(len(components), -np.inf)
+    first_weights = np.asarray(first_weights, dtype=np.float64)
+    label = np.empty(len(successors), dtype=np.int64)
+    for comp, members in enumerate(components):
+        label[members] = comp
+    for start in default_starts(successors, component):
+        best[label[start]] = max(best[label[start]], first_weights[start] + bounds[start])
+    return best
+
+
+def iter_paths_by_component(successors, weights, first_weights=None, max_revisits=0, processes=1, top_k=None,
+                            max_expansions=DEFAULT_MAX_EXPANSIONS, unproven=None):
+    """Yield (score, path) over all components, best first, ties by component then rank
+
+    A component is only searched once its score bound could beat the next
+    path of the components already searched, so the paths of easy components
+    come out without waiting for hard ones whose bound is lower.  With
+    processes > 1 the components are searched in a process pool, highest
+    bound first; the stream is the same as the serial one.  Components whose
+    search hit max_expansions are appended to the `unproven` list, if given.
+    """
+    if first_weights is None:
+        first_weights = weights
+    components = contig_components(successors)
+    subgraphs = [component_graph(successors, weights, first_weights, members) for members in components]
+    comp_bounds = component_bounds(successors, weights, first_weights, max_revisits, components)
+
+    if processes == 1:
+        def search(comp):
+            return best_paths(*subgraphs[comp], max_revisits=max_revisits, limit=top_k,
+                              max_expansions=max_expansions)
+        pool = None
+    else:
+        if top_k is None:
+            raise ValueError("top_k is required when searching components in parallel")
+        pool = ProcessPoolExecutor(max_workers=processes or os.cpu_count() or 1)
+        schedule = sorted(range(len(subgraphs)), key=lambda comp: -comp_bounds[comp])
+        futures = {comp: pool.submit(component_paths, *subgraphs[comp], max_revisits, top_k, max_expansions)
+                   for comp in schedule}
+
+        def search(comp):
+            return futures[comp].result()
+
+    # Heap of (-score, component, rank, path); rank -1 marks a component not searched yet
+    heap = [(-comp_bounds[comp], comp, -1, None) for comp in range(len(components))]
+    heapq.heapify(heap)
+    results = {}
+    try:
+        while heap:
+            neg_score, comp, rank, path = heapq.heappop(heap)
+            if rank < 0:
+                results[comp], proven = search(comp)
+                if not proven and unproven is not None:
+                    unproven.append(comp)
+            else:
+                yield -neg_score, [components[comp][c] for c in path]
+            if rank + 1 < len(results[comp]):
+                score, path = results[comp][rank + 1]
+                heapq.heappush(heap, (-score, comp, rank + 1, path))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def contig_kmer_totals(sequences, edges_path, k=DEFAULT_K):
+    """Sum of graph_edges.txt COUNT over the k-mers of each contig"""
+    edges_df = pd.read_csv(edges_path, sep='\t')
+    codes = encode_kmers(edges_df['KMER'].tolist(), k)
+    order = np.argsort(codes)
+    codes = codes[order]
+    counts = edges_df['COUNT'].to_numpy()[order]
+
+    contig_codes = encode_kmers(sequences, k)
+    pos = np.minimum(np.searchsorted(codes, contig_codes), len(codes) - 1)
+    found = np.where(codes[pos] == contig_codes, counts[pos], 0)
+
+    num_kmers = np.array([max(len(s) - k + 1, 0) for s in sequences])
+    starts = np.concatenate(([0], np.cumsum(num_kmers)[:-1]))
+    totals = np.zeros(len(sequences))
+    nonempty = num_kmers > 0
+    totals[nonempty] = np.add.reduceat(found, starts[nonempty]) if len(found) else 0
+    return totals
+
+
+def path_sequence(path, sequences, k=DEFAULT_K):
+    """Join contig sequences along a path, dropping the k-1 letter overlaps"""
+    return sequences[path[0]] + ''.join(sequences[c][k - 1:] for c in path[1:])
+
+
+def write_paths(out_path, paths, sequences, top_k, k=DEFAULT_K):
+    """Write up to top_k paths to assembled_paths.txt, one row at a time"""
+    written = 0
+    with open(out_path, 'w') as f:
+        f.write('RANK\tLENGTH\tNUM_CONTIGS\tPATH\tSEQUENCE\n')
+        for _, path in paths:
+            if written >= top_k:
+                break
+            sequence = path_sequence(path, sequences, k)
+            written += 1
+            f.write(f"{written}\t{len(sequence)}\t{len(path)}\t{'->'.join(map(str, path))}\t{sequence}\n")
+    instrument.count('paths_written', written)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the top-K paths through the contig graph")
+    parser.add_argument('--contig-graph', default='contig_graph.txt')
+    parser.add_argument('--edges', default='graph_edges.txt', help="Used for --order coverage")
+    parser.add_argument('--out', default='best_paths.txt',
+                        help="Paths table to write (pass assembled_paths.txt to replace the shipped one)")
+    parser.add_argument('--top-k', type=int, default=140)
+    parser.add_argument('--order', choices=['length', 'coverage'], default='length')
+    parser.add_argument('--max-revisits', type=int, default=0,
+                        help="Times a path may return to a contig it already used")
+    parser.add_argument('--arena', help="Also save contigs and paths to this sequence arena file")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Search connected components in parallel (0 = all cores, default: 1)")
+    parser.add_argument('--max-expansions', type=int, default=DEFAULT_MAX_EXPANSIONS,
+                        help="Search budget per component before settling for the best paths found "
+                             "(0 = exhaustive, default: 1000000)")
+    parser.add_argument('-k', type=int, default=DEFAULT_K)
+    args = parser.parse_args()
+
+    successors, sequences = load_contig_graph(args.contig_graph)
+    print(f"Contig graph loaded: {len(sequences)} contigs")
+
+    if args.order == 'length':
+        first_weights = np.array([len(s) for s in sequences], dtype=np.float64)
+        weights = first_weights - (args.k - 1)
+    else:
+        weights = first_weights = contig_kmer_totals(sequences, args.edges, args.k)
+
+    unproven = []
+    with instrument.stage('assemble_paths'):
+        search = iter_paths_by_component(successors, weights, first_weights, max_revisits=args.max_revisits,
+                                         processes=args.processes, top_k=args.top_k,
+                                         max_expansions=args.max_expansions, unproven=unproven)
+        paths = [scored for _, scored in zip(range(args.top_k), search)] if args.arena else search
+        written = write_paths(args.out, paths, sequences, args.top_k, args.k)
+        # Finish the search here so its counters land in this stage
+        search.close()
+    print(f"✓ Wrote {written} paths to {args.out}")
+    if unproven:
+        print(f"⚠ Search budget reached in {len(unproven)} component(s): their paths are the best found, "
+              f"not proven best (raise --max-expansions, 0 = exhaustive)")
+
+    if args.arena:
+        with instrument.stage('export_arena'):
+            arena = SequenceArena.from_sequences(sequences, [path for _, path in paths], args.k)
+            arena.save(args.arena)
+        print(f"✓ Wrote {args.arena} ({arena.nbytes():,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Benchmark the assembly stages on synthetic genomes
+
+Generates a random text with repeat families, samples 30-letter reads from
+it (configurable coverage and substitution error rate) and runs
+
+    count -> graph -> compact -> paths -> verify
+
+at each requested size (number of genome letters, i.e. roughly the number of
+distinct k-mers).  Every stage runs in a fresh process and hands its output
+to the next one through files in a work directory, so wall time and peak RSS
+are measured per stage.  Results go to a JSON file; with --baseline each
+stage is compared against a stored run and regressions are reported (exit
+status 1).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from assemble_paths import iter_paths_by_component, load_contig_graph, write_paths
+from compact_unitigs import contig_tables, find_unitigs
+from count_kmers import DEFAULT_ALPHABET, count_kmers, encode_kmers, max_k
+from debruijn_graph import DeBruijnGraph
+from graph_store import GraphStore, write_store
+
+DEFAULT_SIZES = [10**3, 10**4, 10**5, 10**6]
+DEFAULT_RESULTS = 'benchmark_results.json'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+READ_LENGTH = 30
+CHUNK_READS = 1_000_000
+
+
+def auto_k(size, alphabet=DEFAULT_ALPHABET):
+    """Smallest k >= 6 for which random (k-1)-mers of a genome this long rarely collide"""
+    k = 6
+    while len(alphabet) ** (k - 1) < 100 * size and k < max_k(alphabet):
+        k += 1
+    return k
+
+
+def generate_genome(length, rng, alphabet=DEFAULT_ALPHABET, repeat_fraction=0.1, repeat_length=50,
+                    repeat_families=10):
+    """Random text where repeat_fraction of the letters are copies of a few repeat units"""
+    letters = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)
+    genome = letters[rng.integers(0, len(letters), length)]
+    repeat_length = min(repeat_length, length)
+    copies = int(length * repeat_fraction) // max(repeat_length, 1)
+    if copies and repeat_families:
+        units = letters[rng.integers(0, len(letters), (repeat_families, repeat_length))]
+        positions = rng.integers(0, length - repeat_length + 1, copies)
+        families = rng.integers(0, repeat_families, copies)
+        for position, family in zip(positions.tolist(), families.tolist()):
+            genome[position:position + repeat_length] = units[family]
+    return genome
+
+
+def write_reads(path, genome, rng, coverage=5.0, error_rate=0.0, alphabet=DEFAULT_ALPHABET):
+    """Sample READ_LENGTH-letter reads uniformly, one per line, with substitution errors"""
+    letters = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)
+    num_reads = int(np.ceil(coverage * len(genome) / READ_LENGTH))
+    window = np.arange(READ_LENGTH)
+    with open(path, 'wb') as f:
+        for start in range(0, num_reads, CHUNK_READS):
+            n = min(CHUNK_READS, num_reads - start)
+            reads = genome[rng.integers(0, len(genome) - READ_LENGTH + 1, n)[:, None] + window]
+            errors = rng.random(reads.shape) < error_rate
+            reads[errors] = letters[rng.integers(0, len(letters), int(errors.sum()))]
+            lines = np.empty((n, READ_LENGTH + 1), dtype=np.uint8)
+            lines[:, :READ_LENGTH] = reads
+            lines[:, READ_LENGTH] = ord('\n')
+            f.write(lines.tobytes())
+    return num_reads
+
+
+# Stages: stage(workdir, params) -> (items processed, extra metrics)
+
+def stage_generate(workdir, params):
+    rng = np.random.default_rng(params['seed'])
+    genome = generate_genome(params['size'], rng, repeat_fraction=params['repeat_fraction'],
+                             repeat_length=params['repeat_length'])
+    np.save(os.path.join(workdir, 'genome.npy'), genome)
+    num_reads = write_reads(os.path.join(workdir, 'reads.txt'), genome, rng,
+                            params['coverage'], params['error_rate'])
+    return num_reads * READ_LENGTH, {'reads': num_reads}
+
+
+def stage_count(workdir, params):
+    codes, counts = count_kmers([os.path.join(workdir, 'reads.txt')], k=params['k'], fmt='text')
+    np.save(os.path.join(workdir, 'codes.npy'), codes)
+    np.save(os.path.join(workdir, 'counts.npy'), counts)
+    return int(counts.sum()), {'distinct_kmers': len(codes)}
+
+
+def stage_graph(workdir, params):
+    codes = np.load(os.path.join(workdir, 'codes.npy'))
+    counts = np.load(os.path.join(workdir, 'counts.npy'))
+    graph = DeBruijnGraph(codes, counts, params['k'])
+    write_store(os.path.join(workdir, 'graph.dbg'), graph)
+    return graph.num_edges, {'nodes': graph.num_nodes}
+
+
+def stage_compact(workdir, params):
+    graph = GraphStore(os.path.join(workdir, 'graph.dbg')).graph
+    contigs, contig_graph = contig_tables(find_unitigs(graph))
+    contigs.to_csv(os.path.join(workdir, 'contigs_initial.txt'), sep='\t', index=False)
+    contig_graph.to_csv(os.path.join(workdir, 'contig_graph.txt'), sep='\t', index=False)
+    return graph.num_edges, {'contigs': len(contigs)}
+
+
+def stage_paths(workdir, params):
+    successors, sequences = load_contig_graph(os.path.join(workdir, 'contig_graph.txt'))
+    weights = np.array([len(s) for s in sequences], dtype=np.float64)
+    paths = iter_paths_by_component(successors, weights - (params['k'] - 1), weights, top_k=params['top_k'])
+    written = write_paths(os.path.join(workdir, 'assembled_paths.txt'), paths, sequences,
+                          params['top_k'], params['k'])
+    return len(sequences), {'paths': written}
+
+
+def stage_verify(workdir, params):
+    """Share of contig k-mers found in the genome, and of genome k-mers found in contigs"""
+    k = params['k']
+    genome = np.load(os.path.join(workdir, 'genome.npy')).tobytes().decode('ascii')
+    _, sequences = load_contig_graph(os.path.join(workdir, 'contig_graph.txt'))
+    genome_codes = np.unique(encode_kmers([genome], k))
+    contig_codes = np.unique(encode_kmers(sequences, k))
+    shared = np.isin(contig_codes, genome_codes, assume_unique=True).sum()
+    return len(contig_codes), {
+        'precision': float(shared / max(len(contig_codes), 1)),
+        'recall': float(shared / max(len(genome_codes), 1)),
+    }
+
+
+STAGES = {
+    'generate': stage_generate,
+    'count': stage_count,
+    'graph': stage_graph,
+    'compact': stage_compact,
+    'paths': stage_paths,
+    'verify': stage_verify,
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def stage_worker(name, workdir, params, conn):
+    """Child process: run one stage and send back its timing and memory"""
+    if params.get('memory_limit'):
+        limit = int(params['memory_limit'] * 2**20)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    start_rss = peak_rss_mb()
+    start = time.perf_counter()
+    items, extra = STAGES[name](workdir, params)
+    seconds = time.perf_counter() - start
+    conn.send({'seconds': seconds, 'items': items, 'peak_rss_mb': peak_rss_mb(),
+               'start_rss_mb': start_rss, **extra})
+    conn.close()
+
+
+def run_stage(name, workdir, params, timeout=None):
+    """Run one stage in a fresh process; status is 'ok', 'timeout' or 'failed'"""
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=stage_worker, args=(name, workdir, params, sender))
+    start = time.perf_counter()
+    process.start()
+    sender.close()
+
+    result = None
+    timed_out = False
+    try:
+        if receiver.poll(timeout):
+            result = receiver.recv()
+        else:
+            timed_out = True
+    except EOFError:
+        pass
+    if process.is_alive() and result is None:
+        process.kill()
+    process.join()
+
+    if result is None:
+        return {'status': 'timeout' if timed_out else 'failed', 'seconds': time.perf_counter() - start,
+                'items': 0, 'throughput': None, 'peak_rss_mb': None}
+    result['status'] = 'ok'
+    result['throughput'] = result['items'] / result['seconds'] if result['seconds'] > 0 else None
+    return result
+
+
+# Stages whose output later stages read; if one of these fails the size is abandoned
+REQUIRED = {'generate', 'count', 'graph', 'compact'}
+
+
+def run_benchmark(sizes, params, stages=tuple(STAGES), workdir=None, timeout=None):
+    """Run every stage at every size; returns a list of result rows"""
+    rows = []
+    for size in sizes:
+        run_params = dict(params, size=size, k=params.get('k') or auto_k(size))
+        directory = tempfile.mkdtemp(prefix=f'bench_{size}_', dir=workdir)
+        try:
+            for name in stages:
+                result = run_stage(name, directory, run_params, timeout)
+                rows.append({'size': size, 'stage': name, 'k': run_params['k'], **result})
+                if result['status'] != 'ok':
+                    print(f"  size {size:>11,}  {name:<9} ⚠ {result['status']} after {result['seconds']:.1f}s")
+                    if name in REQUIRED:
+                        break
+                    continue
+                print(f"  size {size:>11,}  {name:<9} {result['seconds']:9.3f}s  "
+                      f"{result['throughput'] or 0:>14,.0f} items/s  {result['peak_rss_mb']:8.1f} MB")
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    return rows
+
+
+def compare(rows, baseline_rows, time_tolerance, memory_tolerance, min_seconds=0.05):
+    """Rows that differ from the baseline: (row, baseline row, time ratio, memory ratio)
+
+    A stage that did not finish ('timeout' or 'failed') in either run is a
+    difference, with infinite ratios.  Otherwise only rows slower or bigger
+    than the baseline beyond the tolerances are returned; slowdowns smaller
+    than min_seconds are ignored, since millisecond stages are mostly timer
+    noise.
+    """
+    baseline = {(row['size'], row['stage']): row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        base = baseline.get((row['size'], row['stage']))
+        if base is None:
+            continue
+        if row['status'] != 'ok' or base.get('status', 'ok') != 'ok':
+            regressions.append((row, base, float('inf'), float('inf')))
+            continue
+        time_ratio = row['seconds'] / base['seconds'] if base['seconds'] > 0 else 1.0
+        memory_ratio = row['peak_rss_mb'] / base['peak_rss_mb'] if base['peak_rss_mb'] > 0 else 1.0
+        slower = time_ratio > 1 + time_tolerance and row['seconds'] - base['seconds'] > min_seconds
+        if slower or memory_ratio > 1 + memory_tolerance:
+            regressions.append((row, base, time_ratio, memory_ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the assembly stages on synthetic genomes")
+    parser.add_argument('--sizes', type=lambda v: [int(float(s)) for s in v.split(',')], default=DEFAULT_SIZES,
+                        help="Comma-separated genome lengths (default: 1e3,1e4,1e5,1e6; up to 1e8)")
+    parser.add_argument('--stages', type=lambda v: v.split(','), default=list(STAGES),
+                        help=f"Comma-separated stages (default: {','.join(STAGES)})")
+    parser.add_argument('--coverage', type=float, default=5.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Per-letter substitution rate")
+    parser.add_argument('--repeat-fraction', type=float, default=0.1)
+    parser.add_argument('--repeat-length', type=int, default=50)
+    parser.add_argument('-k', type=int, help="k-mer length (default: smallest k >= 6 that fits the size)")
+    parser.add_argument('--top-k', type=int, default=140, help="Paths written by the paths stage")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stage-timeout', type=float, default=600,
+                        help="Seconds before a stage is killed and recorded as a timeout (default: 600)")
+    parser.add_argument('--memory-limit', type=float, help="Address-space limit per stage, in MB")
+    parser.add_argument('--workdir', help="Where to put the per-size work directories")
+    parser.add_argument('--out', default=DEFAULT_RESULTS)
+    parser.add_argument('--baseline', help=f"Compare against this results file (e.g. {DEFAULT_BASELINE})")
+    parser.add_argument('--time-tolerance', type=float, default=0.25)
+    parser.add_argument('--memory-tolerance', type=float, default=0.25)
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)}")
+    stages = [name for name in STAGES if name in args.stages]
+    if stages[0] != 'generate':
+        parser.error("the generate stage is required")
+
+    params = {'coverage': args.coverage, 'error_rate': args.error_rate, 'repeat_fraction': args.repeat_fraction,
+              'repeat_length': args.repeat_length, 'k': args.k, 'top_k': args.top_k, 'seed': args.seed,
+              'memory_limit': args.memory_limit}
+    print("="*80)
+    print("ASSEMBLY BENCHMARK")
+    print("="*80)
+    rows = run_benchmark(args.sizes, params, stages, args.workdir, args.stage_timeout)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'params': params,
+        'results': rows,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_rows = json.load(f)['results']
+        regressions = compare(rows, baseline_rows, args.time_tolerance, args.memory_tolerance, args.min_seconds)
+        if regressions:
+            print(f"\n⚠ {len(regressions)} differences against {args.baseline}:")
+            for row, base, time_ratio, memory_ratio in regressions:
+                if row['status'] != 'ok' or base.get('status', 'ok') != 'ok':
+                    print(f"  - size {row['size']:,} {row['stage']}: "
+                          f"{base.get('status', 'ok')} in the baseline, {row['status']} now")
+                else:
+                    print(f"  - size {row['size']:,} {row['stage']}: "
+                          f"time x{time_ratio:.2f}, memory x{memory_ratio:.2f}")
+            sys.exit(1)
+        print(f"\n✓ No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,20 +4,43 @@ Check node 0 specifically
 """
 import pandas as pd
 
+from graph_store import open_store
+from table_cache import display_view, load_table
+
+
+def kmer_rows(kmers, store):
+    """PREFIX/KMER/SUFFIX/COUNT rows for the given k-mers
+
+    Uses the memory-mapped graph store when it is up to date, otherwise
+    graph_edges.txt.
+    """
+    if store is None:
+        graph_df = load_table('edges')
+        return graph_df[graph_df['KMER'].isin(kmers)][['PREFIX', 'KMER', 'SUFFIX', 'COUNT']]
+
+    graph = store.graph
+    edges = graph.edge_ids(kmers)
+    edges = edges[edges >= 0]
+    return pd.DataFrame({
+        'PREFIX': graph.node_labels(graph.sources[edges]),
+        'KMER': graph.edge_kmers(edges),
+        'SUFFIX': graph.node_labels(graph.targets[edges]),
+        'COUNT': graph.counts[edges],
+    })
+
+
 # Read the complete file
-df = pd.read_excel('debruijn_graph_complete.xlsx')
-df = df.iloc[1:].copy()
-df.columns = ['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']
+df = load_table('debruijn')
 
 # Find all rows with node 0
 node_0_rows = df[df['node_number'] == 0]
 
 print("All rows with node_number = 0:")
 print("="*80)
-print(node_0_rows[['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']])
+print(display_view('debruijn', node_0_rows)[['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']])
 
 # Check the contig data
-contigs_df = pd.read_csv('contigs_initial.txt', sep='\t')
+contigs_df = load_table('contigs')
 contig_0 = contigs_df[contigs_df['CONTIG_ID'] == 0]
 
 print("\n\nContig 0 from contigs_initial.txt:")
@@ -25,11 +48,12 @@ print("="*80)
 print(contig_0)
 
 # Check graph edges for these kmers
-graph_df = pd.read_csv('graph_edges.txt', sep='\t')
-abovei_row = graph_df[graph_df['KMER'] == 'abovei']
-boveim_row = graph_df[graph_df['KMER'] == 'boveim']
+store = open_store()
+edges_source = 'graph_edges.txt' if store is None else store.path
+abovei_row = kmer_rows(['abovei'], store)
+boveim_row = kmer_rows(['boveim'], store)
 
-print("\n\nK-mer 'abovei' from graph_edges.txt:")
+print(f"\n\nK-mer 'abovei' from {edges_source}:")
 print(abovei_row[['PREFIX', 'KMER', 'SUFFIX', 'COUNT']])
 
 print("\n\nK-mer info:")
@@ -40,7 +64,7 @@ print("  - So 'abovei' (suffix = 'bovei') should be the kmer in the debruijn gra
 print("  - But we also have 'boveim' which has prefix 'bovei'...")
 
 if not boveim_row.empty:
-    print("\nK-mer 'boveim' from graph_edges.txt:")
+    print(f"\nK-mer 'boveim' from {edges_source}:")
     print(boveim_row[['PREFIX', 'KMER', 'SUFFIX', 'COUNT']])
     print("\n'boveim' is the NEXT kmer after 'abovei' in the sequence!")
     print("abovei -> boveim -> oveimon -> veimonl -> eimonlh -> imonlyh OR imonlyi")
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Compact the De Bruijn graph into unitigs (maximal non-branching paths)
+
+Walks every edge exactly once (O(V+E)) using the in/out degree arrays of
+DeBruijnGraph, then writes the contig tables in the contigs_initial.txt and
+contig_graph.txt schemas, to unitigs_initial.txt and unitig_graph.txt by
+default so the shipped contig tables are only replaced when asked for.
+Paths are kept as ranges of edge indices and sequences are only assembled
+when the tables are written.
+
+With --processes, weakly connected components are compacted in a process
+pool (largest first) and merged; contig IDs depend only on the sequences, so
+the tables are identical to the serial ones.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import instrument
+from debruijn_graph import DeBruijnGraph
+
+
+class Unitigs:
+    """Unitig paths stored as one flat edge array plus offsets
+
+    Path i is edges[offsets[i]:offsets[i + 1]]; it starts at node
+    start_nodes[i] and ends at node end_nodes[i].
+    """
+
+    def __init__(self, graph, edges, offsets):
+        self.graph = graph
+        self.edges = np.asarray(edges, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.start_nodes = graph.sources[self.edges[self.offsets[:-1]]]
+        self.end_nodes = graph.targets[self.edges[self.offsets[1:] - 1]]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def num_kmers(self):
+        return np.diff(self.offsets)
+
+    @property
+    def lengths(self):
+        return self.num_kmers + self.graph.k - 1
+
+    def sequences(self):
+        """Assemble all unitig sequences from their edge ranges"""
+        graph = self.graph
+        mask = np.uint64((1 << graph.bits) - 1)
+        letters = np.array(list(graph.alphabet), dtype='U1')
+
+        # Last letter of every edge on every path, as one string sliced per path
+        last = (graph.edge_codes[self.edges] & mask).astype(np.intp)
+        tails = ''.join(letters[last].tolist())
+        heads = graph.node_labels(self.start_nodes)
+
+        offsets = self.offsets.tolist()
+        return [str(heads[i]) + tails[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+
+@instrument.timed('compact')
+def find_unitigs(graph, subset=None):
+    """Find all maximal non-branching paths, including isolated cycles
+
+    With subset (edge indices), only the unitigs made of those edges are
+    walked; the subset must be a union of whole unitigs.
+    """
+    simple = (graph.in_degree == 1) & (graph.out_degree == 1)
+    subset = np.arange(graph.num_edges) if subset is None else np.unique(subset)
+
+    targets = graph.targets.tolist()
+    first_edge = graph.offsets.tolist()
+    is_simple = simple.tolist()
+
+    edges = []
+    offsets = [0]
+
+    # Paths start at every edge leaving a branching (not 1-in-1-out) node
+    for edge in subset[~simple[graph.sources[subset]]].tolist():
+        edges.append(edge)
+        node_next = targets[edge]
+        while is_simple[node_next]:
+            edge = first_edge[node_next]
+            edges.append(edge)
+            node_next = targets[edge]
+        offsets.append(len(edges))
+
+    # Whatever is left forms cycles made only of 1-in-1-out nodes
+    used = np.zeros(graph.num_edges, dtype=bool)
+    used[edges] = True
+    sources = graph.sources.tolist()
+    for edge in subset[~used[subset]].tolist():
+        if used[edge]:
+            continue
+        start = sources[edge]
+        while True:
+            edges.append(edge)
+            used[edge] = True
+            node_next = targets[edge]
+            if node_next == start:
+                break
+            edge = first_edge[node_next]
+        offsets.append(len(edges))
+
+    # Every walked edge enters one node
+    instrument.count('nodes_visited', len(edges))
+    instrument.count('unitigs', len(offsets) - 1)
+    return Unitigs(graph, edges, offsets)
+
+
+def weak_components(num_nodes, sources, targets):
+    """Label nodes by weakly connected component with an array union-find
+
+    Every round hooks the root of each edge's larger label onto the smaller
+    one, then compresses paths by pointer jumping.  Labels end up as the
+    smallest node ID of each component.
+    """
+    labels = np.arange(num_nodes, dtype=np.int64)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    while True:
+        source_roots, target_roots = labels[sources], labels[targets]
+        smaller = np.minimum(source_roots, target_roots)
+        hooked = labels.copy()
+        np.minimum.at(hooked, source_roots, smaller)
+        np.minimum.at(hooked, target_roots, smaller)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, labels):
+            return labels
+        labels = hooked
+
+
+def component_edge_groups(graph):
+    """Edge index arrays of each weakly connected component, largest first
+
+    Ties are ordered by component label, so the grouping is deterministic.
+    """
+    labels = weak_components(graph.num_nodes, graph.sources, graph.targets)[graph.sources]
+    order = np.argsort(labels, kind='stable')
+    starts = np.flatnonzero(np.concatenate(([True], labels[order][1:] != labels[order][:-1])))
+    groups = np.split(order, starts[1:]) if len(order) else []
+    return sorted(groups, key=lambda edges: -len(edges))
+
+
+def compact_component(edge_codes, counts, k, alphabet):
+    """Worker task: unitigs of one component as (edges, offsets) in its own edge numbering"""
+    unitigs = find_unitigs(DeBruijnGraph(edge_codes, counts, k, alphabet))
+    return unitigs.edges, unitigs.offsets
+
+
+@instrument.timed('compact')
+def find_unitigs_parallel(graph, processes=None):
+    """find_unitigs() with weakly connected components compacted in a process pool
+
+    Component edges are kept in graph order, so a component's local edge i
+    is its i-th global edge and results map back with one index.
+    """
+    groups = component_edge_groups(graph)
+    processes = processes or os.cpu_count() or 1
+    tasks = ([graph.edge_codes[edges] for edges in groups], [graph.counts[edges] for edges in groups],
+             [graph.k] * len(groups), [graph.alphabet] * len(groups))
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(compact_component, *tasks,
+                                chunksize=max(1, len(groups) // (processes * 4))))
+
+    edges = [groups[i][local] for i, (local, _) in enumerate(results)]
+    offsets = [np.zeros(1, dtype=np.int64)]
+    total = 0
+    for local, local_offsets in results:
+        offsets.append(local_offsets[1:] + total)
+        total += len(local)
+    edges = np.concatenate(edges) if edges else np.zeros(0, dtype=np.int64)
+    offsets = np.concatenate(offsets)
+    # Worker counters stay in the workers; count the merged result here
+    instrument.count('components', len(groups))
+    instrument.count('nodes_visited', len(edges))
+    instrument.count('unitigs', len(offsets) - 1)
+    return Unitigs(graph, edges, offsets)
+
+
+def format_links(pairs, column, contig_ids):
+    """Comma-separated sorted contig lists per contig ID from a (CONTIG_ID, column) table"""
+    grouped = (pairs.sort_values(['CONTIG_ID', column])
+                    .groupby('CONTIG_ID')[column]
+                    .agg(lambda ids: ','.join(str(i) for i in ids)))
+    return grouped.reindex(contig_ids, fill_value='').to_numpy()
+
+
+@instrument.timed('contig_tables')
+def contig_tables(unitigs):
+    """Build the contigs_initial and contig_graph tables
+
+    Contig IDs follow the alphabetical order of the sequences.  Contig A links
+    to contig B when A ends at the node where B starts.
+    """
+    graph = unitigs.graph
+    sequences = np.array(unitigs.sequences(), dtype=object)
+    order = np.argsort(sequences, kind='stable')
+    contig_ids = np.empty(len(order), dtype=np.int64)
+    contig_ids[order] = np.arange(len(order))
+
+    contigs = pd.DataFrame({
+        'CONTIG_ID': contig_ids,
+        'LENGTH': unitigs.lengths,
+        'START_NODE': graph.node_labels(unitigs.start_nodes),
+        'END_NODE': graph.node_labels(unitigs.end_nodes),
+        'NUM_KMERS': unitigs.num_kmers,
+        'SEQUENCE': sequences,
+    })
+
+    ends = pd.DataFrame({'CONTIG_ID': contig_ids, 'node': unitigs.end_nodes})
+    starts = pd.DataFrame({'OUTGOING': contig_ids, 'node': unitigs.start_nodes})
+    links = ends.merge(starts, on='node')[['CONTIG_ID', 'OUTGOING']]
+    incoming = links.rename(columns={'CONTIG_ID': 'INCOMING', 'OUTGOING': 'CONTIG_ID'})
+
+    all_ids = np.arange(len(order))
+    contig_graph = pd.DataFrame({
+        'CONTIG_ID': all_ids,
+        'INCOMING_CONTIGS': format_links(incoming, 'INCOMING', all_ids),
+        'OUTGOING_CONTIGS': format_links(links, 'OUTGOING', all_ids),
+        'SEQUENCE': sequences[order],
+    })
+
+    contigs = contigs.sort_values(['LENGTH', 'CONTIG_ID'], ascending=[False, True])
+    return contigs, contig_graph
+
+
+def n50(lengths):
+    """Length N such that contigs of length >= N hold half the assembly"""
+    lengths = np.sort(np.asarray(lengths))[::-1]
+    if len(lengths) == 0:
+        return 0
+    cumulative = np.cumsum(lengths)
+    return int(lengths[np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the De Bruijn graph into unitigs")
+    parser.add_argument('--edges', default='graph_edges.txt')
+    parser.add_argument('--contigs-out', default='unitigs_initial.txt',
+                        help="Contig table (default: unitigs_initial.txt; pass contigs_initial.txt to replace it)")
+    parser.add_argument('--graph-out', default='unitig_graph.txt',
+                        help="Contig links (default: unitig_graph.txt; pass contig_graph.txt to replace it)")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Compact connected components in parallel (0 = all cores, default: 1)")
+    args = parser.parse_args()
+
+    graph = DeBruijnGraph.from_edges_file(args.edges)
+    print(f"Graph loaded: {graph.num_nodes} nodes, {graph.num_edges} edges")
+
+    if args.processes == 1:
+        unitigs = find_unitigs(graph)
+    else:
+        unitigs = find_unitigs_parallel(graph, args.processes or None)
+    contigs, contig_graph = contig_tables(unitigs)
+
+    contigs.to_csv(args.contigs_out, sep='\t', index=False)
+    print(f"✓ Wrote {args.contigs_out}")
+    contig_graph.to_csv(args.graph_out, sep='\t', index=False)
+    print(f"✓ Wrote {args.graph_out}")
+
+    print(f"\nNumber of contigs: {len(contigs)}")
+    print(f"Total length: {int(contigs['LENGTH'].sum())} letters")
+    print(f"N50: {n50(contigs['LENGTH'])} letters")
+    print(f"Longest contig: {int(contigs['LENGTH'].max())} letters")
+    print(f"Shortest contig: {int(contigs['LENGTH'].min())} letters")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,104 @@
 #!/usr/bin/env python3
 """
 Complete the De Bruijn graph by filling in missing information
+
+The outgoing-edge check is a vectorized join: each node row is joined to the
+k-mers leaving its (k-1)-mer, those k-mers are joined back to the node index
+by their suffix, and the resulting (row, node) pairs are compared with the
+pairs parsed from the current outgoing_edge column in a single merge.
 """
 import pandas as pd
-import openpyxl
-from collections import defaultdict
-
-# Read the k-mer graph data
-graph_df = pd.read_csv('graph_edges.txt', sep='\t')
-print("K-mer graph data loaded")
-print(f"Total k-mers: {len(graph_df)}")
-
-# Read the current debruijn file
-debruijn_df = pd.read_excel('debruijn_graph_complete.xlsx')
-
-# Skip the header row and extract actual data
-debruijn_df = debruijn_df.iloc[1:].copy()  # Skip first row which contains column names
-debruijn_df.columns = ['index', 'kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']
-
-# Drop the index column
-debruijn_df = debruijn_df[['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']]
-
-print("\nCurrent debruijn data:")
-print(f"Total rows: {len(debruijn_df)}")
-
-# Count nodes that are already filled
-filled_nodes = debruijn_df[debruijn_df['node_number'].notna()]
-print(f"Filled nodes: {len(filled_nodes)}")
-
-# Create a mapping from kmer suffix (last 5 letters) to list of kmers with that prefix
-kmer_to_info = {}
-suffix_to_kmers = defaultdict(list)
-
-for idx, row in graph_df.iterrows():
-    kmer = row['KMER']
-    prefix = row['PREFIX']  # first 5 letters
-    suffix = row['SUFFIX']  # last 5 letters
-
-    kmer_to_info[suffix] = {
-        'kmer': kmer,
-        'prefix': prefix,
-        'suffix': suffix
-    }
-    suffix_to_kmers[prefix].append(kmer)
-
-print(f"\nUnique suffixes (5-mers): {len(kmer_to_info)}")
-
-# For each k-mer in the debruijn file, check the outgoing edges
-print("\nChecking outgoing edges...")
-issues_found = []
-
-for idx, row in debruijn_df.iterrows():
-    if pd.isna(row['kmers']):
-        continue
-
-    kmer_suffix = row['kmers']
-
-    # Check if this suffix exists in our graph
-    if kmer_suffix not in kmer_to_info:
-        continue
-
-    # Get the full kmer info
-    kmer = kmer_to_info[kmer_suffix]['kmer']
-    suffix = kmer_to_info[kmer_suffix]['suffix']
-
-    # Find what this kmer connects to (the suffix becomes the prefix of next kmers)
-    outgoing_kmers = suffix_to_kmers[suffix]
-
-    if len(outgoing_kmers) > 0:
-        # Map these kmers to node numbers
-        outgoing_nodes = []
-        for out_kmer in outgoing_kmers:
-            # Get the suffix of this outgoing kmer
-            out_suffix = out_kmer[-5:]
-            # Find which node has this suffix as its kmer
-            node_row = debruijn_df[debruijn_df['kmers'] == out_suffix]
-            if not node_row.empty and not pd.isna(node_row.iloc[0]['node_number']):
-                outgoing_nodes.append(str(int(node_row.iloc[0]['node_number'])))
-
-        if outgoing_nodes:
-            expected_outgoing = ','.join(outgoing_nodes)
-            current_outgoing = str(row['outgoing_edge']) if not pd.isna(row['outgoing_edge']) else ''
-
-            if current_outgoing != expected_outgoing:
-                issues_found.append({
-                    'kmer': kmer_suffix,
-                    'node': row['node_number'],
-                    'current_outgoing': current_outgoing,
-                    'expected_outgoing': expected_outgoing
-                })
-
-if issues_found:
-    print(f"\nFound {len(issues_found)} potential issues with outgoing edges:")
-    for issue in issues_found[:10]:  # Show first 10
-        print(f"  Node {issue['node']} ({issue['kmer']}): current='{issue['current_outgoing']}' expected='{issue['expected_outgoing']}'")
-else:
-    print("\nNo issues found with outgoing edges!")
-
-print("\nAnalysis complete!")
+
+from table_cache import load_table, parse_edge_list
+
+
+def edge_list_pairs(edge_lists):
+    """Explode node lists into (row, node) integer pairs
+
+    Accepts integer lists from the table cache as well as strings like
+    '57,58', numbers (57 or 57.0) and missing values.
+    """
+    nodes = edge_lists.map(parse_edge_list).explode().dropna().astype(int)
+    return pd.DataFrame({'row': nodes.index, 'node': nodes.to_numpy()})
+
+
+def join_edge_lists(pairs, rows):
+    """Turn (row, node) pairs back into sorted comma-separated strings per row"""
+    if pairs.empty:
+        return pd.Series('', index=rows)
+    joined = (pairs.sort_values(['row', 'node'])
+                   .groupby('row')['node']
+                   .agg(lambda nodes: ','.join(str(n) for n in nodes)))
+    return joined.reindex(rows, fill_value='')
+
+
+def find_outgoing_mismatches(debruijn_df, graph_df):
+    """Compare expected and current outgoing node sets for every row at once
+
+    Returns a DataFrame with kmer, node, current_outgoing and expected_outgoing
+    for each row whose outgoing_edge does not match the graph.
+    """
+    rows = debruijn_df[debruijn_df['kmers'].notna()]
+    rows = rows[rows['kmers'].isin(set(graph_df['SUFFIX']))]
+
+    # Suffix -> node index: the first row holding each (k-1)-mer, if it has a node number
+    node_index = debruijn_df.drop_duplicates('kmers', keep='first')
+    node_index = node_index[node_index['node_number'].notna()]
+    node_index = pd.DataFrame({'SUFFIX': node_index['kmers'].to_numpy(),
+                               'node': node_index['node_number'].astype(int).to_numpy()})
+
+    # Row (k-1)-mer -> outgoing k-mers -> node whose (k-1)-mer is the k-mer's suffix
+    outgoing = pd.DataFrame({'row': rows.index, 'PREFIX': rows['kmers'].to_numpy()})
+    outgoing = outgoing.merge(graph_df[['PREFIX', 'SUFFIX']], on='PREFIX')
+    expected = outgoing.merge(node_index, on='SUFFIX')[['row', 'node']].drop_duplicates()
+
+    # Only rows with at least one expected outgoing node are checked
+    checked = expected['row'].unique()
+    current = edge_list_pairs(debruijn_df.loc[checked, 'outgoing_edge']).drop_duplicates()
+
+    compared = expected.merge(current, on=['row', 'node'], how='outer', indicator=True)
+    bad_rows = compared.loc[compared['_merge'] != 'both', 'row'].unique()
+    bad_rows = debruijn_df.index[debruijn_df.index.isin(bad_rows)]
+
+    return pd.DataFrame({
+        'kmer': debruijn_df.loc[bad_rows, 'kmers'],
+        'node': debruijn_df.loc[bad_rows, 'node_number'],
+        'current_outgoing': join_edge_lists(current[current['row'].isin(bad_rows)], bad_rows),
+        'expected_outgoing': join_edge_lists(expected[expected['row'].isin(bad_rows)], bad_rows),
+    }, index=bad_rows)
+
+
+def main():
+    # Read the k-mer graph data
+    graph_df = load_table('edges')
+    print("K-mer graph data loaded")
+    print(f"Total k-mers: {len(graph_df)}")
+
+    # Read the current debruijn file
+    debruijn_df = load_table('debruijn')
+
+    print("\nCurrent debruijn data:")
+    print(f"Total rows: {len(debruijn_df)}")
+
+    # Count nodes that are already filled
+    filled_nodes = debruijn_df[debruijn_df['node_number'].notna()]
+    print(f"Filled nodes: {len(filled_nodes)}")
+
+    print(f"\nUnique suffixes ({len(graph_df['SUFFIX'].iloc[0])}-mers): {graph_df['SUFFIX'].nunique()}")
+
+    # For each k-mer in the debruijn file, check the outgoing edges
+    print("\nChecking outgoing edges...")
+    issues = find_outgoing_mismatches(debruijn_df, graph_df)
+
+    if not issues.empty:
+        print(f"\nFound {len(issues)} potential issues with outgoing edges:")
+        print(issues.to_string(index=False))
+    else:
+        print("\nNo issues found with outgoing edges!")
+
+    print("\nAnalysis complete!")
+    return issues
+
+
+if __name__ == "__main__":
+    main()
@@ -1,86 +1,210 @@
 #!/usr/bin/env python3
 """
 Convert text files to Excel format
+
+Tables are streamed: the text file is read in chunks of rows and appended to
+an openpyxl write-only worksheet, so memory stays bounded by the chunk size.
+Column types are settled by a first pass over the whole file, so the cells do
+not depend on the chunk size.
+Files are converted concurrently in a process pool, and a file whose source
+is unchanged since its last export (.excel_export.json) is skipped.
 """
-import pandas as pd
+import argparse
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 
-def convert_txt_to_excel(txt_file, excel_file, sep='\t', header=0):
-    """Convert a tab-separated text file to Excel"""
-    try:
-        # Read the text file
-        df = pd.read_csv(txt_file, sep=sep, header=header)
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
 
-        # Remove empty rows at the end
-        df = df.dropna(how='all')
+import instrument
+from table_cache import file_hash, source_stamp
 
-        # Write to Excel
-        df.to_excel(excel_file, index=False, engine='openpyxl')
-        print(f"✓ Converted {txt_file} → {excel_file}")
-        return True
-    except Exception as e:
-        print(f"✗ Error converting {txt_file}: {e}")
-        return False
+DEFAULT_CHUNK_ROWS = 50000
+MANIFEST = '.excel_export.json'
+EXPORT_VERSION = 2
+
+TABULAR_FILES = [
+    ('kmers_data.txt', 'kmers_data.xlsx'),
+    ('graph_edges.txt', 'graph_edges.xlsx'),
+    ('contigs_initial.txt', 'contigs_initial.xlsx'),
+    ('contig_graph.txt', 'contig_graph.xlsx'),
+    ('assembled_paths.txt', 'assembled_paths.xlsx'),
+]
+TEXT_DOCUMENTS = [
+    ('HOMEWORK_ANSWERS.txt', 'HOMEWORK_ANSWERS.xlsx'),
+]
+
+# The header style DataFrame.to_excel uses
+THIN = Side(style='thin')
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=THIN, right=THIN, top=THIN, bottom=THIN)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+def header_row(sheet, names):
+    cells = []
+    for name in names:
+        cell = WriteOnlyCell(sheet, value=str(name))
+        cell.font, cell.border, cell.alignment = HEADER_FONT, HEADER_BORDER, HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+def sheet_rows(chunk):
+    """Rows of a chunk as lists of Python values, missing values as empty cells"""
+    values = chunk.astype(object).where(chunk.notna(), None)
+    return values.itertuples(index=False, name=None)
+
+def column_types(txt_file, sep='\t', header=0, chunksize=DEFAULT_CHUNK_ROWS):
+    """dtype of every column as read_csv infers it from the whole file, found chunk by chunk
 
+    A column is int64 when every value is an integer, float64 when every
+    value is a number or missing, and str otherwise.
+    """
+    ranks = {}
+    for chunk in pd.read_csv(txt_file, sep=sep, header=header, chunksize=chunksize, dtype=str):
+        for column in chunk.columns:
+            values = chunk[column].dropna()
+            if pd.to_numeric(values, errors='coerce').isna().any():
+                rank = 2
+            elif len(values) < len(chunk) or not values.str.fullmatch(r'[+-]?\d+').all():
+                rank = 1
+            else:
+                rank = 0
+            ranks[column] = max(ranks.get(column, 0), rank)
+    return {column: ('int64', 'float64', str)[rank] for column, rank in ranks.items()}
+
+@instrument.timed('export')
+def convert_txt_to_excel(txt_file, excel_file, sep='\t', header=0, chunksize=DEFAULT_CHUNK_ROWS):
+    """Stream a tab-separated text file into an Excel sheet; returns the rows written"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    written = 0
+    wrote_header = False
+    dtypes = column_types(txt_file, sep, header, chunksize)
+    for chunk in pd.read_csv(txt_file, sep=sep, header=header, chunksize=chunksize, dtype=dtypes):
+        if not wrote_header:
+            sheet.append(header_row(sheet, chunk.columns))
+            wrote_header = True
+        # Remove empty rows
+        chunk = chunk.dropna(how='all')
+        for row in sheet_rows(chunk):
+            sheet.append(row)
+        written += len(chunk)
+    instrument.count('rows_written', written)
+    workbook.save(excel_file)
+    return written
+
+@instrument.timed('export')
 def convert_text_document_to_excel(txt_file, excel_file):
-    """Convert a text document (not tabular) to Excel with one column"""
+    """Convert a text document (not tabular) to Excel with one column; returns the rows written"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header_row(sheet, ['Content']))
+    written = 0
+    with open(txt_file, 'r') as f:
+        for line in f:
+            sheet.append([line.rstrip('\n')])
+            written += 1
+    instrument.count('rows_written', written)
+    workbook.save(excel_file)
+    return written
+
+def convert_file(kind, txt_path, excel_path, chunksize=DEFAULT_CHUNK_ROWS):
+    """Worker task: convert one file; returns (ok, rows, message)"""
+    name = os.path.basename(txt_path)
     try:
-        with open(txt_file, 'r') as f:
-            lines = f.readlines()
+        if kind == 'table':
+            rows = convert_txt_to_excel(txt_path, excel_path, chunksize=chunksize)
+        else:
+            rows = convert_text_document_to_excel(txt_path, excel_path)
+        return True, rows, f"✓ Converted {name} → {os.path.basename(excel_path)} ({rows:,} rows)"
+    except Exception as e:
+        return False, 0, f"✗ Error converting {name}: {e}"
 
-        # Create a DataFrame with one column
-        df = pd.DataFrame({'Content': [line.rstrip('\n') for line in lines]})
+def read_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    return manifest if manifest.get('version') == EXPORT_VERSION else {}
 
-        # Write to Excel
-        df.to_excel(excel_file, index=False, engine='openpyxl')
-        print(f"✓ Converted {txt_file} → {excel_file}")
+def is_exported(entry, txt_path, excel_path):
+    """True when excel_path is the export of txt_path's current content (by stamp, then by hash)"""
+    if not entry or not os.path.exists(excel_path):
+        return False
+    if entry.get('output') != source_stamp(excel_path):
+        return False
+    stamp = source_stamp(txt_path)
+    if entry.get('source') == stamp:
         return True
-    except Exception as e:
-        print(f"✗ Error converting {txt_file}: {e}")
+    if entry.get('sha256') != file_hash(txt_path):
         return False
+    # Same content, new mtime (e.g. after a checkout): refresh the stamp only
+    entry['source'] = stamp
+    return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert the text tables to Excel")
+    parser.add_argument('--processes', type=int, default=0,
+                        help="Files converted at once (0 = all cores, default: 0)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows read per chunk when streaming a table")
+    parser.add_argument('--force', action='store_true', help="Convert even if the source is unchanged")
+    args = parser.parse_args()
+
     # Get the directory where the script is located
     script_dir = os.path.dirname(os.path.abspath(__file__))
+    manifest_path = os.path.join(script_dir, MANIFEST)
+    manifest = read_manifest(manifest_path)
+    files = manifest.setdefault('files', {})
 
     print("Converting txt files to Excel format...\n")
 
-    # Define files to convert (tabular data)
-    tabular_files = [
-        ('kmers_data.txt', 'kmers_data.xlsx'),
-        ('graph_edges.txt', 'graph_edges.xlsx'),
-        ('contigs_initial.txt', 'contigs_initial.xlsx'),
-        ('contig_graph.txt', 'contig_graph.xlsx'),
-        ('assembled_paths.txt', 'assembled_paths.xlsx'),
-    ]
+    jobs = []
+    skipped = 0
+    missing = 0
+    for kind, pairs in (('table', TABULAR_FILES), ('document', TEXT_DOCUMENTS)):
+        for txt_file, excel_file in pairs:
+            txt_path = os.path.join(script_dir, txt_file)
+            excel_path = os.path.join(script_dir, excel_file)
+            if not os.path.exists(txt_path):
+                print(f"✗ File not found: {txt_file}")
+                missing += 1
+            elif not args.force and is_exported(files.get(excel_file), txt_path, excel_path):
+                print(f"• Unchanged: {txt_file}")
+                skipped += 1
+            else:
+                jobs.append((kind, txt_path, excel_path, txt_file, excel_file))
 
-    # Convert tabular files
     success_count = 0
-    for txt_file, excel_file in tabular_files:
-        txt_path = os.path.join(script_dir, txt_file)
-        excel_path = os.path.join(script_dir, excel_file)
-
-        if os.path.exists(txt_path):
-            if convert_txt_to_excel(txt_path, excel_path):
-                success_count += 1
-        else:
-            print(f"✗ File not found: {txt_file}")
-
-    # Convert HOMEWORK_ANSWERS.txt (text document)
-    homework_txt = os.path.join(script_dir, 'HOMEWORK_ANSWERS.txt')
-    homework_excel = os.path.join(script_dir, 'HOMEWORK_ANSWERS.xlsx')
+    if jobs:
+        processes = min(args.processes or os.cpu_count() or 1, len(jobs))
+        with instrument.stage('export'), ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(convert_file, kind, txt_path, excel_path, args.chunk_rows)
+                       for kind, txt_path, excel_path, _, _ in jobs]
+            for (_, txt_path, excel_path, _, excel_file), future in zip(jobs, futures):
+                ok, rows, message = future.result()
+                print(message)
+                instrument.count('rows_written', rows)
+                if ok:
+                    success_count += 1
+                    files[excel_file] = {'source': source_stamp(txt_path), 'sha256': file_hash(txt_path),
+                                         'output': source_stamp(excel_path)}
+                else:
+                    files.pop(excel_file, None)
 
-    if os.path.exists(homework_txt):
-        if convert_text_document_to_excel(homework_txt, homework_excel):
-            success_count += 1
-    else:
-        print(f"✗ File not found: HOMEWORK_ANSWERS.txt")
+    manifest['version'] = EXPORT_VERSION
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
 
-    print(f"\n✓ Successfully converted {success_count}/{len(tabular_files) + 1} files")
-    print("\nExcel files created:")
-    for _, excel_file in tabular_files:
+    total = len(TABULAR_FILES) + len(TEXT_DOCUMENTS)
+    print(f"\n✓ Successfully converted {success_count}/{total} files "
+          f"({skipped} unchanged, {missing} missing)")
+    print("\nExcel files:")
+    for _, excel_file in TABULAR_FILES + TEXT_DOCUMENTS:
         print(f"  - {excel_file}")
-    print(f"  - HOMEWORK_ANSWERS.xlsx")
 
 if __name__ == "__main__":
     main()
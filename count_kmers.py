@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Count k-mers directly from raw read files (plain text, FASTA or FASTQ)
+
+K-mers are packed into unsigned 64-bit integers (a fixed number of bits per
+letter, letters ranked in alphabet order) so counting is a single sort/unique
+pass over NumPy arrays instead of a dict keyed by strings.  Because letters
+are ranked alphabetically, sorting the packed codes also sorts the k-mers.
+
+With --bloom, a first pass through Bloom filters keeps k-mers seen only once
+out of the count table, which is where most of the memory goes on noisy reads.
+The filters are sized from a HyperLogLog estimate of the distinct k-mers.
+"""
+import argparse
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import instrument
+
+DEFAULT_K = 6
+DEFAULT_ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+DEFAULT_CHUNK_SIZE = 100000
+
+# Multiplier for the shard hash (Fibonacci hashing)
+SHARD_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+DEFAULT_BLOOM_FP_RATE = 0.01
+# log2 of the number of HyperLogLog registers used to size the Bloom filters (~1.6% error)
+SKETCH_PRECISION = 12
+# Bytes per entry of the exact count table (uint64 code + int64 count)
+TABLE_ENTRY_BYTES = 16
+
+
+def normalize_alphabet(alphabet):
+    """Return the alphabet as a sorted string of unique lowercase letters"""
+    return ''.join(sorted(set(alphabet.lower())))
+
+
+def bits_per_symbol(alphabet):
+    """Number of bits needed to store one letter of the alphabet"""
+    return max(1, int(np.ceil(np.log2(len(alphabet)))))
+
+
+def max_k(alphabet):
+    """Largest k whose packed code fits in an unsigned 64-bit integer"""
+    return 64 // bits_per_symbol(alphabet)
+
+
+def build_lookup(alphabet):
+    """Map every byte value to its letter rank, or -1 if it is not in the alphabet"""
+    lookup = np.full(256, -1, dtype=np.int16)
+    for rank, letter in enumerate(alphabet):
+        lookup[ord(letter)] = rank
+        lookup[ord(letter.upper())] = rank
+    return lookup
+
+
+def detect_format(path):
+    """Guess the read file format from its first non-empty line"""
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('>'):
+                return 'fasta'
+            if line.startswith('@'):
+                return 'fastq'
+            return 'text'
+    return 'text'
+
+
+def read_sequences(path, fmt=None, alphabet=DEFAULT_ALPHABET):
+    """Yield one read at a time from a plain text, FASTA or FASTQ file
+
+    Plain text files hold one read per line; spaces and punctuation are
+    dropped as in the assignment.  In FASTA/FASTQ files letters outside the
+    alphabet (e.g. 'N') are kept so they break k-mers instead of joining them.
+    """
+    fmt = fmt or detect_format(path)
+
+    with open(path, 'r') as f:
+        if fmt == 'text':
+            drop = re.compile('[^' + re.escape(alphabet + alphabet.upper()) + ']+')
+            for line in f:
+                read = drop.sub('', line)
+                if read:
+                    yield read
+        elif fmt == 'fasta':
+            parts = []
+            for line in f:
+                line = line.strip()
+                if line.startswith('>'):
+                    if parts:
+                        yield ''.join(parts)
+                    parts = []
+                elif line:
+                    parts.append(line)
+            if parts:
+                yield ''.join(parts)
+        elif fmt == 'fastq':
+            for i, line in enumerate(f):
+                if i % 4 == 1:
+                    read = line.strip()
+                    if read:
+                        yield read
+        else:
+            raise ValueError(f"Unknown read format: {fmt}")
+
+
+def iter_read_chunks(paths, fmt=None, alphabet=DEFAULT_ALPHABET, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of at most chunk_size reads across all input files"""
+    chunk = []
+    for path in paths:
+        for read in read_sequences(path, fmt=fmt, alphabet=alphabet):
+            chunk.append(read)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def encode_kmers(reads, k, alphabet=DEFAULT_ALPHABET, lookup=None):
+    """Pack every valid k-mer of every read into a uint64 array
+
+    The reads are joined with a separator byte so all windows are computed in
+    one vectorized pass; windows that touch a separator or an unknown letter
+    are discarded.
+    """
+    if k > max_k(alphabet):
+        raise ValueError(f"k={k} does not fit in 64 bits for a {len(alphabet)}-letter alphabet")
+    if lookup is None:
+        lookup = build_lookup(alphabet)
+
+    buffer = np.frombuffer('\n'.join(reads).encode('ascii', 'replace'), dtype=np.uint8)
+    if len(buffer) < k:
+        return np.empty(0, dtype=np.uint64)
+
+    ranks = lookup[buffer]
+    invalid = ranks < 0
+
+    # A window is valid when none of its k letters is invalid
+    bad_prefix = np.concatenate(([0], np.cumsum(invalid)))
+    valid = (bad_prefix[k:] - bad_prefix[:-k]) == 0
+
+    bits = bits_per_symbol(alphabet)
+    symbols = ranks.astype(np.uint64)
+    codes = np.zeros(len(buffer) - k + 1, dtype=np.uint64)
+    for offset in range(k):
+        codes <<= np.uint64(bits)
+        codes |= symbols[offset:len(symbols) - k + 1 + offset]
+
+    return codes[valid]
+
+
+def count_codes(codes):
+    """Count packed k-mers with a sort/unique pass"""
+    unique, counts = np.unique(codes, return_counts=True)
+    return unique, counts.astype(np.int64)
+
+
+def sum_by_key(keys, values):
+    """Sort keys and sum the values of equal keys"""
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    if len(keys) == 0:
+        return keys, values
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.add.reduceat(values, starts)
+
+
+def merge_counts(parts):
+    """Merge several (codes, counts) pairs into one sorted table"""
+    parts = [p for p in parts if len(p[0])]
+    if not parts:
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)
+    if len(parts) == 1:
+        return parts[0]
+    return sum_by_key(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+
+
+def push_run(runs, run):
+    """Add a sorted (codes, counts) run to a stack, merging runs of similar size
+
+    Run sizes shrink at least twofold up the stack, so each entry is merged
+    O(log chunks) times instead of once per chunk, and the stack holds at
+    most about twice the distinct k-mers.  merge_counts(runs) gives the total.
+    """
+    runs.append(run)
+    while len(runs) > 1 and len(runs[-2][0]) <= 2 * len(runs[-1][0]):
+        top = runs.pop()
+        runs[-1] = merge_counts([runs[-1], top])
+
+
+@instrument.timed('count_kmers')
+def count_kmers(paths, k=DEFAULT_K, alphabet=DEFAULT_ALPHABET, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Count all k-mers in the given read files
+
+    Returns the sorted packed codes and their counts.  Reads are streamed in
+    chunks and each chunk is counted before being merged (see push_run), so
+    memory is bounded by the chunk size plus about twice the number of
+    distinct k-mers.
+    """
+    alphabet = normalize_alphabet(alphabet)
+    lookup = build_lookup(alphabet)
+
+    runs = []
+    for chunk in iter_read_chunks(paths, fmt=fmt, alphabet=alphabet, chunk_size=chunk_size):
+        chunk_codes = encode_kmers(chunk, k, alphabet, lookup)
+        instrument.count('reads_scanned', len(chunk))
+        instrument.count('kmers_scanned', len(chunk_codes))
+        push_run(runs, count_codes(chunk_codes))
+
+    return merge_counts(runs)
+
+
+def shard_of(codes, num_shards):
+    """Shard index of each packed k-mer, from a multiplicative hash of its code"""
+    return ((codes * SHARD_HASH) >> np.uint64(32)) % np.uint64(num_shards)
+
+
+def count_chunk_shards(reads, k, alphabet, num_shards):
+    """Worker task: count one chunk of reads and split the result by shard"""
+    codes, counts = count_codes(encode_kmers(reads, k, alphabet))
+    shards = shard_of(codes, num_shards)
+    order = np.argsort(shards, kind='stable')
+    bounds = np.searchsorted(shards[order], np.arange(num_shards + 1, dtype=np.uint64))
+    codes, counts = codes[order], counts[order]
+    return [(codes[bounds[i]:bounds[i + 1]], counts[bounds[i]:bounds[i + 1]]) for i in range(num_shards)]
+
+
+def merge_shard(parts):
+    """Reduce task: merge every partial count of one shard"""
+    return merge_counts(parts)
+
+
+def count_kmers_parallel(paths, k=DEFAULT_K, alphabet=DEFAULT_ALPHABET, fmt=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, processes=None, num_shards=None):
+    """Count k-mers with a process pool; same result as count_kmers()
+
+    Chunks of reads are streamed to the workers with at most two chunks per
+    worker in flight, so memory stays bounded.  Each worker's counts come back
+    split into shards by k-mer hash, partial shards are merged as they pile up,
+    and a final reduce merges every shard in parallel.  Shards hold disjoint
+    k-mers, so concatenating them and sorting gives the serial output exactly.
+    """
+    alphabet = normalize_alphabet(alphabet)
+    processes = processes or os.cpu_count() or 1
+    num_shards = num_shards or processes * 4
+    max_in_flight = processes * 2
+
+    shard_parts = [[] for _ in range(num_shards)]
+
+    def collect(done):
+        for future in done:
+            for shard, part in enumerate(future.result()):
+                if len(part[0]):
+                    shard_parts[shard].append(part)
+                # Keep the number of pending pieces per shard small
+                if len(shard_parts[shard]) > max_in_flight:
+                    shard_parts[shard] = [merge_counts(shard_parts[shard])]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = set()
+        for chunk in iter_read_chunks(paths, fmt=fmt, alphabet=alphabet, chunk_size=chunk_size):
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(count_chunk_shards, chunk, k, alphabet, num_shards))
+        collect(pending)
+
+        merged = list(pool.map(merge_shard, shard_parts))
+
+    codes = np.concatenate([m[0] for m in merged]) if merged else np.empty(0, dtype=np.uint64)
+    counts = np.concatenate([m[1] for m in merged]) if merged else np.empty(0, dtype=np.int64)
+    order = np.argsort(codes, kind='stable')
+    return codes[order].astype(np.uint64), counts[order].astype(np.int64)
+
+
+def mix64(codes):
+    """SplitMix64 finalizer: spread packed k-mer codes over all 64 bits"""
+    z = codes + SHARD_HASH
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+class BloomFilter:
+    """Bit-array Bloom filter over packed k-mer codes
+
+    The num_hashes bit positions of a code come from double hashing of two
+    64-bit mixes of the code.
+    """
+
+    def __init__(self, num_bits, num_hashes):
+        self.num_bytes = max(1, -(-num_bits // 8))
+        self.num_bits = self.num_bytes * 8
+        self.num_hashes = max(1, num_hashes)
+        self.bits = np.zeros(self.num_bytes, dtype=np.uint8)
+
+    @classmethod
+    def for_capacity(cls, num_items, fp_rate=DEFAULT_BLOOM_FP_RATE, max_bytes=None):
+        """Filter sized for num_items at fp_rate, shrunk to max_bytes if given"""
+        num_items = max(1, num_items)
+        num_bits = int(np.ceil(-num_items * np.log(fp_rate) / np.log(2) ** 2))
+        if max_bytes is not None:
+            num_bits = min(num_bits, int(max_bytes) * 8)
+        num_hashes = int(round(num_bits / num_items * np.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, codes):
+        h1 = mix64(codes)
+        h2 = mix64(h1) | np.uint64(1)
+        m = np.uint64(self.num_bits)
+        return [(h1 + np.uint64(i) * h2) % m for i in range(self.num_hashes)]
+
+    def add(self, codes):
+        for pos in self._positions(codes):
+            np.bitwise_or.at(self.bits, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+
+    def contains(self, codes):
+        found = np.ones(len(codes), dtype=bool)
+        for pos in self._positions(codes):
+            found &= (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1 == 1
+        return found
+
+    def estimated_items(self):
+        """Number of distinct codes added, estimated from the fraction of set bits"""
+        set_bits = int(np.unpackbits(self.bits).sum())
+        if set_bits >= self.num_bits:
+            return float('inf')
+        return -self.num_bits / self.num_hashes * np.log(1 - set_bits / self.num_bits)
+
+    def false_positive_rate(self, num_items):
+        return (1 - np.exp(-self.num_hashes * num_items / self.num_bits)) ** self.num_hashes
+
+
+class DistinctSketch:
+    """HyperLogLog sketch estimating the number of distinct packed k-mer codes
+
+    Each code's 64-bit mix picks one of 2**precision registers with its top
+    bits; the register keeps the largest position of the first set bit in
+    the next 52 bits seen so far.
+    """
+
+    def __init__(self, precision=SKETCH_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, codes):
+        h = mix64(np.asarray(codes, dtype=np.uint64))
+        index = (h >> np.uint64(64 - self.precision)).astype(np.intp)
+        # 52 bits fit a float64 exactly, so frexp gives their bit length
+        rest = (h << np.uint64(self.precision)) >> np.uint64(12)
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        np.maximum.at(self.registers, index, (53 - bit_length).astype(np.uint8))
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty = int((self.registers == 0).sum())
+        if raw <= 2.5 * m and empty:
+            return m * np.log(m / empty)
+        return float(raw)
+
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+def count_kmers_bloom(paths, k=DEFAULT_K, alphabet=DEFAULT_ALPHABET, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      fp_rate=DEFAULT_BLOOM_FP_RATE, max_bytes=None, expected_kmers=None):
+    """Count only k-mers seen at least twice, skipping singletons in the count table
+
+    Pass 1 streams the reads through two Bloom filters: 'seen' holds every
+    k-mer and 'repeated' every k-mer met a second time.  Pass 2 counts exactly,
+    but only k-mers in 'repeated' enter the table; Bloom false positives are
+    dropped at the end by their exact count.  The result equals count_kmers()
+    restricted to counts >= 2.  Returns (codes, counts, stats).
+
+    expected_kmers sizes the filters; by default a DistinctSketch pass over
+    the reads estimates it (padded by twice the sketch's error), so the
+    filters are not sized for every k-mer occurrence.  max_bytes caps the
+    memory of the two filters together.
+    """
+    alphabet = normalize_alphabet(alphabet)
+    lookup = build_lookup(alphabet)
+    if expected_kmers is None:
+        sketch = DistinctSketch()
+        for chunk in iter_read_chunks(paths, fmt=fmt, alphabet=alphabet, chunk_size=chunk_size):
+            sketch.add(encode_kmers(chunk, k, alphabet, lookup))
+        expected_kmers = int(np.ceil(sketch.estimate() * (1 + 2 * sketch.relative_error())))
+    per_filter = None if max_bytes is None else max_bytes // 2
+    seen = BloomFilter.for_capacity(expected_kmers, fp_rate, per_filter)
+    repeated = BloomFilter.for_capacity(expected_kmers, fp_rate, per_filter)
+
+    for chunk in iter_read_chunks(paths, fmt=fmt, alphabet=alphabet, chunk_size=chunk_size):
+        unique, counts = count_codes(encode_kmers(chunk, k, alphabet, lookup))
+        repeated.add(unique[(counts > 1) | seen.contains(unique)])
+        seen.add(unique)
+
+    runs = []
+    peak_entries = 0
+    for chunk in iter_read_chunks(paths, fmt=fmt, alphabet=alphabet, chunk_size=chunk_size):
+        unique, chunk_counts = count_codes(encode_kmers(chunk, k, alphabet, lookup))
+        keep = repeated.contains(unique)
+        push_run(runs, (unique[keep], chunk_counts[keep]))
+        peak_entries = max(peak_entries, sum(len(run[0]) for run in runs))
+    codes, counts = merge_counts(runs)
+
+    keep = counts > 1
+    distinct = float(seen.estimated_items())
+    stats = {
+        'distinct_estimate': distinct,
+        'table_entries': peak_entries,
+        'false_positives': int((~keep).sum()),
+        'bloom_bytes': seen.num_bytes + repeated.num_bytes,
+        'bloom_fp_rate': float(seen.false_positive_rate(distinct)),
+    }
+    stats['bytes_saved'] = int((distinct - peak_entries) * TABLE_ENTRY_BYTES - stats['bloom_bytes'])
+    return codes[keep], counts[keep], stats
+
+
+def decode_kmers(codes, k, alphabet=DEFAULT_ALPHABET):
+    """Turn packed codes back into an array of k-letter strings"""
+    codes = np.asarray(codes, dtype=np.uint64)
+    if len(codes) == 0:
+        return np.empty(0, dtype=f'U{k}')
+
+    bits = bits_per_symbol(alphabet)
+    shifts = np.arange(k - 1, -1, -1, dtype=np.uint64) * np.uint64(bits)
+    ranks = (codes[:, None] >> shifts) & np.uint64((1 << bits) - 1)
+
+    letters = np.array(list(alphabet), dtype='U1')[ranks.astype(np.intp)]
+    return np.ascontiguousarray(letters).view(f'U{k}').ravel()
+
+
+def edge_table(codes, counts, k, alphabet=DEFAULT_ALPHABET):
+    """Build the graph_edges.txt columns from packed k-mer counts
+
+    OUT_DEG is the total count leaving the PREFIX node and IN_DEG the total
+    count entering the SUFFIX node.  Rows are sorted by k-mer, which also
+    groups them by PREFIX.
+    """
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    counts = counts[order]
+
+    bits = bits_per_symbol(alphabet)
+    prefixes = codes >> np.uint64(bits)
+    suffixes = codes & np.uint64((1 << (bits * (k - 1))) - 1)
+
+    prefix_nodes, prefix_index = np.unique(prefixes, return_inverse=True)
+    suffix_nodes, suffix_index = np.unique(suffixes, return_inverse=True)
+    out_deg = np.bincount(prefix_index, weights=counts).astype(np.int64)
+    in_deg = np.bincount(suffix_index, weights=counts).astype(np.int64)
+
+    return {
+        'PREFIX': decode_kmers(prefixes, k - 1, alphabet),
+        'SUFFIX': decode_kmers(suffixes, k - 1, alphabet),
+        'KMER': decode_kmers(codes, k, alphabet),
+        'COUNT': counts,
+        'OUT_DEG': out_deg[prefix_index],
+        'IN_DEG': in_deg[suffix_index],
+    }
+
+
+def write_kmers_data(path, codes, counts, k, alphabet=DEFAULT_ALPHABET):
+    """Write kmers_data.txt (k-mer and count, tab-separated, no header)"""
+    kmers = decode_kmers(codes, k, alphabet)
+    with open(path, 'w') as f:
+        for kmer, count in zip(kmers, counts):
+            f.write(f"{kmer}\t{count}\n")
+
+
+def write_graph_edges(path, codes, counts, k, alphabet=DEFAULT_ALPHABET):
+    """Write graph_edges.txt in the existing PREFIX/SUFFIX/KMER/COUNT/OUT_DEG/IN_DEG schema"""
+    table = edge_table(codes, counts, k, alphabet)
+    columns = list(table)
+    with open(path, 'w') as f:
+        f.write('\t'.join(columns) + '\n')
+        for row in zip(*(table[c] for c in columns)):
+            f.write('\t'.join(str(v) for v in row) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count k-mers from raw read files")
+    parser.add_argument('reads', nargs='+', help="Read files (plain text, FASTA or FASTQ)")
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="k-mer length (default: 6)")
+    parser.add_argument('--alphabet', default=DEFAULT_ALPHABET, help="Letters to count (default: a-z)")
+    parser.add_argument('--format', choices=['text', 'fasta', 'fastq'], help="Read format (default: auto-detect)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Reads per counting chunk")
+    parser.add_argument('--processes', type=int, default=1,
+                        help="Worker processes for sharded counting (0 = all cores, default: 1)")
+    parser.add_argument('--shards', type=int, help="Hash shards for parallel counting (default: 4 per process)")
+    parser.add_argument('--bloom', action='store_true',
+                        help="Drop k-mers seen only once using Bloom filters (extra passes over the reads; serial only)")
+    parser.add_argument('--bloom-fp-rate', type=float, default=DEFAULT_BLOOM_FP_RATE,
+                        help="Target Bloom filter false-positive rate (default: 0.01)")
+    parser.add_argument('--bloom-memory', type=float, help="Memory cap for the Bloom filters, in MB")
+    parser.add_argument('--kmers-out', default='kmers_data.txt')
+    parser.add_argument('--edges-out', default='graph_edges.txt')
+    args = parser.parse_args()
+
+    alphabet = normalize_alphabet(args.alphabet)
+    for path in args.reads:
+        if not os.path.exists(path):
+            parser.error(f"File not found: {path}")
+
+    if args.bloom:
+        max_bytes = None if args.bloom_memory is None else int(args.bloom_memory * 2**20)
+        codes, counts, stats = count_kmers_bloom(args.reads, k=args.k, alphabet=alphabet, fmt=args.format,
+                                                 chunk_size=args.chunk_size, fp_rate=args.bloom_fp_rate,
+                                                 max_bytes=max_bytes)
+        print(f"Bloom filters: {stats['bloom_bytes']:,} bytes, "
+              f"false-positive rate ~{stats['bloom_fp_rate']:.4f}")
+        print(f"Distinct {args.k}-mers (estimated): {int(stats['distinct_estimate']):,}")
+        print(f"Count table entries: {stats['table_entries']:,} "
+              f"({stats['false_positives']} false positives dropped)")
+        if stats['bytes_saved'] >= 0:
+            print(f"Memory saved: {stats['bytes_saved']:,} bytes")
+        else:
+            print(f"⚠ Bloom filters cost {-stats['bytes_saved']:,} bytes more than they saved "
+                  f"(few singleton {args.k}-mers; plain counting uses less memory here)")
+    elif args.processes == 1:
+        codes, counts = count_kmers(args.reads, k=args.k, alphabet=alphabet,
+                                    fmt=args.format, chunk_size=args.chunk_size)
+    else:
+        codes, counts = count_kmers_parallel(args.reads, k=args.k, alphabet=alphabet,
+                                             fmt=args.format, chunk_size=args.chunk_size,
+                                             processes=args.processes or None, num_shards=args.shards)
+
+    print(f"Unique {args.k}-mers: {len(codes)}")
+    print(f"Total k-mer observations: {int(counts.sum())}")
+
+    write_kmers_data(args.kmers_out, codes, counts, args.k, alphabet)
+    print(f"✓ Wrote {args.kmers_out}")
+    write_graph_edges(args.edges_out, codes, counts, args.k, alphabet)
+    print(f"✓ Wrote {args.edges_out}")
+
+
+if __name__ == "__main__":
+    main()
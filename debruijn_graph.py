@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Array-backed De Bruijn graph
+
+(k-1)-mers are interned as integer node IDs (their rank among the sorted
+packed codes) and edges are stored in compressed sparse row (CSR) arrays, so
+an edge costs a few bytes instead of a dict entry and a pandas row.
+"""
+import numpy as np
+import pandas as pd
+
+from count_kmers import (DEFAULT_ALPHABET, bits_per_symbol, decode_kmers,
+                         encode_kmers, normalize_alphabet)
+import instrument
+
+
+class DeBruijnGraph:
+    """De Bruijn graph over packed k-mers stored as CSR arrays
+
+    Edge i is the k-mer edge_codes[i]; it leaves node sources[i] and enters
+    node targets[i] with multiplicity counts[i].  Edges are ordered by source
+    node so offsets[n]:offsets[n + 1] are the outgoing edges of node n, and
+    in_edges[in_offsets[n]:in_offsets[n + 1]] are its incoming edge indices.
+    """
+
+    @instrument.timed('graph_build')
+    def __init__(self, edge_codes, counts, k, alphabet=DEFAULT_ALPHABET):
+        self.k = k
+        self.alphabet = normalize_alphabet(alphabet)
+        self.bits = bits_per_symbol(self.alphabet)
+
+        edge_codes = np.asarray(edge_codes, dtype=np.uint64)
+        counts = np.asarray(counts, dtype=np.int64)
+        order = np.argsort(edge_codes, kind='stable')
+        self.edge_codes = edge_codes[order]
+        self.counts = counts[order]
+
+        prefixes = self.edge_codes >> np.uint64(self.bits)
+        suffixes = self.edge_codes & np.uint64((1 << (self.bits * (k - 1))) - 1)
+
+        # Node IDs are ranks of the sorted unique (k-1)-mer codes
+        self.node_codes = np.unique(np.concatenate((prefixes, suffixes)))
+        self.sources = np.searchsorted(self.node_codes, prefixes).astype(np.int32)
+        self.targets = np.searchsorted(self.node_codes, suffixes).astype(np.int32)
+
+        num_nodes = len(self.node_codes)
+        self.out_degree = np.bincount(self.sources, minlength=num_nodes).astype(np.int32)
+        self.in_degree = np.bincount(self.targets, minlength=num_nodes).astype(np.int32)
+
+        # Sorting edges by k-mer also sorts them by source, so CSR is a cumsum
+        self.offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(self.out_degree, out=self.offsets[1:])
+
+        self.in_edges = np.argsort(self.targets, kind='stable').astype(np.int64)
+        self.in_offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(self.in_degree, out=self.in_offsets[1:])
+        instrument.count('edges', len(self.edge_codes))
+        instrument.count('nodes', num_nodes)
+
+    ARRAYS = ['edge_codes', 'counts', 'node_codes', 'sources', 'targets',
+              'out_degree', 'in_degree', 'offsets', 'in_edges', 'in_offsets']
+
+    @classmethod
+    def from_arrays(cls, k, alphabet, arrays):
+        """Wrap prebuilt arrays (e.g. memory-mapped ones) without copying or re-sorting"""
+        graph = cls.__new__(cls)
+        graph.k = k
+        graph.alphabet = normalize_alphabet(alphabet)
+        graph.bits = bits_per_symbol(graph.alphabet)
+        for name in cls.ARRAYS:
+            setattr(graph, name, arrays[name])
+        return graph
+
+    @classmethod
+    def from_kmers(cls, kmers, counts=None, alphabet=DEFAULT_ALPHABET):
+        """Build a graph from a list of k-mer strings (and optional counts)"""
+        kmers = list(kmers)
+        if not kmers:
+            raise ValueError("Cannot build a graph from an empty k-mer list")
+        alphabet = normalize_alphabet(alphabet)
+        k = len(kmers[0])
+        # Check lengths first: a longer k-mer's extra windows could make up for an invalid one
+        wrong = [kmer for kmer in kmers if len(kmer) != k]
+        if wrong:
+            raise ValueError(f"All k-mers must have length {k}; {len(wrong)} do not (e.g. {wrong[0]!r})")
+        codes = encode_kmers(kmers, k, alphabet)
+        if len(codes) != len(kmers):
+            raise ValueError("All k-mers must have the same length and use only alphabet letters")
+        if counts is None:
+            counts = np.ones(len(codes), dtype=np.int64)
+        return cls(codes, counts, k, alphabet)
+
+    @classmethod
+    def from_edges_file(cls, path='graph_edges.txt', alphabet=DEFAULT_ALPHABET):
+        """Build a graph from graph_edges.txt"""
+        edges_df = pd.read_csv(path, sep='\t')
+        return cls.from_kmers(edges_df['KMER'].tolist(), edges_df['COUNT'].to_numpy(), alphabet)
+
+    @property
+    def num_nodes(self):
+        return len(self.node_codes)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_codes)
+
+    def successors(self, node):
+        """Node IDs reachable by one outgoing edge"""
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def predecessors(self, node):
+        """Node IDs with an edge into this node"""
+        return self.sources[self.in_edges[self.in_offsets[node]:self.in_offsets[node + 1]]]
+
+    def out_edges(self, node):
+        """Edge indices leaving this node"""
+        return np.arange(self.offsets[node], self.offsets[node + 1])
+
+    def incoming_edges(self, node):
+        """Edge indices entering this node"""
+        return self.in_edges[self.in_offsets[node]:self.in_offsets[node + 1]]
+
+    def weighted_out_degree(self):
+        """Total k-mer count leaving each node"""
+        return np.bincount(self.sources, weights=self.counts, minlength=self.num_nodes).astype(np.int64)
+
+    def weighted_in_degree(self):
+        """Total k-mer count entering each node"""
+        return np.bincount(self.targets, weights=self.counts, minlength=self.num_nodes).astype(np.int64)
+
+    def node_id(self, label):
+        """Node ID of a (k-1)-mer string, or -1 if it is not in the graph"""
+        return int(self.node_ids([label])[0])
+
+    def node_ids(self, labels):
+        """Vectorized node_id over a list of (k-1)-mer strings"""
+        return self._lookup(self.node_codes, labels, self.k - 1)
+
+    def edge_ids(self, kmers):
+        """Edge index of each k-mer string, or -1 if it is not in the graph"""
+        return self._lookup(self.edge_codes, kmers, self.k)
+
+    def _lookup(self, sorted_codes, labels, width):
+        """Position of each label's packed code in a sorted code array, or -1"""
+        labels = list(labels)
+        codes = np.zeros(len(labels), dtype=np.uint64)
+        valid = np.zeros(len(labels), dtype=bool)
+        sized = [i for i, label in enumerate(labels) if len(label) == width]
+        encoded = encode_kmers([labels[i] for i in sized], width, self.alphabet) if sized else codes[:0]
+        if len(encoded) == len(sized):
+            codes[sized], valid[sized] = encoded, True
+        else:
+            # Some labels have unknown letters; encode one by one
+            for i in sized:
+                code = encode_kmers([labels[i]], width, self.alphabet)
+                if len(code) == 1:
+                    codes[i], valid[i] = code[0], True
+
+        if len(sorted_codes) == 0:
+            return np.full(len(labels), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(sorted_codes, codes), len(sorted_codes) - 1)
+        found = valid & (sorted_codes[pos] == codes)
+        return np.where(found, pos, -1).astype(np.int64)
+
+    def node_label(self, node):
+        """The (k-1)-mer string of a node"""
+        return str(decode_kmers(self.node_codes[node:node + 1], self.k - 1, self.alphabet)[0])
+
+    def node_labels(self, nodes=None):
+        """The (k-1)-mer strings of the given nodes (all nodes by default)"""
+        codes = self.node_codes if nodes is None else self.node_codes[np.asarray(nodes)]
+        return decode_kmers(codes, self.k - 1, self.alphabet)
+
+    def edge_kmers(self, edges=None):
+        """The k-mer strings of the given edges (all edges by default)"""
+        codes = self.edge_codes if edges is None else self.edge_codes[np.asarray(edges)]
+        return decode_kmers(codes, self.k, self.alphabet)
+
+    def nbytes(self):
+        """Memory used by the graph arrays"""
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+
+def main():
+    graph = DeBruijnGraph.from_edges_file('graph_edges.txt')
+
+    print("De Bruijn Graph Summary")
+    print("="*80)
+    print(f"k: {graph.k}")
+    print(f"Nodes ({graph.k - 1}-mers): {graph.num_nodes}")
+    print(f"Edges ({graph.k}-mers): {graph.num_edges}")
+    print(f"Total k-mer observations: {int(graph.counts.sum())}")
+    print(f"Nodes with no incoming edges: {int((graph.in_degree == 0).sum())}")
+    print(f"Nodes with no outgoing edges: {int((graph.out_degree == 0).sum())}")
+    print(f"Branch nodes (multiple outgoing): {int((graph.out_degree > 1).sum())}")
+    print(f"Merge nodes (multiple incoming): {int((graph.in_degree > 1).sum())}")
+    print(f"Array memory: {graph.nbytes():,} bytes ({graph.nbytes() / max(graph.num_edges, 1):.1f} per edge)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,94 +1,200 @@
 #!/usr/bin/env python3
 """
 Final verification of the De Bruijn graph
-"""
-import pandas as pd
-
-print("="*80)
-print("FINAL VERIFICATION OF DE BRUIJN GRAPH")
-print("="*80)
-
-# Read the updated file (nodes only version for easier viewing)
-nodes_df = pd.read_excel('debruijn_graph_nodes_only.xlsx')
-nodes_df = nodes_df.iloc[1:].copy()
-nodes_df.columns = ['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']
-
-# Read contig graph for comparison
-contig_graph = pd.read_csv('contig_graph.txt', sep='\t')
-
-print(f"\nTotal nodes in De Bruijn graph: {len(nodes_df)}")
-print(f"Total contigs in contig graph: {len(contig_graph)}")
-
-# Verify each node
-issues = []
-for idx, node_row in nodes_df.iterrows():
-    node_num = int(node_row['node_number'])
-
-    # Find corresponding contig
-    contig_row = contig_graph[contig_graph['CONTIG_ID'] == node_num]
-
-    if contig_row.empty:
-        issues.append(f"Node {node_num}: No matching contig found")
-        continue
-
-    contig_row = contig_row.iloc[0]
-
-    # Compare outgoing edges
-    node_outgoing = str(node_row['outgoing_edge']) if not pd.isna(node_row['outgoing_edge']) else ''
-    contig_outgoing = str(contig_row['OUTGOING_CONTIGS']) if not pd.isna(contig_row['OUTGOING_CONTIGS']) else ''
-
-    # Clean up for comparison
-    node_outgoing_clean = node_outgoing.replace('.0', '').replace(' ', '')
-    contig_outgoing_clean = contig_outgoing.replace('.0', '').replace(' ', '')
 
-    if node_outgoing_clean != contig_outgoing_clean:
-        issues.append(f"Node {node_num}: Outgoing edge mismatch - node has '{node_outgoing_clean}', contig has '{contig_outgoing_clean}'")
-
-    # Compare incoming edges
-    node_incoming = str(node_row['incoming_edge']) if not pd.isna(node_row['incoming_edge']) else ''
-    contig_incoming = str(contig_row['INCOMING_CONTIGS']) if not pd.isna(contig_row['INCOMING_CONTIGS']) else ''
-
-    node_incoming_clean = node_incoming.replace('.0', '').replace(' ', '')
-    contig_incoming_clean = contig_incoming.replace('.0', '').replace(' ', '')
-
-    if node_incoming_clean != contig_incoming_clean:
-        issues.append(f"Node {node_num}: Incoming edge mismatch - node has '{node_incoming_clean}', contig has '{contig_incoming_clean}'")
-
-if issues:
-    print(f"\n⚠ Found {len(issues)} issues:")
-    for issue in issues[:20]:  # Show first 20
-        print(f"  - {issue}")
-else:
-    print("\n✓ All nodes verified successfully!")
-    print("✓ All incoming edges match!")
-    print("✓ All outgoing edges match!")
-
-# Show sample of nodes
-print("\n" + "="*80)
-print("SAMPLE OF COMPLETED NODES")
-print("="*80)
-print(nodes_df[['node_number', 'kmers', 'incoming_edge', 'outgoing_edge', 'merged_node']].head(15).to_string())
-
-print("\n" + "="*80)
-print("SUMMARY STATISTICS")
-print("="*80)
-
-# Count nodes with no incoming edges (start nodes)
-start_nodes = nodes_df[nodes_df['incoming_edge'].isna() | (nodes_df['incoming_edge'] == '')]
-print(f"Nodes with no incoming edges (start nodes): {len(start_nodes)}")
-
-# Count nodes with no outgoing edges (end nodes)
-end_nodes = nodes_df[nodes_df['outgoing_edge'].isna() | (nodes_df['outgoing_edge'] == '')]
-print(f"Nodes with no outgoing edges (end nodes): {len(end_nodes)}")
-
-# Count nodes with branches (multiple outgoing)
-branch_nodes = nodes_df[nodes_df['outgoing_edge'].str.contains(',', na=False)]
-print(f"Nodes with multiple outgoing edges (branch points): {len(branch_nodes)}")
+Node rows are matched to the contig graph with one merge on CONTIG_ID and
+their incoming/outgoing lists are compared as sets of integer (row, contig)
+pairs, so the check is linear in the number of edges.
+"""
+import argparse
+import os
 
-# Count nodes with multiple incoming
-merge_nodes = nodes_df[nodes_df['incoming_edge'].str.contains(',', na=False)]
-print(f"Nodes with multiple incoming edges (merge points): {len(merge_nodes)}")
+import numpy as np
+import pandas as pd
 
-print("\n" + "="*80)
-print("✓ DE BRUIJN GRAPH COMPLETION VERIFIED!")
-print("="*80)
+import instrument
+from graph_store import open_store
+from table_cache import display_view, load_table
+
+REPORT_COLUMNS = ['node', 'kmers', 'check', 'node_edges', 'contig_edges', 'missing', 'extra']
+
+
+def adjacency_pairs(keys, edge_lists):
+    """Explode per-row adjacency lists into a (key, contig) integer pair table"""
+    values = pd.Series(list(edge_lists), index=np.asarray(keys), dtype=object).explode()
+    numbers = pd.to_numeric(values, errors='coerce')
+
+    # Comma-separated strings ('57,58') do not convert directly; split them apart
+    text = values[numbers.isna() & values.notna()].astype(str).str.split(',').explode()
+    numbers = pd.concat([numbers.dropna(), pd.to_numeric(text.str.strip(), errors='coerce').dropna()])
+    return pd.DataFrame({'key': numbers.index.to_numpy(dtype=np.int64),
+                         'contig': numbers.to_numpy(dtype=np.int64)})
+
+
+def join_contigs(pairs, rows):
+    """Sorted comma-separated contig lists for the given row numbers ('' when empty)"""
+    if pairs.empty:
+        return pd.Series('', index=rows, dtype=object)
+    joined = (pairs.sort_values(['key', 'contig'])
+                   .groupby('key')['contig']
+                   .agg(lambda ids: ','.join(str(i) for i in ids)))
+    return joined.reindex(rows, fill_value='')
+
+
+def compare_edges(rows, node_column, contig_graph, contig_column, check):
+    """Report rows whose adjacency set differs from their contig's"""
+    node_pairs = adjacency_pairs(rows['row'], rows[node_column]).drop_duplicates()
+    contig_pairs = adjacency_pairs(contig_graph['CONTIG_ID'], contig_graph[contig_column]).drop_duplicates()
+
+    # Expected pairs: each row gets the adjacency of the contig with its node number
+    expected = rows[['row', 'node']].merge(contig_pairs, left_on='node', right_on='key')
+    expected = pd.DataFrame({'key': expected['row'].to_numpy(), 'contig': expected['contig'].to_numpy()})
+
+    compared = node_pairs.merge(expected, on=['key', 'contig'], how='outer', indicator=True)
+    extra = compared[compared['_merge'] == 'left_only']
+    missing = compared[compared['_merge'] == 'right_only']
+    bad = np.union1d(extra['key'].to_numpy(), missing['key'].to_numpy())
+    if len(bad) == 0:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    bad_rows = rows.set_index('row').loc[bad]
+    return pd.DataFrame({
+        'node': bad_rows['node'].to_numpy(),
+        'kmers': bad_rows['kmers'].to_numpy(),
+        'check': check,
+        'node_edges': join_contigs(node_pairs, bad).to_numpy(),
+        'contig_edges': join_contigs(expected, bad).to_numpy(),
+        'missing': join_contigs(missing[['key', 'contig']], bad).to_numpy(),
+        'extra': join_contigs(extra[['key', 'contig']], bad).to_numpy(),
+    })
+
+
+@instrument.timed('verify_nodes')
+def verify_nodes(nodes_df, contig_graph):
+    """Structured mismatch report between the node table and the contig graph
+
+    One row per problem: check is 'no_contig', 'outgoing' or 'incoming';
+    missing/extra list the contigs the node row lacks or has in addition.
+    """
+    rows = pd.DataFrame({
+        'row': np.arange(len(nodes_df)),
+        'node': nodes_df['node_number'].to_numpy(dtype=np.float64),
+        'kmers': nodes_df['kmers'].to_numpy(),
+        'incoming_edge': nodes_df['incoming_edge'].to_numpy(),
+        'outgoing_edge': nodes_df['outgoing_edge'].to_numpy(),
+    })
+    instrument.count('rows_scanned', len(rows))
+    rows = rows[~np.isnan(rows['node'])].copy()
+    rows['node'] = rows['node'].astype(np.int64)
+
+    has_contig = rows['node'].isin(contig_graph['CONTIG_ID'])
+    no_contig = rows[~has_contig]
+    rows = rows[has_contig]
+
+    reports = [
+        pd.DataFrame({'node': no_contig['node'].to_numpy(), 'kmers': no_contig['kmers'].to_numpy(),
+                      'check': 'no_contig', 'node_edges': '', 'contig_edges': '', 'missing': '', 'extra': ''}),
+        compare_edges(rows, 'outgoing_edge', contig_graph, 'OUTGOING_CONTIGS', 'outgoing'),
+        compare_edges(rows, 'incoming_edge', contig_graph, 'INCOMING_CONTIGS', 'incoming'),
+    ]
+    reports = [r for r in reports if not r.empty]
+    instrument.count('issues', sum(len(r) for r in reports))
+    if not reports:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    report = pd.concat(reports, ignore_index=True)
+    return report.sort_values(['node', 'check'], kind='stable').reset_index(drop=True)
+
+
+def degree_counts(nodes_df):
+    """Number of incoming and outgoing contigs per node row, as integer arrays"""
+    keys = np.arange(len(nodes_df))
+    incoming = np.bincount(adjacency_pairs(keys, nodes_df['incoming_edge'])['key'], minlength=len(nodes_df))
+    outgoing = np.bincount(adjacency_pairs(keys, nodes_df['outgoing_edge'])['key'], minlength=len(nodes_df))
+    return incoming, outgoing
+
+
+def final_verification(nodes_df, contig_graph):
+    """Check every node's edges against the contig graph and print a summary
+
+    Returns the mismatch report from verify_nodes().
+    """
+    print("="*80)
+    print("FINAL VERIFICATION OF DE BRUIJN GRAPH")
+    print("="*80)
+
+    print(f"\nTotal nodes in De Bruijn graph: {len(nodes_df)}")
+    print(f"Total contigs in contig graph: {len(contig_graph)}")
+
+    report = verify_nodes(nodes_df, contig_graph)
+
+    if not report.empty:
+        print(f"\n⚠ Found {len(report)} issues:")
+        for check, count in report['check'].value_counts().sort_index().items():
+            print(f"  - {check}: {count}")
+        print(report.to_string(index=False, max_rows=40))
+    else:
+        print("\n✓ All nodes verified successfully!")
+        print("✓ All incoming edges match!")
+        print("✓ All outgoing edges match!")
+
+    # Show sample of nodes
+    print("\n" + "="*80)
+    print("SAMPLE OF COMPLETED NODES")
+    print("="*80)
+    sample = display_view('debruijn_nodes', nodes_df.head(15))
+    print(sample[['node_number', 'kmers', 'incoming_edge', 'outgoing_edge', 'merged_node']].to_string())
+
+    print("\n" + "="*80)
+    print("SUMMARY STATISTICS")
+    print("="*80)
+
+    incoming_counts, outgoing_counts = degree_counts(nodes_df)
+
+    # Count nodes with no incoming edges (start nodes)
+    print(f"Nodes with no incoming edges (start nodes): {int((incoming_counts == 0).sum())}")
+
+    # Count nodes with no outgoing edges (end nodes)
+    print(f"Nodes with no outgoing edges (end nodes): {int((outgoing_counts == 0).sum())}")
+
+    # Count nodes with branches (multiple outgoing)
+    print(f"Nodes with multiple outgoing edges (branch points): {int((outgoing_counts > 1).sum())}")
+
+    # Count nodes with multiple incoming
+    print(f"Nodes with multiple incoming edges (merge points): {int((incoming_counts > 1).sum())}")
+
+    print("\n" + "="*80)
+    if report.empty:
+        print("✓ DE BRUIJN GRAPH COMPLETION VERIFIED!")
+    else:
+        print(f"⚠ DE BRUIJN GRAPH HAS {len(report)} UNRESOLVED ISSUES")
+    print("="*80)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the De Bruijn node table against the contig graph")
+    parser.add_argument('--report', help="Write the mismatch report to this tab-separated file")
+    parser.add_argument('--graph-store', help="Take the contig graph from this memory-mapped graph store")
+    args = parser.parse_args()
+    if args.graph_store and not os.path.exists(args.graph_store):
+        parser.error(f"graph store not found: {args.graph_store}")
+
+    # Read the updated file (nodes only version for easier viewing)
+    nodes_df = load_table('debruijn_nodes')
+
+    # Read contig graph for comparison; a store built from older tables falls back to the text
+    store = open_store(args.graph_store, source='contig_graph.txt') if args.graph_store else None
+    if store is None:
+        contig_graph = load_table('contig_graph')
+    else:
+        contig_graph = store.contig_graph_table(sequences=False)
+
+    report = final_verification(nodes_df, contig_graph)
+    if args.report:
+        report.to_csv(args.report, sep='\t', index=False)
+        print(f"\nMismatch report saved: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
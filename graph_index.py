@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Batched lookups of k-mers, nodes, contigs and paths from the graph store
+
+Answers the questions check_node_0.py used to answer with full-table pandas
+filters, from the inverted arrays written by `graph_store.py build`:
+
+    kmers      k-mer -> edge, its prefix/suffix nodes, and (contig, offset)
+    nodes      (k-1)-mer -> node ID and (contig, offset)
+    contains   substring -> (contig, offset) it starts at, and contigs spanned
+    paths      substring -> assembled paths whose sequence holds it
+    neighbors  node -> successor and predecessor nodes with the k-mer between
+
+Every query takes a list of strings and returns one long DataFrame with a
+'query' column, so thousands of queries cost one call.
+"""
+import argparse
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from count_kmers import encode_kmers
+from graph_store import DEFAULT_STORE, GraphStore
+
+
+def gather(offsets, rows):
+    """For CSR rows, the position of each row's entries and which row each came from"""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    first = np.cumsum(lengths) - lengths
+    return owner, np.arange(int(lengths.sum())) - first[owner] + starts[owner]
+
+
+class GraphIndex:
+    """Query API over a graph store built with contigs (and optionally paths)"""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.store = GraphStore(path)
+        self.graph = self.store.graph
+        self.k = self.graph.k
+        self.arrays = self.store.arrays
+        if 'edge_occ_offsets' not in self.arrays:
+            raise ValueError(f"{path} has no contig index; rebuild it with graph_store.py build")
+        self.valid = re.compile('^[' + re.escape(self.graph.alphabet) + ']+$')
+        self._sequences = None
+
+    def sequences(self):
+        """Contig sequences, built once on first use"""
+        if self._sequences is None:
+            self._sequences = self.store.unitigs().sequences()
+        return self._sequences
+
+    def kmer_occurrences(self, edges):
+        """(owner, contig index, offset) for every occurrence of the given edges"""
+        owner, pos = gather(self.arrays['edge_occ_offsets'], edges)
+        return owner, self.arrays['edge_occ_contigs'][pos], self.arrays['edge_occ_positions'][pos]
+
+    def locate_kmers(self, kmers):
+        """Edge, PREFIX/SUFFIX nodes and (contig, offset) of each k-mer; unknown k-mers are left out"""
+        kmers = list(kmers)
+        edges = self.graph.edge_ids(kmers)
+        hit = np.flatnonzero(edges >= 0)
+        edges = edges[hit]
+        owner, contigs, offsets = self.kmer_occurrences(edges)
+
+        # K-mers outside every contig still get a row, with contig -1
+        placed = np.zeros(len(edges), dtype=bool)
+        placed[owner] = True
+        owner = np.concatenate((owner, np.flatnonzero(~placed)))
+        contig_ids = np.concatenate((self.store.contig_ids[contigs], np.full((~placed).sum(), -1)))
+        offsets = np.concatenate((offsets, np.full((~placed).sum(), -1)))
+
+        order = np.lexsort((offsets, contig_ids, owner))
+        owner, edge = owner[order], edges[owner[order]]
+        return pd.DataFrame({
+            'query': np.asarray(kmers, dtype=object)[hit[owner]],
+            'edge': edge,
+            'prefix_node': self.graph.sources[edge],
+            'suffix_node': self.graph.targets[edge],
+            'count': self.graph.counts[edge],
+            'contig': contig_ids[order],
+            'offset': offsets[order],
+        })
+
+    def locate_nodes(self, labels):
+        """Node ID of each (k-1)-mer and every (contig, offset) where it occurs"""
+        labels = list(labels)
+        nodes = self.graph.node_ids(labels)
+        hit = np.flatnonzero(nodes >= 0)
+        nodes = nodes[hit]
+        graph = self.graph
+
+        # A node sits at offset o + 1 after each incoming edge at offset o,
+        # and at offset 0 of every contig whose first edge leaves it
+        owner_in, pos = gather(graph.in_offsets, nodes)
+        owner_in_occ, contigs_in, offsets_in = self.kmer_occurrences(graph.in_edges[pos])
+        owner_in = owner_in[owner_in_occ]
+
+        owner_out, pos = gather(graph.offsets, nodes)
+        owner_out_occ, contigs_out, offsets_out = self.kmer_occurrences(pos)
+        first = offsets_out == 0
+        owner_out = owner_out[owner_out_occ][first]
+
+        owner = np.concatenate((owner_in, owner_out))
+        contigs = self.store.contig_ids[np.concatenate((contigs_in, contigs_out[first]))]
+        offsets = np.concatenate((offsets_in + 1, offsets_out[first]))
+        order = np.lexsort((offsets, contigs, owner))
+        owner = owner[order]
+        return pd.DataFrame({
+            'query': np.asarray(labels, dtype=object)[hit[owner]],
+            'node': nodes[owner],
+            'contig': contigs[order],
+            'offset': offsets[order],
+        })
+
+    def query_edges(self, substrings):
+        """{query index: edge indices of its k-mers} for the valid substrings of at least k letters"""
+        long_queries = [i for i, s in enumerate(substrings) if len(s) >= self.k and self.valid.match(s)]
+        if not long_queries:
+            return {}
+        sizes = [len(substrings[i]) - self.k + 1 for i in long_queries]
+        codes = encode_kmers([substrings[i] for i in long_queries], self.k, self.graph.alphabet)
+        edge_codes = self.graph.edge_codes
+        pos = np.minimum(np.searchsorted(edge_codes, codes), max(self.graph.num_edges - 1, 0))
+        edges = np.where(edge_codes[pos] == codes, pos, -1)
+        bounds = np.concatenate(([0], np.cumsum(sizes))).tolist()
+        return {query: edges[bounds[i]:bounds[i + 1]] for i, query in enumerate(long_queries)}
+
+    def extend(self, wanted, contig, offset, successors):
+        """Contig chains (lists of contig indices) along which the edges `wanted` run from (contig, offset)
+
+        The edges are compared a contig at a time; at the end of a contig the
+        match continues at offset 0 of every contig successors(chain) gives.
+        Consecutive contigs share k - 1 letters, so their edges simply follow
+        one another.
+        """
+        contig_offsets = self.arrays['contig_offsets']
+        contig_edges = self.arrays['contig_edges']
+        chains = []
+        stack = [([contig], offset, 0)]
+        while stack:
+            chain, start, done = stack.pop()
+            edges = contig_edges[contig_offsets[chain[-1]] + start:contig_offsets[chain[-1] + 1]]
+            size = min(len(edges), len(wanted) - done)
+            if size == 0 or not np.array_equal(edges[:size], wanted[done:done + size]):
+                continue
+            if done + size == len(wanted):
+                chains.append(chain)
+                continue
+            stack.extend((chain + [following], 0, done + size) for following in successors(chain))
+        return chains
+
+    def linked_contigs(self, chain):
+        return np.searchsorted(self.store.contig_ids, self.store.outgoing_contigs(chain[-1])).tolist()
+
+    def contigs_containing(self, substrings):
+        """Every (contig, letter offset) where each substring starts, and the contigs it spans
+
+        Substrings of at least k letters are matched through the k-mer index:
+        the occurrences of the first k-mer are kept when the following k-mers
+        continue along the same contig or, past its end, along a linked one.
+        Shorter ones are found by scanning the contig sequences; one that
+        crosses a boundary starts inside the k - 1 letters the next contig
+        repeats, so it is found there.
+        """
+        substrings = list(substrings)
+        contig_ids = self.store.contig_ids
+        rows = []
+        for query, wanted in self.query_edges(substrings).items():
+            if (wanted < 0).any():
+                continue
+            _, contigs, offsets = self.kmer_occurrences(wanted[:1])
+            for contig, offset in zip(contigs.tolist(), offsets.tolist()):
+                for chain in self.extend(wanted, contig, offset, self.linked_contigs):
+                    rows.append((query, int(contig_ids[contig]), offset,
+                                 '->'.join(str(contig_ids[c]) for c in chain)))
+
+        short_queries = [i for i, s in enumerate(substrings) if 0 < len(s) < self.k]
+        if short_queries:
+            sequences = self.sequences()
+            for query in short_queries:
+                text = substrings[query]
+                for contig, sequence in enumerate(sequences):
+                    offset = sequence.find(text)
+                    while offset != -1:
+                        rows.append((query, int(contig_ids[contig]), offset, str(contig_ids[contig])))
+                        offset = sequence.find(text, offset + 1)
+
+        rows.sort()
+        return pd.DataFrame({
+            'query': [substrings[q] for q, _, _, _ in rows],
+            'contig': np.array([c for _, c, _, _ in rows], dtype=np.int64),
+            'offset': np.array([o for _, _, o, _ in rows], dtype=np.int64),
+            'span': [s for _, _, _, s in rows],
+        }, columns=['query', 'contig', 'offset', 'span'])
+
+    def paths_containing(self, substrings):
+        """Assembled paths (by RANK) whose sequence contains each substring, with the contig it starts in
+
+        Long substrings are followed along each path's own contig list, so
+        matches across contig boundaries are found; short ones always lie
+        inside one contig (see contigs_containing).
+        """
+        if self.store.num_paths == 0:
+            raise ValueError(f"{self.store.path} has no paths; rebuild it with --paths")
+        substrings = list(substrings)
+        path_offsets = self.arrays['path_offsets']
+        path_contigs = self.arrays['path_contigs']
+        contig_ids = self.store.contig_ids
+        rows = []
+
+        for query, wanted in self.query_edges(substrings).items():
+            if (wanted < 0).any():
+                continue
+            _, contigs, offsets = self.kmer_occurrences(wanted[:1])
+            for contig, offset in zip(contigs.tolist(), offsets.tolist()):
+                owner, pos = gather(self.arrays['contig_path_offsets'], np.array([contig]))
+                for path in self.arrays['contig_paths'][pos].tolist():
+                    members = path_contigs[path_offsets[path]:path_offsets[path + 1]]
+                    for at in np.flatnonzero(members == contig).tolist():
+                        # Within a path the only successor is the path's next contig
+                        def successors(chain, members=members, at=at):
+                            following = at + len(chain)
+                            return [int(members[following])] if following < len(members) else []
+                        if self.extend(wanted, contig, offset, successors):
+                            rows.append((query, path + 1, int(contig_ids[contig])))
+
+        short = self.contigs_containing([s if 0 < len(s) < self.k else '' for s in substrings])
+        contigs = np.searchsorted(contig_ids, short['contig'].to_numpy())
+        owner, pos = gather(self.arrays['contig_path_offsets'], contigs)
+        queries = [substrings.index(q) for q in short['query']]
+        rows.extend(zip(np.asarray(queries, dtype=np.int64)[owner].tolist(),
+                        (self.arrays['contig_paths'][pos] + 1).tolist(),
+                        short['contig'].to_numpy()[owner].tolist()))
+
+        rows = sorted(set(rows))
+        return pd.DataFrame({
+            'query': [substrings[q] for q, _, _ in rows],
+            'rank': np.array([r for _, r, _ in rows], dtype=np.int64),
+            'contig': np.array([c for _, _, c in rows], dtype=np.int64),
+        }, columns=['query', 'rank', 'contig'])
+
+    def neighbors(self, nodes):
+        """Successors and predecessors of each node, given as (k-1)-mers or node IDs"""
+        nodes = list(nodes)
+        labels = sum(isinstance(node, str) for node in nodes)
+        if 0 < labels < len(nodes):
+            raise ValueError("Give nodes either as (k-1)-mers or as node IDs, not a mix of both")
+        if labels:
+            ids = self.graph.node_ids(nodes)
+        else:
+            ids = np.asarray(nodes, dtype=np.int64)
+            ids = np.where((ids >= 0) & (ids < self.graph.num_nodes), ids, -1)
+        hit = np.flatnonzero(ids >= 0)
+        ids = ids[hit]
+        graph = self.graph
+
+        owner_out, out_edges = gather(graph.offsets, ids)
+        owner_in, pos = gather(graph.in_offsets, ids)
+        in_edges = graph.in_edges[pos]
+
+        owner = np.concatenate((owner_out, owner_in))
+        edges = np.concatenate((out_edges, in_edges))
+        neighbor = np.concatenate((graph.targets[out_edges], graph.sources[in_edges]))
+        direction = np.repeat(np.array(['out', 'in'], dtype=object), [len(out_edges), len(in_edges)])
+        order = np.lexsort((neighbor, direction == 'in', owner))
+        owner, edges = owner[order], edges[order]
+        return pd.DataFrame({
+            'query': np.asarray(nodes, dtype=object)[hit[owner]],
+            'node': ids[owner],
+            'direction': direction[order],
+            'neighbor': neighbor[order],
+            'neighbor_label': graph.node_labels(neighbor[order]),
+            'kmer': graph.edge_kmers(edges),
+            'count': graph.counts[edges],
+        })
+
+
+QUERIES = {
+    'kmers': GraphIndex.locate_kmers,
+    'nodes': GraphIndex.locate_nodes,
+    'contains': GraphIndex.contigs_containing,
+    'paths': GraphIndex.paths_containing,
+    'neighbors': GraphIndex.neighbors,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the graph store's k-mer, node, contig and path index")
+    parser.add_argument('query', choices=sorted(QUERIES))
+    parser.add_argument('items', nargs='*', help="Query strings (node IDs allowed for neighbors)")
+    parser.add_argument('--file', help="Read more query strings from this file, one per line ('-' for stdin)")
+    parser.add_argument('--store', default=DEFAULT_STORE)
+    args = parser.parse_args()
+
+    items = list(args.items)
+    if args.file:
+        if args.file == '-':
+            items.extend(line.strip() for line in sys.stdin if line.strip())
+        else:
+            with open(args.file) as handle:
+                items.extend(line.strip() for line in handle if line.strip())
+    if args.query == 'neighbors':
+        digits = sum(item.isdigit() for item in items)
+        if 0 < digits < len(items):
+            parser.error("neighbors takes either (k-1)-mers or node IDs, not a mix of both")
+        if digits:
+            items = [int(item) for item in items]
+    if not items:
+        parser.error("no query strings given")
+
+    index = GraphIndex(args.store)
+    start = time.perf_counter()
+    result = QUERIES[args.query](index, items)
+    elapsed = time.perf_counter() - start
+
+    print(result.to_string(index=False, max_rows=60))
+    print(f"\n{len(items)} queries, {len(result)} rows in {elapsed * 1e3:.2f} ms "
+          f"({elapsed / len(items) * 1e6:.1f} µs/query)")
+
+
+if __name__ == "__main__":
+    main()
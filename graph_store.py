@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped on-disk format for the De Bruijn graph and its contigs
+
+Layout: 8-byte magic, 8-byte header length, a JSON header (k, alphabet,
+sizes and the dtype/offset/length of every array), then fixed-width arrays,
+each aligned to 64 bytes:
+
+    node_codes    packed (k-1)-mers, sorted (node ID = position)
+    edge_codes    packed k-mers, sorted; sources/targets/counts per edge
+    offsets       CSR offsets of outgoing edges per node
+    in_offsets    CSR offsets into in_edges (incoming edge indices)
+    contig_*      contigs as ranges of edge indices plus contig-level CSR links
+    edge_occ_*    CSR index from each edge to its (contig, offset) occurrences
+    path_*        assembled paths as contig lists, and contig -> paths CSR
+
+GraphStore opens a file with numpy.memmap and views the arrays in place, so
+loading takes milliseconds and several processes share one page-cached copy.
+The header also records the size/mtime and SHA-256 of the text tables the
+store was built from; open_store() only returns a store whose sources are
+unchanged.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from compact_unitigs import Unitigs, contig_tables, find_unitigs
+from count_kmers import decode_kmers, encode_kmers
+from debruijn_graph import DeBruijnGraph
+from table_cache import file_hash, parse_edge_list, source_stamp
+
+MAGIC = b'DBGSTORE'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DEFAULT_STORE = 'debruijn_graph.dbg'
+
+
+def write_arrays(path, header, arrays):
+    """Write named 1-D arrays behind a JSON header, each aligned to ALIGNMENT bytes"""
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'offset': position, 'length': len(array)}
+        position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = dict(header, version=FORMAT_VERSION, arrays=layout)
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(16 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + position)
+    os.replace(tmp, path)
+
+
+def map_arrays(path):
+    """(header, {name: array}) of a file from write_arrays(), arrays mapped in place"""
+    with open(path, 'rb') as f:
+        if f.read(8) != MAGIC:
+            raise ValueError(f"{path} is not a graph store file")
+        header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_length))
+    if header['version'] != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported format version {header['version']}")
+
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    data_start = -(-(16 + header_length) // ALIGNMENT) * ALIGNMENT
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        start = data_start + spec['offset']
+        arrays[name] = mapped[start:start + spec['length'] * dtype.itemsize].view(dtype)
+    return header, arrays
+
+
+def csr_from_lists(lists):
+    """(offsets, values) arrays from a list of integer lists"""
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum([len(values) for values in lists], out=offsets[1:])
+    values = np.fromiter((v for values in lists for v in values), dtype=np.int64, count=int(offsets[-1]))
+    return offsets, values
+
+
+def contig_arrays(graph, contig_graph):
+    """Contig arrays for the store from a contig_graph table (CONTIG_ID, links, SEQUENCE)
+
+    Each contig becomes the range of edge indices of its k-mers, in order.
+    """
+    contig_graph = contig_graph.sort_values('CONTIG_ID')
+    sequences = contig_graph['SEQUENCE'].astype(str).tolist()
+    num_kmers = np.array([max(len(s) - graph.k + 1, 0) for s in sequences], dtype=np.int64)
+
+    contig_offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum(num_kmers, out=contig_offsets[1:])
+    codes = encode_kmers(sequences, graph.k, graph.alphabet)
+    if len(codes) != contig_offsets[-1]:
+        raise ValueError("Contig sequences contain letters outside the graph alphabet")
+    pos = np.minimum(np.searchsorted(graph.edge_codes, codes), max(graph.num_edges - 1, 0))
+    missing = graph.edge_codes[pos] != codes
+    if missing.any():
+        raise ValueError(f"{int(missing.sum())} contig k-mers are not edges of the graph "
+                         f"(e.g. {str(decode_kmers(codes[missing][:1], graph.k, graph.alphabet)[0])!r})")
+    contig_edges = pos.astype(np.int64)
+
+    # Inverted index: occurrences of every edge as (contig, offset of its k-mer)
+    contig_of = np.repeat(np.arange(len(sequences), dtype=np.int64), num_kmers)
+    position = np.arange(len(contig_edges), dtype=np.int64) - contig_offsets[contig_of]
+    order = np.argsort(contig_edges, kind='stable')
+    occ_offsets = np.zeros(graph.num_edges + 1, dtype=np.int64)
+    np.cumsum(np.bincount(contig_edges, minlength=graph.num_edges), out=occ_offsets[1:])
+
+    out_offsets, out_links = csr_from_lists([parse_edge_list(v) for v in contig_graph['OUTGOING_CONTIGS']])
+    in_offsets, in_links = csr_from_lists([parse_edge_list(v) for v in contig_graph['INCOMING_CONTIGS']])
+    return {
+        'edge_occ_offsets': occ_offsets,
+        'edge_occ_contigs': contig_of[order],
+        'edge_occ_positions': position[order],
+        'contig_ids': contig_graph['CONTIG_ID'].to_numpy(dtype=np.int64),
+        'contig_offsets': contig_offsets,
+        'contig_edges': contig_edges,
+        'contig_out_offsets': out_offsets,
+        'contig_out_links': out_links,
+        'contig_in_offsets': in_offsets,
+        'contig_in_links': in_links,
+    }
+
+
+def path_arrays(paths, contig_ids):
+    """Path arrays for the store from lists of CONTIG_IDs, with the contig -> paths inverse"""
+    path_offsets, path_contigs = csr_from_lists(paths)
+    path_contigs = np.searchsorted(contig_ids, path_contigs)
+    path_of = np.repeat(np.arange(len(paths), dtype=np.int64), np.diff(path_offsets))
+
+    order = np.lexsort((path_of, path_contigs))
+    pairs = np.unique(np.stack((path_contigs[order], path_of[order])), axis=1)
+    contig_path_offsets = np.zeros(len(contig_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[0], minlength=len(contig_ids)), out=contig_path_offsets[1:])
+    return {
+        'path_offsets': path_offsets,
+        'path_contigs': path_contigs,
+        'contig_path_offsets': contig_path_offsets,
+        'contig_paths': pairs[1],
+    }
+
+
+def read_paths(path='assembled_paths.txt'):
+    """Contig ID lists from the PATH column ('3->17->5') of assembled_paths.txt"""
+    table = pd.read_csv(path, sep='\t')
+    return [[int(c) for c in str(value).split('->')] for value in table['PATH']]
+
+
+def source_entries(sources):
+    """Header entries (stamp and SHA-256) of the files a store is built from"""
+    return {source: dict(source_stamp(source), sha256=file_hash(source)) for source in sources}
+
+
+def write_store(path, graph, contig_graph=None, paths=None, sources=()):
+    """Write the graph to one file, with its contigs and paths if given
+
+    paths (lists of CONTIG_IDs) need the contig_graph table as well.  sources
+    are the files the data came from, recorded for staleness checks.
+    """
+    arrays = {name: getattr(graph, name) for name in DeBruijnGraph.ARRAYS}
+    if contig_graph is not None:
+        arrays.update(contig_arrays(graph, contig_graph))
+        if paths is not None:
+            arrays.update(path_arrays(paths, arrays['contig_ids']))
+
+    header = {
+        'k': graph.k,
+        'alphabet': graph.alphabet,
+        'num_nodes': graph.num_nodes,
+        'num_edges': graph.num_edges,
+        'num_contigs': 0 if contig_graph is None else len(contig_graph),
+        'num_paths': len(arrays.get('path_offsets', [0])) - 1,
+        'sources': source_entries(sources),
+    }
+    write_arrays(path, header, arrays)
+
+
+class GraphStore:
+    """Read-only, zero-copy view of a graph store file"""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.header, self.arrays = map_arrays(path)
+        self.graph = DeBruijnGraph.from_arrays(self.header['k'], self.header['alphabet'], self.arrays)
+
+    @property
+    def num_contigs(self):
+        return self.header['num_contigs']
+
+    @property
+    def sources(self):
+        return list(self.header.get('sources', {}))
+
+    def stale_sources(self):
+        """Recorded source files that are missing or changed since the store was written (by stamp, then by hash)"""
+        stale = []
+        for source, entry in self.header.get('sources', {}).items():
+            if not os.path.exists(source):
+                stale.append(source)
+            elif source_stamp(source) != {'mtime_ns': entry['mtime_ns'], 'size': entry['size']}:
+                if file_hash(source) != entry['sha256']:
+                    stale.append(source)
+        return stale
+
+    @property
+    def num_paths(self):
+        return self.header.get('num_paths', 0)
+
+    @property
+    def contig_ids(self):
+        return self.arrays['contig_ids']
+
+    def unitigs(self):
+        """The stored contigs as a Unitigs view (edge ranges) over the mapped graph"""
+        if len(self.arrays['contig_edges']) and self.arrays['contig_edges'].min() < 0:
+            raise ValueError(f"{self.path} has contig k-mers that are not graph edges; rebuild it")
+        return Unitigs(self.graph, self.arrays['contig_edges'], self.arrays['contig_offsets'])
+
+    def contig_edges(self, contig):
+        offsets = self.arrays['contig_offsets']
+        return self.arrays['contig_edges'][offsets[contig]:offsets[contig + 1]]
+
+    def outgoing_contigs(self, contig):
+        offsets = self.arrays['contig_out_offsets']
+        return self.arrays['contig_out_links'][offsets[contig]:offsets[contig + 1]]
+
+    def incoming_contigs(self, contig):
+        offsets = self.arrays['contig_in_offsets']
+        return self.arrays['contig_in_links'][offsets[contig]:offsets[contig + 1]]
+
+    def contig_graph_table(self, sequences=True):
+        """Rebuild the contig_graph table (adjacency as lists of ints) from the store"""
+        def split(offsets_name, links_name):
+            bounds = self.arrays[offsets_name].tolist()
+            links = self.arrays[links_name].tolist()
+            return [links[bounds[i]:bounds[i + 1]] for i in range(self.num_contigs)]
+
+        table = pd.DataFrame({
+            'CONTIG_ID': np.asarray(self.contig_ids),
+            'INCOMING_CONTIGS': split('contig_in_offsets', 'contig_in_links'),
+            'OUTGOING_CONTIGS': split('contig_out_offsets', 'contig_out_links'),
+        })
+        if sequences:
+            table['SEQUENCE'] = self.unitigs().sequences()
+        return table
+
+
+def open_store(path=DEFAULT_STORE, source='graph_edges.txt'):
+    """Open a graph store built from the current source, or return None to fall back to the text
+
+    None when the file does not exist, does not record source, or any of its
+    recorded sources changed since it was written.
+    """
+    if not os.path.exists(path):
+        return None
+    store = GraphStore(path)
+    if source not in store.sources:
+        print(f"⚠ {path} does not record being built from {source}; using {source}")
+        return None
+    stale = store.stale_sources()
+    if stale:
+        print(f"⚠ {path} is older than {', '.join(stale)}; using {source} (rebuild with graph_store.py build)")
+        return None
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a memory-mapped graph store")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Write a graph store")
+    build.add_argument('--edges', default='graph_edges.txt')
+    build.add_argument('--contig-graph', default='contig_graph.txt',
+                       help="Contig table to store ('-' to compute unitigs instead)")
+    build.add_argument('--paths', default='assembled_paths.txt',
+                       help="assembled_paths.txt to index ('-' to skip; skipped if missing)")
+    build.add_argument('--out', default=DEFAULT_STORE)
+
+    info = sub.add_parser('info', help="Show a graph store's header")
+    info.add_argument('path', nargs='?', default=DEFAULT_STORE)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        graph = DeBruijnGraph.from_edges_file(args.edges)
+        if args.contig_graph == '-':
+            _, contig_graph = contig_tables(find_unitigs(graph))
+        else:
+            contig_graph = pd.read_csv(args.contig_graph, sep='\t')
+        paths = read_paths(args.paths) if args.paths != '-' and os.path.exists(args.paths) else None
+        sources = [args.edges]
+        if args.contig_graph != '-':
+            sources.append(args.contig_graph)
+        if paths is not None:
+            sources.append(args.paths)
+        write_store(args.out, graph, contig_graph, paths, sources)
+        print(f"✓ Wrote {args.out} ({os.path.getsize(args.out):,} bytes)")
+        print(f"  {graph.num_nodes} nodes, {graph.num_edges} edges, {len(contig_graph)} contigs, "
+              f"{0 if paths is None else len(paths)} paths")
+    else:
+        store = GraphStore(args.path)
+        print(f"Graph store: {args.path}")
+        for key in ('version', 'k', 'alphabet', 'num_nodes', 'num_edges', 'num_contigs', 'num_paths'):
+            print(f"  {key}: {store.header.get(key, 0)}")
+        for name, spec in store.header['arrays'].items():
+            print(f"  - {name}: {spec['length']} x {np.dtype(spec['dtype']).name}")
+        stale = set(store.stale_sources())
+        for source in store.sources:
+            print(f"  source {source}: {'changed since build' if source in stale else 'unchanged'}")
+
+
+if __name__ == "__main__":
+    main()
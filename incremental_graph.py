@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Update the De Bruijn graph and its contigs incrementally as new k-mers arrive
+
+IncrementalAssembly keeps the graph, the contig of every edge and the
+contigs' end nodes.  A batch of new k-mers only re-walks the unitigs that
+touch a node the new edges attach to: those are the only unitigs that can
+split or merge, every other unitig keeps its edges, sequence and CONTIG_ID.
+Counts of k-mers already in the graph are added without touching contigs.
+New edges are kept in an overlay (dicts keyed by edge and node code) on top
+of the CSR graph, so a batch costs time in proportion to its own edges and
+the unitigs they touch; the overlay is folded into a rebuilt graph only when
+it outgrows REBUILD_FRACTION of the graph, or when .graph is read.
+
+Each update returns a delta for contigs_initial.txt and contig_graph.txt:
+rows tagged ACTION = 'remove', 'add' or 'update' (links changed).  New
+contigs get fresh IDs, so IDs stay stable across batches.
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from compact_unitigs import find_unitigs
+from count_kmers import count_kmers, decode_kmers, encode_kmers, sum_by_key, write_graph_edges
+from debruijn_graph import DeBruijnGraph
+
+CONTIG_COLUMNS = ['CONTIG_ID', 'LENGTH', 'START_NODE', 'END_NODE', 'NUM_KMERS', 'SEQUENCE']
+LINK_COLUMNS = ['CONTIG_ID', 'INCOMING_CONTIGS', 'OUTGOING_CONTIGS', 'SEQUENCE']
+REBUILD_FRACTION = 0.25
+
+
+class IncrementalAssembly:
+    """A graph plus contigs with stable IDs that can absorb new k-mers"""
+
+    def __init__(self, graph, contig_ids=None):
+        """Compact the whole graph once; IDs follow sequence order as in compact_unitigs.py
+
+        contig_ids optionally maps sequence -> CONTIG_ID to keep the IDs of an
+        existing contigs_initial.txt.
+        """
+        self.k, self.alphabet, self.bits = graph.k, graph.alphabet, graph.bits
+        self.suffix_mask = (1 << (self.bits * (self.k - 1))) - 1
+        # Counts are added in place, so keep the caller's graph untouched
+        arrays = {name: getattr(graph, name) for name in DeBruijnGraph.ARRAYS}
+        arrays['counts'] = np.array(graph.counts, dtype=np.int64)
+        self.base = DeBruijnGraph.from_arrays(graph.k, graph.alphabet, arrays)
+        self.edge_contig = np.full(graph.num_edges, -1, dtype=np.int64)
+        self.new_counts = {}
+        self.new_contig = {}
+        self.new_out = {}
+        self.new_in = {}
+        self.sequence = {}
+        self.start = {}
+        self.end = {}
+        self.starting = {}
+        self.ending = {}
+
+        unitigs = find_unitigs(graph)
+        sequences = unitigs.sequences()
+        if contig_ids is None:
+            ids = np.empty(len(sequences), dtype=np.int64)
+            ids[np.argsort(np.array(sequences, dtype=object), kind='stable')] = np.arange(len(sequences))
+        else:
+            missing = [s for s in sequences if s not in contig_ids]
+            if missing:
+                raise ValueError(f"{len(missing)} unitigs of the graph are not in the contig table")
+            ids = np.array([contig_ids[s] for s in sequences], dtype=np.int64)
+        self.next_id = int(ids.max()) + 1 if len(ids) else 0
+        self._insert(graph.edge_codes[unitigs.edges], unitigs.num_kmers, sequences, ids)
+
+    @property
+    def graph(self):
+        """The whole graph as a DeBruijnGraph (folds the overlay in first)"""
+        if self.new_counts:
+            self._rebuild()
+        return self.base
+
+    def _rebuild(self):
+        base = self.base
+        codes = np.fromiter(self.new_counts, dtype=np.uint64, count=len(self.new_counts))
+        counts = np.fromiter(self.new_counts.values(), dtype=np.int64, count=len(codes))
+        contigs = np.fromiter((self.new_contig[code] for code in self.new_counts), dtype=np.int64, count=len(codes))
+        graph = DeBruijnGraph(np.concatenate((base.edge_codes, codes)), np.concatenate((base.counts, counts)),
+                              self.k, self.alphabet)
+        edge_contig = np.empty(graph.num_edges, dtype=np.int64)
+        edge_contig[np.searchsorted(graph.edge_codes, base.edge_codes)] = self.edge_contig
+        edge_contig[np.searchsorted(graph.edge_codes, codes)] = contigs
+        self.base, self.edge_contig = graph, edge_contig
+        self.new_counts, self.new_contig, self.new_out, self.new_in = {}, {}, {}, {}
+
+    def _base_positions(self, codes):
+        """(positions, found) of edge codes among the CSR graph's edges"""
+        edge_codes = self.base.edge_codes
+        positions = np.minimum(np.searchsorted(edge_codes, codes), max(len(edge_codes) - 1, 0))
+        found = (edge_codes[positions] == codes) if len(edge_codes) else np.zeros(len(codes), dtype=bool)
+        return positions, found
+
+    def _base_node(self, node):
+        node_codes = self.base.node_codes
+        i = int(np.searchsorted(node_codes, np.uint64(node)))
+        return i if i < len(node_codes) and node_codes[i] == node else -1
+
+    def _out_codes(self, node):
+        """Codes of the edges leaving a node (given by code), overlay included"""
+        i = self._base_node(node)
+        base = self.base
+        codes = base.edge_codes[base.offsets[i]:base.offsets[i + 1]].tolist() if i >= 0 else []
+        return codes + self.new_out.get(node, [])
+
+    def _in_codes(self, node):
+        """Codes of the edges entering a node (given by code), overlay included"""
+        i = self._base_node(node)
+        codes = self.base.edge_codes[self.base.incoming_edges(i)].tolist() if i >= 0 else []
+        return codes + self.new_in.get(node, [])
+
+    def _contigs_of(self, codes):
+        codes = np.asarray(codes, dtype=np.uint64)
+        positions, found = self._base_positions(codes)
+        contigs = self.edge_contig[positions[found]].tolist()
+        contigs += [self.new_contig[code] for code in codes[~found].tolist()]
+        return contigs
+
+    def _walk(self, subset):
+        """Unitigs made of the subset's edges (sorted codes, a union of whole unitigs) as code lists
+
+        Same order as find_unitigs(): paths from branching nodes first, then
+        cycles started at their smallest code.
+        """
+        shift, mask = self.bits, self.suffix_mask
+        simple = {}
+
+        def is_simple(node):
+            if node not in simple:
+                simple[node] = len(self._out_codes(node)) == 1 and len(self._in_codes(node)) == 1
+            return simple[node]
+
+        paths = []
+        used = set()
+        for code in subset:
+            if is_simple(code >> shift):
+                continue
+            path = [code]
+            node = code & mask
+            while is_simple(node):
+                code = self._out_codes(node)[0]
+                path.append(code)
+                node = code & mask
+            paths.append(path)
+            used.update(path)
+
+        # Whatever is left forms cycles made only of 1-in-1-out nodes
+        for code in subset:
+            if code in used:
+                continue
+            start = code >> shift
+            path = []
+            while True:
+                path.append(code)
+                used.add(code)
+                node = code & mask
+                if node == start:
+                    break
+                code = self._out_codes(node)[0]
+            paths.append(path)
+        return paths
+
+    def _spell(self, path):
+        letter_mask = (1 << self.bits) - 1
+        head = decode_kmers(np.array([path[0] >> self.bits], dtype=np.uint64), self.k - 1, self.alphabet)[0]
+        return head + ''.join(self.alphabet[code & letter_mask] for code in path)
+
+    def _insert(self, codes, lengths, sequences, ids):
+        codes = np.asarray(codes, dtype=np.uint64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        starts = (codes[offsets[:-1]] >> np.uint64(self.bits)).tolist()
+        ends = (codes[offsets[1:] - 1] & np.uint64(self.suffix_mask)).tolist()
+
+        path_ids = np.repeat(ids, lengths)
+        positions, found = self._base_positions(codes)
+        self.edge_contig[positions[found]] = path_ids[found]
+        self.new_contig.update(zip(codes[~found].tolist(), path_ids[~found].tolist()))
+        for contig, sequence, start, end in zip(ids.tolist(), sequences, starts, ends):
+            self.sequence[contig] = sequence
+            self.start[contig] = start
+            self.end[contig] = end
+            self.starting.setdefault(start, set()).add(contig)
+            self.ending.setdefault(end, set()).add(contig)
+
+    def _remove(self, contig):
+        self.starting[self.start[contig]].discard(contig)
+        self.ending[self.end[contig]].discard(contig)
+        del self.sequence[contig], self.start[contig], self.end[contig]
+
+    def links(self, contig):
+        """(incoming, outgoing) sorted contig IDs: contigs ending where this one starts, and vice versa"""
+        return (sorted(self.ending.get(self.start[contig], ())),
+                sorted(self.starting.get(self.end[contig], ())))
+
+    def update(self, kmers, counts=None):
+        """Add k-mer strings (with counts, default 1 each); returns (contigs delta, contig_graph delta)"""
+        kmers = list(kmers)
+        codes = encode_kmers(kmers, self.k, self.alphabet)
+        if len(codes) != len(kmers) or any(len(kmer) != self.k for kmer in kmers):
+            raise ValueError("All k-mers must have length k and use only alphabet letters")
+        return self.update_codes(codes, np.ones(len(codes), dtype=np.int64) if counts is None else counts)
+
+    def update_codes(self, codes, counts):
+        """Add packed k-mers with counts; returns (contigs delta, contig_graph delta)"""
+        codes, counts = sum_by_key(np.asarray(codes, dtype=np.uint64), np.asarray(counts, dtype=np.int64))
+        positions, found = self._base_positions(codes)
+        np.add.at(self.base.counts, positions[found], counts[found])
+
+        new_edges = []
+        for code, count in zip(codes[~found].tolist(), counts[~found].tolist()):
+            if code in self.new_counts:
+                self.new_counts[code] += count
+                continue
+            self.new_counts[code] = count
+            self.new_contig[code] = -1
+            self.new_out.setdefault(code >> self.bits, []).append(code)
+            self.new_in.setdefault(code & self.suffix_mask, []).append(code)
+            new_edges.append(code)
+        if not new_edges:
+            return self._contig_rows('add', []), self._link_rows('add', [])
+
+        # Unitigs through any node a new edge attaches to may split or merge
+        affected = {code >> self.bits for code in new_edges} | {code & self.suffix_mask for code in new_edges}
+        incident = [code for node in affected for code in self._out_codes(node) + self._in_codes(node)]
+        touched = sorted({contig for contig in self._contigs_of(incident) if contig >= 0})
+        touched_edges = encode_kmers([self.sequence[c] for c in touched], self.k, self.alphabet)
+        subset = np.union1d(touched_edges, np.array(new_edges, dtype=np.uint64)).tolist()
+
+        paths = self._walk(subset)
+        sequences = [self._spell(path) for path in paths]
+
+        # Contigs whose links may change: neighbours at the end nodes of removed or added contigs
+        nodes = {self.start[c] for c in touched} | {self.end[c] for c in touched}
+        nodes |= {path[0] >> self.bits for path in paths} | {path[-1] & self.suffix_mask for path in paths}
+        before = {c: self.links(c) for c in self._neighbours(nodes)}
+
+        kept = {self.sequence[c]: c for c in touched}
+        ids = []
+        for sequence in sequences:
+            if sequence in kept:
+                ids.append(kept.pop(sequence))
+            else:
+                ids.append(self.next_id)
+                self.next_id += 1
+        removed = sorted(kept.values())
+        added = sorted(set(ids) - set(touched))
+
+        for contig in touched:
+            self._remove(contig)
+        self._insert([code for path in paths for code in path], [len(path) for path in paths], sequences, ids)
+
+        after = {c: self.links(c) for c in self._neighbours(nodes)}
+        changed = sorted(c for c in after if c not in added and before.get(c) != after[c])
+
+        if len(self.new_counts) > REBUILD_FRACTION * max(self.base.num_edges, 1):
+            self._rebuild()
+
+        contigs_delta = pd.concat([self._contig_rows('remove', removed, removed=True),
+                                   self._contig_rows('add', added)], ignore_index=True)
+        links_delta = pd.concat([self._link_rows('remove', removed, removed=True),
+                                 self._link_rows('add', added),
+                                 self._link_rows('update', changed)], ignore_index=True)
+        return contigs_delta, links_delta
+
+    def _neighbours(self, nodes):
+        contigs = set()
+        for node in nodes:
+            contigs |= self.starting.get(node, set()) | self.ending.get(node, set())
+        return contigs
+
+    def _contig_rows(self, action, ids, removed=False):
+        if removed:
+            return pd.DataFrame({'ACTION': action, 'CONTIG_ID': ids}, columns=['ACTION'] + CONTIG_COLUMNS)
+        sequences = [self.sequence[c] for c in ids]
+        return pd.DataFrame({
+            'ACTION': action,
+            'CONTIG_ID': ids,
+            'LENGTH': [len(s) for s in sequences],
+            'START_NODE': decode_kmers(np.array([self.start[c] for c in ids], dtype=np.uint64),
+                                       self.k - 1, self.alphabet),
+            'END_NODE': decode_kmers(np.array([self.end[c] for c in ids], dtype=np.uint64),
+                                     self.k - 1, self.alphabet),
+            'NUM_KMERS': [len(s) - self.k + 1 for s in sequences],
+            'SEQUENCE': sequences,
+        }, columns=['ACTION'] + CONTIG_COLUMNS)
+
+    def _link_rows(self, action, ids, removed=False):
+        if removed:
+            return pd.DataFrame({'ACTION': action, 'CONTIG_ID': ids}, columns=['ACTION'] + LINK_COLUMNS)
+        links = [self.links(c) for c in ids]
+        return pd.DataFrame({
+            'ACTION': action,
+            'CONTIG_ID': ids,
+            'INCOMING_CONTIGS': [','.join(map(str, incoming)) for incoming, _ in links],
+            'OUTGOING_CONTIGS': [','.join(map(str, outgoing)) for _, outgoing in links],
+            'SEQUENCE': [self.sequence[c] for c in ids],
+        }, columns=['ACTION'] + LINK_COLUMNS)
+
+    def tables(self):
+        """Full contigs_initial and contig_graph tables for the current state"""
+        ids = sorted(self.sequence)
+        contigs = self._contig_rows('', ids).drop(columns='ACTION')
+        contigs = contigs.sort_values(['LENGTH', 'CONTIG_ID'], ascending=[False, True])
+        return contigs, self._link_rows('', ids).drop(columns='ACTION')
+
+
+def apply_delta(table, delta):
+    """Patch a contigs_initial or contig_graph table with a delta from update()"""
+    gone = delta.loc[delta['ACTION'] != 'add', 'CONTIG_ID']
+    rows = delta.loc[delta['ACTION'] != 'remove', table.columns]
+    patched = pd.concat([table[~table['CONTIG_ID'].isin(gone)], rows], ignore_index=True)
+    return patched.astype(table.dtypes.to_dict())
+
+
+def read_kmer_counts(path):
+    """K-mers and counts from a kmers_data.txt style file (kmer<TAB>count, no header)"""
+    table = pd.read_csv(path, sep='\t', header=None, names=['kmer', 'count'], keep_default_na=False)
+    return table['kmer'].tolist(), table['count'].to_numpy(dtype=np.int64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add new k-mers to the graph and write contig deltas")
+    parser.add_argument('--edges', default='graph_edges.txt')
+    parser.add_argument('--contigs', help="Keep the CONTIG_IDs of this contigs_initial table "
+                                           "(default: number contigs as compact_unitigs.py does)")
+    parser.add_argument('--kmers', nargs='*', default=[], help="New k-mer batches (kmer<TAB>count files)")
+    parser.add_argument('--reads', nargs='*', default=[], help="New read files, counted as one batch each")
+    parser.add_argument('--contigs-delta', default='contigs_delta.txt')
+    parser.add_argument('--graph-delta', default='contig_graph_delta.txt')
+    parser.add_argument('--edges-out', help="Also write the updated graph_edges table here")
+    args = parser.parse_args()
+
+    graph = DeBruijnGraph.from_edges_file(args.edges)
+    contig_ids = None
+    if args.contigs:
+        contigs = pd.read_csv(args.contigs, sep='\t')
+        contig_ids = dict(zip(contigs['SEQUENCE'], contigs['CONTIG_ID']))
+    assembly = IncrementalAssembly(graph, contig_ids)
+    print(f"Graph loaded: {graph.num_nodes} nodes, {graph.num_edges} edges, {len(assembly.sequence)} contigs")
+
+    batches = [read_kmer_counts(path) for path in args.kmers]
+    for path in args.reads:
+        codes, counts = count_kmers([path], k=graph.k, alphabet=graph.alphabet)
+        batches.append((decode_kmers(codes, graph.k, graph.alphabet).tolist(), counts))
+
+    contig_deltas, graph_deltas = [], []
+    for number, (kmers, counts) in enumerate(batches, 1):
+        contigs_delta, graph_delta = assembly.update(kmers, counts)
+        contigs_delta.insert(0, 'BATCH', number)
+        graph_delta.insert(0, 'BATCH', number)
+        contig_deltas.append(contigs_delta)
+        graph_deltas.append(graph_delta)
+        actions = graph_delta['ACTION'].value_counts()
+        print(f"  Batch {number}: {len(kmers)} k-mers -> {actions.get('remove', 0)} contigs removed, "
+              f"{actions.get('add', 0)} added, {actions.get('update', 0)} relinked")
+
+    if contig_deltas:
+        pd.concat(contig_deltas, ignore_index=True).to_csv(args.contigs_delta, sep='\t', index=False)
+        print(f"✓ Wrote {args.contigs_delta}")
+        pd.concat(graph_deltas, ignore_index=True).to_csv(args.graph_delta, sep='\t', index=False)
+        print(f"✓ Wrote {args.graph_delta}")
+    if args.edges_out:
+        graph = assembly.graph
+        write_graph_edges(args.edges_out, graph.edge_codes, graph.counts, graph.k, graph.alphabet)
+        print(f"✓ Wrote {args.edges_out}")
+    print(f"\nGraph now: {assembly.graph.num_nodes} nodes, {assembly.graph.num_edges} edges, "
+          f"{len(assembly.sequence)} contigs")
+
+
+if __name__ == "__main__":
+    main()
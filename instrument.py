@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Lightweight stage timers, counters and memory snapshots
+
+Disabled by default: stage() then returns a shared no-op context manager and
+count() returns immediately, so instrumented code pays one global check.
+Enable it for any script with environment variables:
+
+    DEBRUIJN_TRACE=trace.json      write a JSON trace when the process exits
+    DEBRUIJN_PROFILE=profiles/     also dump a cProfile file per top-level stage
+
+or call enable() directly.  Each stage records wall time, RSS at start and
+end, peak RSS so far and its counters (rows scanned, nodes visited, paths
+expanded, ...).  Hot loops should count into a local variable and call
+count() once with the total.  Process pool workers do not report back, so
+parallel stages count their merged results in the parent.
+"""
+import atexit
+import cProfile
+import functools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+_trace = None
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+class Trace:
+    """Collected stage records, counters and snapshots of one process"""
+
+    def __init__(self, path=None, profile_dir=None):
+        self.path = path
+        self.profile_dir = profile_dir
+        self.start = time.perf_counter()
+        self.stages = []
+        self.stack = []
+        self.counters = {}
+        self.snapshots = []
+        self.profiles = 0
+
+    def to_dict(self):
+        return {
+            'argv': sys.argv,
+            'pid': os.getpid(),
+            'seconds': time.perf_counter() - self.start,
+            'peak_rss_mb': peak_rss_mb(),
+            'counters': self.counters,
+            'stages': self.stages,
+            'snapshots': self.snapshots,
+        }
+
+    def write(self, path=None):
+        path = path or self.path
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+        self.profile = None
+
+    def __enter__(self):
+        trace = self.trace
+        self.record = {
+            'name': self.name,
+            'parent': trace.stack[-1]['name'] if trace.stack else None,
+            'depth': len(trace.stack),
+            'start_s': time.perf_counter() - trace.start,
+            'rss_start_mb': rss_mb(),
+            'counters': {},
+        }
+        # cProfile cannot nest, so only top-level stages are profiled
+        if trace.profile_dir and not trace.stack:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        trace.stack.append(self.record)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.started
+        trace = self.trace
+        if self.profile is not None:
+            self.profile.disable()
+            os.makedirs(trace.profile_dir, exist_ok=True)
+            trace.profiles += 1
+            self.record['profile'] = os.path.join(trace.profile_dir, f'{trace.profiles:03d}-{self.name}.prof')
+            self.profile.dump_stats(self.record['profile'])
+        trace.stack.pop()
+        self.record.update(seconds=seconds, rss_end_mb=rss_mb(), peak_rss_mb=peak_rss_mb(),
+                           failed=exc[0] is not None)
+        trace.stages.append(self.record)
+        return False
+
+
+def enable(path=None, profile_dir=None):
+    """Start collecting; the trace is written to path (if given) at exit"""
+    global _trace
+    _trace = Trace(path, profile_dir)
+    if path:
+        atexit.register(_write_at_exit, _trace)
+    return _trace
+
+
+def disable():
+    """Stop collecting and return the trace collected so far"""
+    global _trace
+    trace, _trace = _trace, None
+    return trace
+
+
+def enabled():
+    return _trace is not None
+
+
+def _write_at_exit(trace):
+    if trace.path:
+        trace.write()
+
+
+def stage(name):
+    """Context manager timing a stage (a no-op when disabled)"""
+    if _trace is None:
+        return NULL_STAGE
+    return _Stage(_trace, name)
+
+
+def timed(name):
+    """Decorator: run the function as a stage"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _trace is None:
+                return func(*args, **kwargs)
+            with _Stage(_trace, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add n to a counter of the current stage and to the process totals"""
+    if _trace is None:
+        return
+    _trace.counters[name] = _trace.counters.get(name, 0) + n
+    if _trace.stack:
+        counters = _trace.stack[-1]['counters']
+        counters[name] = counters.get(name, 0) + n
+
+
+def snapshot(label):
+    """Record the current RSS under a label"""
+    if _trace is None:
+        return
+    _trace.snapshots.append({'label': label, 't': time.perf_counter() - _trace.start,
+                             'stage': _trace.stack[-1]['name'] if _trace.stack else None, 'rss_mb': rss_mb()})
+
+
+def summary(trace):
+    """Lines describing a trace's stages in start order, nested stages indented"""
+    lines = []
+    for record in sorted(trace['stages'], key=lambda r: r['start_s']):
+        counters = ', '.join(f"{k}={v:,}" for k, v in record['counters'].items())
+        lines.append(f"  {'  ' * record['depth']}{record['name']:<24}{record['seconds']:9.3f}s "
+                     f"{record['rss_end_mb']:8.1f} MB  {counters}")
+    return lines
+
+
+# Worker processes inherit the environment but must not overwrite the parent's trace
+if ((os.environ.get('DEBRUIJN_TRACE') or os.environ.get('DEBRUIJN_PROFILE'))
+        and multiprocessing.parent_process() is None):
+    enable(os.environ.get('DEBRUIJN_TRACE'), os.environ.get('DEBRUIJN_PROFILE'))
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: instrument.py TRACE.json")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        trace = json.load(f)
+    print(f"Trace of: {' '.join(trace['argv'])}")
+    print(f"Total: {trace['seconds']:.3f}s, peak RSS {trace['peak_rss_mb']:.1f} MB")
+    print("\n".join(summary(trace)))
+    if trace['counters']:
+        print("\nCounters:")
+        for name, value in trace['counters'].items():
+            print(f"  {name}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
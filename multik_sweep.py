@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Assemble at several k values from one counting pass
+
+Reads are counted once at the largest k (K).  Every k-mer occurrence that
+starts at least K - k letters before the end of its read is the k-letter
+prefix of a K-mer occurrence, so its count is the sum of the counts of the
+K-mers with that prefix, and a packed prefix is just the K-mer code shifted
+right.  The remaining occurrences lie in the last K - 1 letters of each read,
+which are kept from the same pass.  Reads are first split at letters
+outside the alphabet, which break k-mers of every length.  The derived counts
+are exactly what count_kmers.py would give at k.
+
+For each k the graph is compacted into unitigs and the sweep reports contig
+count, N50 and total length.
+"""
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import instrument
+from compact_unitigs import find_unitigs, n50
+from count_kmers import (DEFAULT_ALPHABET, DEFAULT_CHUNK_SIZE, bits_per_symbol, build_lookup,
+                         count_codes, encode_kmers, iter_read_chunks, max_k, merge_counts,
+                         normalize_alphabet, push_run, sum_by_key)
+from debruijn_graph import DeBruijnGraph
+
+DEFAULT_K_VALUES = '4,5,6,7,8'
+
+
+def parse_k_values(value):
+    """'4,5,6' or '4-8' -> sorted list of distinct k values"""
+    ks = set()
+    for part in value.split(','):
+        if '-' in part:
+            low, high = part.split('-')
+            ks.update(range(int(low), int(high) + 1))
+        elif part.strip():
+            ks.add(int(part))
+    return sorted(ks)
+
+
+@instrument.timed('count_kmers')
+def count_with_tails(paths, k_max, alphabet=DEFAULT_ALPHABET, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Counts of all k_max-mers plus the last k_max - 1 letters of every read segment"""
+    alphabet = normalize_alphabet(alphabet)
+    lookup = build_lookup(alphabet)
+    breaks = re.compile('[^' + re.escape(alphabet + alphabet.upper()) + ']+')
+
+    runs = []
+    tails = []
+    for chunk in iter_read_chunks(paths, fmt=fmt, alphabet=alphabet, chunk_size=chunk_size):
+        instrument.count('reads_scanned', len(chunk))
+        chunk = [segment for read in chunk for segment in breaks.split(read) if segment]
+        chunk_codes = encode_kmers(chunk, k_max, alphabet, lookup)
+        instrument.count('kmers_scanned', len(chunk_codes))
+        push_run(runs, count_codes(chunk_codes))
+        # A segment shorter than k_max is all tail
+        tails.extend(read[-(k_max - 1):] for read in chunk)
+    codes, counts = merge_counts(runs)
+    return codes, counts, tails
+
+
+def derive_counts(codes, counts, tails, k_max, k, alphabet=DEFAULT_ALPHABET):
+    """Exact k-mer counts (k <= k_max) from k_max-mer counts and the read tails"""
+    if k > k_max:
+        raise ValueError(f"k={k} is larger than the counted k={k_max}")
+    alphabet = normalize_alphabet(alphabet)
+    shift = np.uint64(bits_per_symbol(alphabet) * (k_max - k))
+    tail_codes = encode_kmers(tails, k, alphabet)
+    keys = np.concatenate((codes >> shift, tail_codes))
+    values = np.concatenate((counts, np.ones(len(tail_codes), dtype=np.int64)))
+    return sum_by_key(keys, values)
+
+
+def assembly_stats(codes, counts, k, alphabet=DEFAULT_ALPHABET, min_count=1):
+    """Graph and contig statistics of the assembly at one k"""
+    solid = counts >= min_count
+    codes, counts = codes[solid], counts[solid]
+    stats = {'k': k, 'kmers': len(codes), 'nodes': 0, 'contigs': 0, 'n50': 0, 'total_length': 0, 'longest': 0}
+    if len(codes) == 0:
+        return stats
+    graph = DeBruijnGraph(codes, counts, k, alphabet)
+    lengths = find_unitigs(graph).lengths
+    stats.update(nodes=graph.num_nodes, contigs=len(lengths), n50=n50(lengths),
+                 total_length=int(lengths.sum()), longest=int(lengths.max()))
+    return stats
+
+
+def sweep(paths, k_values, alphabet=DEFAULT_ALPHABET, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, min_count=1):
+    """Statistics table with one row per k, from a single count at max(k_values)"""
+    k_max = max(k_values)
+    codes, counts, tails = count_with_tails(paths, k_max, alphabet, fmt, chunk_size)
+    rows = []
+    for k in sorted(k_values, reverse=True):
+        with instrument.stage(f'assemble_k{k}'):
+            k_codes, k_counts = derive_counts(codes, counts, tails, k_max, k, alphabet)
+            rows.append(assembly_stats(k_codes, k_counts, k, alphabet, min_count))
+    return pd.DataFrame(rows).sort_values('k').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assemble at several k values from one k-mer count")
+    parser.add_argument('reads', nargs='+', help="Read files (plain text, FASTA or FASTQ)")
+    parser.add_argument('--k-values', default=DEFAULT_K_VALUES,
+                        help="k values as a list and/or ranges, e.g. '4,5,6' or '4-8' (default: 4,5,6,7,8)")
+    parser.add_argument('--min-count', type=int, default=1,
+                        help="Drop k-mers seen fewer times than this before assembling (default: 1)")
+    parser.add_argument('--alphabet', default=DEFAULT_ALPHABET, help="Letters to count (default: a-z)")
+    parser.add_argument('--format', choices=['text', 'fasta', 'fastq'], help="Read format (default: auto-detect)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Reads per counting chunk")
+    parser.add_argument('--out', default='multik_sweep.txt', help="Tab-separated report")
+    args = parser.parse_args()
+
+    alphabet = normalize_alphabet(args.alphabet)
+    k_values = parse_k_values(args.k_values)
+    if not k_values or min(k_values) < 2 or max(k_values) > max_k(alphabet):
+        parser.error(f"k values must be between 2 and {max_k(alphabet)}")
+    for path in args.reads:
+        if not os.path.exists(path):
+            parser.error(f"File not found: {path}")
+
+    print(f"Counting {max(k_values)}-mers once for k = {', '.join(map(str, k_values))}")
+    report = sweep(args.reads, k_values, alphabet, args.format, args.chunk_size, args.min_count)
+    report.to_csv(args.out, sep='\t', index=False)
+
+    print("\n" + "="*80)
+    print("MULTI-K ASSEMBLY SWEEP")
+    print("="*80)
+    print(report.to_string(index=False))
+    best = report.loc[report['n50'].idxmax()]
+    print(f"\nLargest N50: k={int(best['k'])} ({int(best['n50'])} letters, {int(best['contigs'])} contigs)")
+    print(f"✓ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Out-of-core, minimizer-partitioned k-mer counting and graph build
+
+For read sets whose distinct k-mers do not fit in memory.  Reads are cut into
+super-k-mers (runs of consecutive k-mers sharing a minimizer) and each
+super-k-mer is appended to a bucket file chosen by its minimizer, so every
+occurrence of a k-mer lands in the same bucket.  Buckets are then counted one
+at a time and their sorted results (k-mer, prefix and suffix totals) are kept
+on disk as .npy runs, merged block by block, and streamed into
+kmers_data.txt and graph_edges.txt.  Peak memory depends on the bucket and
+block sizes, not on the size of the dataset.
+
+Contigs are compacted one bucket at a time as well: a bucket's edges are
+chained through 1-in-1-out nodes (looked up in merged, memory-mapped degree
+runs) as long as the next edge is in the same bucket.  The resulting
+fragments keep only their end codes in memory and write their letters to a
+file on disk; fragments are then stitched across buckets at their simple end
+nodes.  Memory for this step grows with the number of unitig fragments, not
+with the number of k-mers, and the tables equal those of compact_unitigs.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from compact_unitigs import format_links
+from count_kmers import (DEFAULT_ALPHABET, DEFAULT_CHUNK_SIZE, DEFAULT_K, SHARD_HASH,
+                         bits_per_symbol, build_lookup, count_codes, decode_kmers,
+                         encode_kmers, iter_read_chunks, merge_counts, normalize_alphabet,
+                         sum_by_key)
+
+DEFAULT_BUCKETS = 64
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+
+def window_codes(ranks, width, bits):
+    """Packed code of every width-letter window of a rank array (invalid letters included)"""
+    symbols = np.maximum(ranks, 0).astype(np.uint64)
+    codes = np.zeros(len(ranks) - width + 1, dtype=np.uint64)
+    for offset in range(width):
+        codes <<= np.uint64(bits)
+        codes |= symbols[offset:len(symbols) - width + 1 + offset]
+    return codes
+
+
+def super_kmers(reads, k, m, alphabet, lookup, num_buckets):
+    """Split a chunk of reads into (bucket, start, end) super-k-mers of the joined buffer
+
+    The minimizer of a k-mer is its m-mer with the smallest hash; consecutive
+    valid k-mers whose minimizers map to the same bucket form one super-k-mer.
+    """
+    buffer = '\n'.join(reads).encode('ascii', 'replace')
+    ranks = lookup[np.frombuffer(buffer, dtype=np.uint8)]
+    if len(ranks) < k:
+        return buffer, np.empty((0, 3), dtype=np.int64)
+
+    bad_prefix = np.concatenate(([0], np.cumsum(ranks < 0)))
+    valid = (bad_prefix[k:] - bad_prefix[:-k]) == 0
+
+    hashed = window_codes(ranks, m, bits_per_symbol(alphabet)) * SHARD_HASH
+    minimizers = np.lib.stride_tricks.sliding_window_view(hashed, k - m + 1).min(axis=1)
+    buckets = ((minimizers >> np.uint64(32)) % np.uint64(num_buckets)).astype(np.int64)
+
+    # A new super-k-mer starts at every valid window whose predecessor is invalid or in another bucket
+    positions = np.flatnonzero(valid)
+    if len(positions) == 0:
+        return buffer, np.empty((0, 3), dtype=np.int64)
+    starts = np.ones(len(positions), dtype=bool)
+    starts[1:] = (np.diff(positions) != 1) | (buckets[positions[1:]] != buckets[positions[:-1]])
+    first = np.flatnonzero(starts)
+    last = np.append(first[1:], len(positions)) - 1
+
+    return buffer, np.column_stack((buckets[positions[first]], positions[first], positions[last] + k))
+
+
+def partition_reads(paths, workdir, k=DEFAULT_K, m=None, num_buckets=DEFAULT_BUCKETS,
+                    alphabet=DEFAULT_ALPHABET, fmt=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write every read's super-k-mers to bucket files; returns the bucket file paths"""
+    alphabet = normalize_alphabet(alphabet)
+    m = m or max(1, (k + 1) // 2)
+    if not 0 < m <= k:
+        raise ValueError(f"Minimizer length must be between 1 and k={k}, got {m}")
+    lookup = build_lookup(alphabet)
+
+    bucket_paths = [os.path.join(workdir, f'bucket_{i:05d}.txt') for i in range(num_buckets)]
+    files = [open(path, 'wb') for path in bucket_paths]
+    try:
+        for chunk in iter_read_chunks(paths, fmt=fmt, alphabet=alphabet, chunk_size=chunk_size):
+            buffer, pieces = super_kmers(chunk, k, m, alphabet, lookup, num_buckets)
+            pieces = pieces[np.argsort(pieces[:, 0], kind='stable')]
+            bounds = np.searchsorted(pieces[:, 0], np.arange(num_buckets + 1))
+            for bucket in np.flatnonzero(np.diff(bounds)).tolist():
+                rows = pieces[bounds[bucket]:bounds[bucket + 1]].tolist()
+                files[bucket].write(b'\n'.join(buffer[s:e] for _, s, e in rows) + b'\n')
+    finally:
+        for f in files:
+            f.close()
+    return bucket_paths
+
+
+def count_bucket(path, k, alphabet):
+    """Count the k-mers of one bucket file"""
+    with open(path, 'r') as f:
+        reads = f.read().split('\n')
+    return count_codes(encode_kmers(reads, k, alphabet))
+
+
+def save_run(workdir, name, keys, values):
+    """Store a sorted (keys, values) run as two .npy files"""
+    base = os.path.join(workdir, name)
+    np.save(base + '.keys.npy', keys)
+    np.save(base + '.values.npy', values)
+    return base
+
+
+def merge_runs(runs, out_base, block_size=DEFAULT_BLOCK_SIZE):
+    """Merge sorted on-disk runs into one sorted run, summing values of equal keys
+
+    Each step reads at most block_size keys from every run: everything up to
+    the smallest last key among the current blocks is merged and appended to
+    the output, so memory is bounded by len(runs) * block_size.
+    """
+    sources = [(np.load(base + '.keys.npy', mmap_mode='r'), np.load(base + '.values.npy', mmap_mode='r'))
+               for base in runs]
+    sources = [s for s in sources if len(s[0])]
+    cursors = [0] * len(sources)
+
+    out_keys, out_values = [], []
+    total = 0
+    while True:
+        active = [i for i, (keys, _) in enumerate(sources) if cursors[i] < len(keys)]
+        if not active:
+            break
+        boundary = min(sources[i][0][min(cursors[i] + block_size, len(sources[i][0])) - 1] for i in active)
+
+        parts = []
+        for i in active:
+            keys, values = sources[i]
+            stop = cursors[i] + int(np.searchsorted(keys[cursors[i]:cursors[i] + block_size],
+                                                    boundary, side='right'))
+            parts.append((np.asarray(keys[cursors[i]:stop]), np.asarray(values[cursors[i]:stop])))
+            cursors[i] = stop
+
+        keys, values = merge_counts(parts)
+        block_base = f'{out_base}.block{len(out_keys):06d}'
+        np.save(block_base + '.keys.npy', keys)
+        np.save(block_base + '.values.npy', values)
+        out_keys.append(block_base + '.keys.npy')
+        out_values.append(block_base + '.values.npy')
+        total += len(keys)
+
+    # Stitch the blocks into one memory-mappable file per column
+    for column, blocks, dtype in (('keys', out_keys, np.uint64), ('values', out_values, np.int64)):
+        merged = np.lib.format.open_memmap(f'{out_base}.{column}.npy', mode='w+', dtype=dtype, shape=(total,))
+        position = 0
+        for block in blocks:
+            data = np.load(block)
+            merged[position:position + len(data)] = data
+            position += len(data)
+            os.remove(block)
+        merged.flush()
+        del merged
+    return out_base
+
+
+def load_run(base):
+    return np.load(base + '.keys.npy', mmap_mode='r'), np.load(base + '.values.npy', mmap_mode='r')
+
+
+def write_outputs(kmer_run, prefix_run, suffix_run, k, alphabet, kmers_out, edges_out,
+                  block_size=DEFAULT_BLOCK_SIZE):
+    """Stream kmers_data.txt and graph_edges.txt from the merged runs, block by block"""
+    codes, counts = load_run(kmer_run)
+    prefix_keys, prefix_totals = load_run(prefix_run)
+    suffix_keys, suffix_totals = load_run(suffix_run)
+    bits = bits_per_symbol(alphabet)
+    suffix_mask = np.uint64((1 << (bits * (k - 1))) - 1)
+
+    with open(kmers_out, 'w') as kmers_file, open(edges_out, 'w') as edges_file:
+        edges_file.write('PREFIX\tSUFFIX\tKMER\tCOUNT\tOUT_DEG\tIN_DEG\n')
+        for start in range(0, len(codes), block_size):
+            block = np.asarray(codes[start:start + block_size])
+            block_counts = np.asarray(counts[start:start + block_size])
+            prefixes = block >> np.uint64(bits)
+            suffixes = block & suffix_mask
+
+            out_deg = np.asarray(prefix_totals[np.searchsorted(prefix_keys, prefixes)])
+            in_deg = np.asarray(suffix_totals[np.searchsorted(suffix_keys, suffixes)])
+            kmers = decode_kmers(block, k, alphabet)
+            prefix_labels = decode_kmers(prefixes, k - 1, alphabet)
+            suffix_labels = decode_kmers(suffixes, k - 1, alphabet)
+
+            kmers_file.writelines(f"{kmer}\t{count}\n" for kmer, count in zip(kmers, block_counts))
+            edges_file.writelines(f"{p}\t{s}\t{kmer}\t{count}\t{o}\t{i}\n" for p, s, kmer, count, o, i
+                                  in zip(prefix_labels, suffix_labels, kmers, block_counts, out_deg, in_deg))
+
+
+def run_values(run, keys):
+    """Values of keys in a merged run (0 for keys not in it)"""
+    run_keys, run_totals = load_run(run)
+    positions = np.searchsorted(run_keys, keys)
+    found = positions < len(run_keys)
+    found[found] = run_keys[positions[found]] == keys[found]
+    values = np.zeros(len(keys), dtype=np.int64)
+    values[found] = run_totals[positions[found]]
+    return values
+
+
+def bucket_fragments(codes, simple_target, bits, suffix_mask):
+    """Chain a bucket's sorted edges through simple nodes; returns (order, offsets)
+
+    An edge follows the previous one when the node between them is 1-in-1-out
+    and both edges are in this bucket.  Chains start at edges without such a
+    predecessor; the edges left over form cycles inside the bucket, each
+    started at its smallest code.
+    """
+    sources = codes >> np.uint64(bits)
+    targets = codes & suffix_mask
+    # A simple node has one outgoing edge, so at most one edge here leaves it
+    following = np.searchsorted(sources, targets)
+    linked = simple_target & (following < len(codes))
+    linked[linked] = sources[following[linked]] == targets[linked]
+    following = np.where(linked, following, -1)
+    has_previous = np.zeros(len(codes), dtype=bool)
+    has_previous[following[linked]] = True
+
+    following = following.tolist()
+    order = []
+    offsets = [0]
+    for edge in np.flatnonzero(~has_previous).tolist():
+        while edge >= 0:
+            order.append(edge)
+            edge = following[edge]
+        offsets.append(len(order))
+
+    used = np.zeros(len(codes), dtype=bool)
+    used[order] = True
+    for first in np.flatnonzero(~used).tolist():
+        if used[first]:
+            continue
+        edge = first
+        while True:
+            order.append(edge)
+            used[edge] = True
+            edge = following[edge]
+            if edge == first:
+                break
+        offsets.append(len(order))
+    return np.asarray(order, dtype=np.int64), np.asarray(offsets, dtype=np.int64)
+
+
+def compact_buckets(kmer_runs, out_degree_run, in_degree_run, k, alphabet, tails_path):
+    """Unitig fragments of every bucket
+
+    Returns a dict of per-fragment arrays (first/last/smallest code, position
+    of the smallest code, number of edges, start/end node codes and whether
+    those nodes are simple, offset of the letters in tails_path).  The last
+    letter of every edge is appended to tails_path as an alphabet rank.
+    """
+    bits = bits_per_symbol(alphabet)
+    suffix_mask = np.uint64((1 << (bits * (k - 1))) - 1)
+    letter_mask = np.uint64((1 << bits) - 1)
+    columns = {name: [] for name in ('first', 'last', 'smallest', 'smallest_at', 'num_kmers',
+                                     'start', 'end', 'simple_start', 'simple_end', 'tail')}
+    written = 0
+    with open(tails_path, 'wb') as tails:
+        for base in kmer_runs:
+            codes = np.load(base + '.keys.npy')
+            sources = codes >> np.uint64(bits)
+            targets = codes & suffix_mask
+            simple_source = (run_values(out_degree_run, sources) == 1) & (run_values(in_degree_run, sources) == 1)
+            simple_target = (run_values(out_degree_run, targets) == 1) & (run_values(in_degree_run, targets) == 1)
+
+            order, offsets = bucket_fragments(codes, simple_target, bits, suffix_mask)
+            chained = codes[order]
+            firsts, lasts = offsets[:-1], offsets[1:] - 1
+            smallest = np.minimum.reduceat(chained, firsts)
+            lengths = np.diff(offsets)
+
+            columns['first'].append(chained[firsts])
+            columns['last'].append(chained[lasts])
+            columns['smallest'].append(smallest)
+            columns['smallest_at'].append(np.flatnonzero(chained == np.repeat(smallest, lengths)) - firsts)
+            columns['num_kmers'].append(lengths)
+            columns['start'].append(sources[order[firsts]])
+            columns['end'].append(targets[order[lasts]])
+            columns['simple_start'].append(simple_source[order[firsts]])
+            columns['simple_end'].append(simple_target[order[lasts]])
+            columns['tail'].append(written + firsts)
+
+            tails.write((chained & letter_mask).astype(np.uint8).tobytes())
+            written += len(chained)
+
+    empty = {'first': np.uint64, 'last': np.uint64, 'smallest': np.uint64, 'start': np.uint64, 'end': np.uint64,
+             'simple_start': bool, 'simple_end': bool}
+    return {name: np.concatenate(parts) if parts else np.zeros(0, dtype=empty.get(name, np.int64))
+            for name, parts in columns.items()}
+
+
+def stitch_fragments(fragments):
+    """Join fragments into unitigs at their simple end nodes
+
+    Returns (chain, offsets, rotation): unitig i is the fragments
+    chain[offsets[i]:offsets[i + 1]], and for a cycle its letters start
+    rotation[i] edges into the first fragment, at its smallest code, as
+    compact_unitigs starts cycles.
+    """
+    # The fragment leaving a simple node is the only one starting there
+    continues = np.flatnonzero(fragments['simple_start'])
+    continues = continues[np.argsort(fragments['start'][continues], kind='stable')]
+    following = np.full(len(fragments['first']), -1, dtype=np.int64)
+    ends = np.flatnonzero(fragments['simple_end'])
+    following[ends] = continues[np.searchsorted(fragments['start'][continues], fragments['end'][ends])]
+
+    following = following.tolist()
+    chain = []
+    offsets = [0]
+    rotation = []
+    for fragment in np.flatnonzero(~fragments['simple_start']).tolist():
+        while fragment >= 0:
+            chain.append(fragment)
+            fragment = following[fragment]
+        offsets.append(len(chain))
+        rotation.append(0)
+
+    # What is left are cycles of simple nodes, possibly spanning several buckets
+    used = np.zeros(len(following), dtype=bool)
+    used[chain] = True
+    smallest = fragments['smallest']
+    for first in np.flatnonzero(~used).tolist():
+        if used[first]:
+            continue
+        cycle = [first]
+        used[first] = True
+        fragment = following[first]
+        while fragment != first:
+            cycle.append(fragment)
+            used[fragment] = True
+            fragment = following[fragment]
+        turn = int(np.argmin(smallest[cycle]))
+        chain.extend(cycle[turn:] + cycle[:turn])
+        offsets.append(len(chain))
+        rotation.append(int(fragments['smallest_at'][cycle[turn]]))
+    return (np.asarray(chain, dtype=np.int64), np.asarray(offsets, dtype=np.int64),
+            np.asarray(rotation, dtype=np.int64))
+
+
+def write_contig_tables(fragments, chain, offsets, rotation, tails_path, k, alphabet,
+                        contigs_out=None, graph_out=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Stream contigs_initial.txt and contig_graph.txt, assembling each sequence from the letters on disk"""
+    bits = bits_per_symbol(alphabet)
+    tails = np.memmap(tails_path, dtype=np.uint8, mode='r') if os.path.getsize(tails_path) else np.zeros(0, np.uint8)
+    letters = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)
+
+    heads, lasts = chain[offsets[:-1]], chain[offsets[1:] - 1]
+    # Only cycles start at a simple node
+    cyclic = fragments['simple_start'][heads]
+    num_kmers = np.add.reduceat(fragments['num_kmers'][chain], offsets[:-1]) if len(chain) else np.zeros(0, np.int64)
+    first_codes = np.where(cyclic, fragments['smallest'][heads], fragments['first'][heads])
+    start_nodes = np.where(cyclic, first_codes >> np.uint64(bits), fragments['start'][heads])
+    end_nodes = np.where(cyclic, start_nodes, fragments['end'][lasts])
+    lengths = num_kmers + k - 1
+
+    # Unitigs start with distinct k-mers, so sequence order is first-code order
+    order = np.argsort(first_codes, kind='stable')
+    contig_ids = np.empty(len(order), dtype=np.int64)
+    contig_ids[order] = np.arange(len(order))
+
+    def sequence(unitig):
+        parts = [tails[fragments['tail'][f]:fragments['tail'][f] + fragments['num_kmers'][f]]
+                 for f in chain[offsets[unitig]:offsets[unitig + 1]].tolist()]
+        ranks = np.concatenate(parts)
+        if cyclic[unitig]:
+            # The start node is the k - 1 letters before the first edge, around the cycle
+            ranks = ranks[(np.arange(len(ranks) + k - 1) - k + 1 + rotation[unitig]) % len(ranks)]
+            return letters[ranks].tobytes().decode('ascii')
+        return decode_kmers(start_nodes[unitig:unitig + 1], k - 1, alphabet)[0] + letters[ranks].tobytes().decode('ascii')
+
+    if contigs_out:
+        by_length = np.lexsort((contig_ids, -lengths))
+        with open(contigs_out, 'w') as f:
+            f.write('CONTIG_ID\tLENGTH\tSTART_NODE\tEND_NODE\tNUM_KMERS\tSEQUENCE\n')
+            for start in range(0, len(by_length), block_size):
+                block = by_length[start:start + block_size]
+                start_labels = decode_kmers(start_nodes[block], k - 1, alphabet)
+                end_labels = decode_kmers(end_nodes[block], k - 1, alphabet)
+                f.writelines(f"{contig_ids[u]}\t{lengths[u]}\t{s}\t{e}\t{num_kmers[u]}\t{sequence(u)}\n"
+                             for u, s, e in zip(block.tolist(), start_labels, end_labels))
+
+    if graph_out:
+        ends = pd.DataFrame({'CONTIG_ID': contig_ids, 'node': end_nodes})
+        starts = pd.DataFrame({'OUTGOING': contig_ids, 'node': start_nodes})
+        links = ends.merge(starts, on='node')[['CONTIG_ID', 'OUTGOING']]
+        incoming = links.rename(columns={'CONTIG_ID': 'INCOMING', 'OUTGOING': 'CONTIG_ID'})
+        all_ids = np.arange(len(order))
+        incoming = format_links(incoming, 'INCOMING', all_ids)
+        outgoing = format_links(links, 'OUTGOING', all_ids)
+        with open(graph_out, 'w') as f:
+            f.write('CONTIG_ID\tINCOMING_CONTIGS\tOUTGOING_CONTIGS\tSEQUENCE\n')
+            f.writelines(f"{i}\t{incoming[i]}\t{outgoing[i]}\t{sequence(u)}\n"
+                         for i, u in enumerate(order.tolist()))
+    return len(order)
+
+
+def build_partitioned(paths, k=DEFAULT_K, m=None, num_buckets=DEFAULT_BUCKETS, alphabet=DEFAULT_ALPHABET,
+                      fmt=None, chunk_size=DEFAULT_CHUNK_SIZE, block_size=DEFAULT_BLOCK_SIZE,
+                      kmers_out='kmers_data.txt', edges_out='graph_edges.txt',
+                      contigs_out=None, graph_out=None, tmpdir=None, keep_temp=False):
+    """Run the whole disk-backed build; returns (distinct k-mers, total observations)"""
+    alphabet = normalize_alphabet(alphabet)
+    bits = bits_per_symbol(alphabet)
+    suffix_mask = np.uint64((1 << (bits * (k - 1))) - 1)
+    workdir = tempfile.mkdtemp(prefix='kmer_buckets_', dir=tmpdir)
+
+    try:
+        bucket_paths = partition_reads(paths, workdir, k, m, num_buckets, alphabet, fmt, chunk_size)
+        print(f"Partitioned reads into {num_buckets} minimizer buckets in {workdir}")
+
+        with_contigs = bool(contigs_out or graph_out)
+        kmer_runs, prefix_runs, suffix_runs, out_degree_runs, in_degree_runs = [], [], [], [], []
+        for i, path in enumerate(bucket_paths):
+            codes, counts = count_bucket(path, k, alphabet)
+            os.remove(path)
+            if len(codes) == 0:
+                continue
+            kmer_runs.append(save_run(workdir, f'kmers_{i:05d}', codes, counts))
+            prefix_runs.append(save_run(workdir, f'prefix_{i:05d}',
+                                        *sum_by_key(codes >> np.uint64(bits), counts)))
+            suffix_runs.append(save_run(workdir, f'suffix_{i:05d}',
+                                        *sum_by_key(codes & suffix_mask, counts)))
+            if with_contigs:
+                # Edges, not observations, decide which nodes are 1-in-1-out
+                ones = np.ones(len(codes), dtype=np.int64)
+                out_degree_runs.append(save_run(workdir, f'out_degree_{i:05d}',
+                                                *sum_by_key(codes >> np.uint64(bits), ones)))
+                in_degree_runs.append(save_run(workdir, f'in_degree_{i:05d}',
+                                               *sum_by_key(codes & suffix_mask, ones)))
+
+        kmer_run = merge_runs(kmer_runs, os.path.join(workdir, 'kmers'), block_size)
+        prefix_run = merge_runs(prefix_runs, os.path.join(workdir, 'prefix'), block_size)
+        suffix_run = merge_runs(suffix_runs, os.path.join(workdir, 'suffix'), block_size)
+
+        write_outputs(kmer_run, prefix_run, suffix_run, k, alphabet, kmers_out, edges_out, block_size)
+        codes, counts = load_run(kmer_run)
+        distinct, total = len(codes), int(np.sum(counts))
+        del codes, counts
+
+        if with_contigs:
+            out_degree_run = merge_runs(out_degree_runs, os.path.join(workdir, 'out_degree'), block_size)
+            in_degree_run = merge_runs(in_degree_runs, os.path.join(workdir, 'in_degree'), block_size)
+            tails_path = os.path.join(workdir, 'tails.bin')
+            fragments = compact_buckets(kmer_runs, out_degree_run, in_degree_run, k, alphabet, tails_path)
+            chain, offsets, rotation = stitch_fragments(fragments)
+            contigs = write_contig_tables(fragments, chain, offsets, rotation, tails_path, k, alphabet,
+                                          contigs_out, graph_out, block_size)
+            print(f"Compacted {len(fragments['first'])} bucket fragments into {contigs} contigs")
+    finally:
+        if keep_temp:
+            print(f"Temporary files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return distinct, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Disk-backed, minimizer-partitioned k-mer counting")
+    parser.add_argument('reads', nargs='+', help="Read files (plain text, FASTA or FASTQ)")
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="k-mer length (default: 6)")
+    parser.add_argument('-m', type=int, help="Minimizer length (default: (k+1)//2)")
+    parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS, help="Number of bucket files")
+    parser.add_argument('--alphabet', default=DEFAULT_ALPHABET)
+    parser.add_argument('--format', choices=['text', 'fasta', 'fastq'])
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Reads per partitioning chunk")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help="Rows per merge/output block")
+    parser.add_argument('--tmpdir', help="Directory for the bucket files")
+    parser.add_argument('--keep-temp', action='store_true')
+    parser.add_argument('--kmers-out', default='kmers_data.txt')
+    parser.add_argument('--edges-out', default='graph_edges.txt')
+    parser.add_argument('--contigs-out', help="Also write contigs_initial.txt here")
+    parser.add_argument('--graph-out', help="Also write contig_graph.txt here")
+    args = parser.parse_args()
+
+    for path in args.reads:
+        if not os.path.exists(path):
+            parser.error(f"File not found: {path}")
+
+    distinct, total = build_partitioned(
+        args.reads, k=args.k, m=args.m, num_buckets=args.buckets, alphabet=args.alphabet,
+        fmt=args.format, chunk_size=args.chunk_size, block_size=args.block_size,
+        kmers_out=args.kmers_out, edges_out=args.edges_out,
+        contigs_out=args.contigs_out, graph_out=args.graph_out,
+        tmpdir=args.tmpdir, keep_temp=args.keep_temp)
+
+    print(f"Unique {args.k}-mers: {distinct}")
+    print(f"Total k-mer observations: {total}")
+    for path in (args.kmers_out, args.edges_out, args.contigs_out, args.graph_out):
+        if path:
+            print(f"✓ Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Run the De Bruijn completion workflow as a DAG with content-addressed caching
+
+Replaces the manual chain fill_missing_nodes.py -> create_clean_version.py ->
+verify_debruijn.py -> final_verification.py.  Stages pass DataFrames to each
+other in memory.  Each stage's result is stored under
+.pipeline_cache/<stage>/<key>.pkl, where the key hashes the stage's code,
+parameters and the keys of its inputs (source tables are keyed by their
+SHA-256).  The code is the source of the module defining the stage function
+and of every module of this repository it imports, so editing a helper
+invalidates the stage too.  A stage whose key is already cached is skipped,
+so changing one input only recomputes the stages downstream of it; the
+report it printed when it ran is stored next to its result and printed again.
+"""
+import argparse
+import ast
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import pickle
+import sys
+import time
+
+import instrument
+from create_clean_version import nodes_only_table
+from fill_missing_nodes import fill_missing_nodes
+from final_verification import final_verification
+from table_cache import TABLES, ensure_cached, file_hash, load_table, read_meta, save_table
+from verify_debruijn import verify_debruijn
+
+CACHE_DIR = '.pipeline_cache'
+
+
+def code_sources(func):
+    """Source of the module defining func and of every local module it imports, transitively"""
+    path = os.path.abspath(inspect.getfile(inspect.unwrap(func)))
+    root = os.path.dirname(path)
+    pending = [os.path.splitext(os.path.basename(path))[0]]
+    sources = {}
+    while pending:
+        name = pending.pop()
+        path = os.path.join(root, name + '.py')
+        if name in sources or not os.path.exists(path):
+            continue
+        with open(path) as f:
+            sources[name] = f.read()
+        for node in ast.walk(ast.parse(sources[name])):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module)
+    return sources
+
+
+class Tee(io.TextIOBase):
+    """Text stream that writes to a stream and keeps a copy"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.copy = io.StringIO()
+
+    def write(self, text):
+        self.copy.write(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class Stage:
+    """One pipeline step: func(*inputs, **params), optionally exported as a table"""
+
+    def __init__(self, name, func, inputs, params=None, table=None):
+        self.name = name
+        self.func = func
+        self.inputs = inputs
+        self.params = params or {}
+        self.table = table
+
+    def key(self, input_keys):
+        """Content hash of the stage's code (with the local modules it uses), parameters and inputs"""
+        payload = json.dumps({
+            'stage': self.name,
+            'function': self.func.__qualname__,
+            'code': code_sources(self.func),
+            'params': self.params,
+            'inputs': [input_keys[name] for name in self.inputs],
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+
+STAGES = [
+    Stage('filled', fill_missing_nodes, ['contigs', 'debruijn', 'contig_graph'], table='debruijn_updated'),
+    Stage('nodes_only', nodes_only_table, ['filled'], table='debruijn_nodes'),
+    Stage('verify', verify_debruijn, ['filled']),
+    Stage('final', final_verification, ['nodes_only', 'contig_graph']),
+]
+
+
+def source_key(name):
+    """SHA-256 of a source table, reusing the hash stored by the table cache"""
+    source = TABLES[name][0]
+    ensure_cached(name)
+    meta = read_meta(name)
+    if meta.get('stamp') and meta.get('sha256'):
+        return meta['sha256']
+    return file_hash(source)
+
+
+class Pipeline:
+    """Runs stages in order, loading cached results only when something needs them"""
+
+    def __init__(self, stages=STAGES, cache_dir=CACHE_DIR, force=False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.cache_dir = cache_dir
+        self.force = force
+        self.keys = {}
+        self.values = {}
+
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self.stages and name not in TABLES:
+                    raise ValueError(f"Stage {stage.name}: unknown input {name}")
+                if name in self.stages and self.order.index(name) > self.order.index(stage.name):
+                    raise ValueError(f"Stage {stage.name} runs before its input {name}")
+
+    def result_path(self, name):
+        return os.path.join(self.cache_dir, name, self.keys[name] + '.pkl')
+
+    def report_path(self, name):
+        return os.path.join(self.cache_dir, name, self.keys[name] + '.log')
+
+    def key(self, name):
+        if name not in self.keys:
+            if name in self.stages:
+                stage = self.stages[name]
+                self.keys[name] = stage.key({i: self.key(i) for i in stage.inputs})
+            else:
+                self.keys[name] = source_key(name)
+        return self.keys[name]
+
+    def get(self, name):
+        """Value of a source table or stage, computing it only if it is not cached"""
+        if name in self.values:
+            return self.values[name]
+        if name not in self.stages:
+            self.values[name] = load_table(name)
+            return self.values[name]
+
+        path = self.result_path(name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.values[name] = pickle.load(f)
+            return self.values[name]
+
+        stage = self.stages[name]
+        inputs = [self.get(i) for i in stage.inputs]
+        report = Tee(sys.stdout)
+        with instrument.stage(name), contextlib.redirect_stdout(report):
+            value = stage.func(*inputs, **stage.params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(self.report_path(name), 'w') as f:
+            f.write(report.copy.getvalue())
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.values[name] = value
+        return value
+
+    def run(self, targets=None, export=False):
+        """Bring the requested stages (all by default) up to date; returns {stage: status}"""
+        targets = targets or self.order
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name in self.stages and name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].inputs)
+
+        status = {}
+        for name in self.order:
+            if name not in needed:
+                continue
+            self.key(name)
+            cached = os.path.exists(self.result_path(name)) and not self.force
+            if self.force and os.path.exists(self.result_path(name)):
+                os.remove(self.result_path(name))
+
+            start = time.perf_counter()
+            if not cached:
+                print(f"\n>>> Running stage: {name}")
+                self.get(name)
+            elif os.path.exists(self.report_path(name)):
+                with open(self.report_path(name)) as f:
+                    report = f.read()
+                if report:
+                    print(f"\n>>> Cached stage: {name}")
+                    print(report, end='')
+            status[name] = ('cached' if cached else 'computed', time.perf_counter() - start)
+
+            table = self.stages[name].table
+            if export and table:
+                save_table(table, self.get(name), export=True)
+        return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the De Bruijn completion pipeline")
+    parser.add_argument('stages', nargs='*', help="Stages to bring up to date (default: all)")
+    parser.add_argument('--force', action='store_true', help="Recompute even if results are cached")
+    parser.add_argument('--export', action='store_true', help="Also write the Excel tables")
+    parser.add_argument('--trace', help="Write a JSON trace of stage times, counters and memory to this file")
+    parser.add_argument('--profile-dir', help="Dump a cProfile file per stage into this directory")
+    args = parser.parse_args()
+    if args.trace or args.profile_dir:
+        instrument.enable(args.trace, args.profile_dir)
+
+    pipeline = Pipeline(force=args.force)
+    unknown = [name for name in args.stages if name not in pipeline.stages]
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(unknown)} (choose from {', '.join(pipeline.order)})")
+
+    status = pipeline.run(args.stages, export=args.export)
+
+    print("\n" + "="*80)
+    print("PIPELINE SUMMARY")
+    print("="*80)
+    for name, (state, seconds) in status.items():
+        mark = '✓' if state == 'computed' else '•'
+        print(f"  {mark} {name}: {state} ({seconds:.2f}s) key={pipeline.keys[name][:12]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Contig and path sequences stored once, in one contiguous byte arena
+
+contig_graph.txt repeats every contig sequence and assembled_paths.txt spells
+out every path, although a path is just its contigs joined with k-1 letter
+overlaps.  Here each distinct contig sequence is stored once in a uint8
+arena, contigs are (offset, length) pairs into it and paths are CSR arrays of
+contig IDs.  Path strings are only built when asked for.
+
+The arena is saved in the graph store file format (graph_store.write_arrays),
+so loading maps it without copying.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrument
+from graph_store import csr_from_lists, map_arrays, read_paths, write_arrays
+
+DEFAULT_K = 6
+DEFAULT_ARENA = 'sequences.arena'
+KIND = 'sequence_arena'
+
+
+class SequenceArena:
+    """Deduplicated contig sequences plus paths as contig ID lists
+
+    Contig i is arena[contig_offsets[i]:contig_offsets[i] + contig_lengths[i]];
+    path j is path_contigs[path_offsets[j]:path_offsets[j + 1]].
+    """
+
+    ARRAYS = ['arena', 'contig_offsets', 'contig_lengths', 'path_offsets', 'path_contigs']
+
+    def __init__(self, k, arena, contig_offsets, contig_lengths, path_offsets, path_contigs):
+        self.k = k
+        self.arena = arena
+        self.contig_offsets = contig_offsets
+        self.contig_lengths = contig_lengths
+        self.path_offsets = path_offsets
+        self.path_contigs = path_contigs
+
+    @classmethod
+    def from_sequences(cls, sequences, paths=(), k=DEFAULT_K):
+        """Arena for contig sequences indexed by CONTIG_ID and paths given as CONTIG_ID lists"""
+        slots = {}
+        chunks = []
+        offsets = np.zeros(len(sequences), dtype=np.int64)
+        position = 0
+        for contig, sequence in enumerate(sequences):
+            if sequence not in slots:
+                slots[sequence] = position
+                chunks.append(sequence)
+                position += len(sequence)
+            offsets[contig] = slots[sequence]
+
+        arena = np.frombuffer(''.join(chunks).encode('ascii'), dtype=np.uint8)
+        lengths = np.array([len(s) for s in sequences], dtype=np.int64)
+        path_offsets, path_contigs = csr_from_lists(paths)
+        return cls(k, arena, offsets, lengths, path_offsets, path_contigs.astype(np.int32))
+
+    @classmethod
+    def load(cls, path=DEFAULT_ARENA):
+        header, arrays = map_arrays(path)
+        if header.get('kind') != KIND:
+            raise ValueError(f"{path} is not a sequence arena")
+        return cls(header['k'], *(arrays[name] for name in cls.ARRAYS))
+
+    def save(self, path=DEFAULT_ARENA):
+        write_arrays(path, {'kind': KIND, 'k': self.k}, {name: getattr(self, name) for name in self.ARRAYS})
+
+    @property
+    def num_contigs(self):
+        return len(self.contig_lengths)
+
+    @property
+    def num_paths(self):
+        return len(self.path_offsets) - 1
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def contig_sequence(self, contig):
+        start = self.contig_offsets[contig]
+        return self.arena[start:start + self.contig_lengths[contig]].tobytes().decode('ascii')
+
+    def path(self, index):
+        """Contig IDs along path `index`"""
+        return self.path_contigs[self.path_offsets[index]:self.path_offsets[index + 1]]
+
+    def path_lengths(self):
+        """Letters in every path, without building any string"""
+        num_contigs = np.diff(self.path_offsets)
+        starts = self.path_offsets[:-1]
+        totals = np.zeros(self.num_paths, dtype=np.int64)
+        nonempty = num_contigs > 0
+        if nonempty.any():
+            totals[nonempty] = np.add.reduceat(self.contig_lengths[self.path_contigs], starts[nonempty])
+        return totals - np.maximum(num_contigs - 1, 0) * (self.k - 1)
+
+    def path_sequence(self, index):
+        """Path string: the first contig, then each next contig minus its k-1 letter overlap"""
+        contigs = self.path(index).tolist()
+        if not contigs:
+            return ''
+        parts = [self.contig_sequence(contigs[0])]
+        parts.extend(self.contig_sequence(c)[self.k - 1:] for c in contigs[1:])
+        return ''.join(parts)
+
+    def iter_path_sequences(self):
+        for index in range(self.num_paths):
+            yield self.path_sequence(index)
+
+    def paths_table(self):
+        """The assembled_paths.txt table as a DataFrame (holds every path sequence at once)"""
+        return pd.DataFrame({
+            'RANK': np.arange(1, self.num_paths + 1),
+            'LENGTH': self.path_lengths(),
+            'NUM_CONTIGS': np.diff(self.path_offsets),
+            'PATH': ['->'.join(map(str, self.path(i).tolist())) for i in range(self.num_paths)],
+            'SEQUENCE': list(self.iter_path_sequences()),
+        })
+
+    def write_paths_table(self, out_path):
+        """Write assembled_paths.txt one row at a time, so only one path sequence is in memory"""
+        lengths = self.path_lengths().tolist()
+        num_contigs = np.diff(self.path_offsets).tolist()
+        with open(out_path, 'w') as f:
+            f.write('RANK\tLENGTH\tNUM_CONTIGS\tPATH\tSEQUENCE\n')
+            for index, sequence in enumerate(self.iter_path_sequences()):
+                path = '->'.join(map(str, self.path(index).tolist()))
+                f.write(f"{index + 1}\t{lengths[index]}\t{num_contigs[index]}\t{path}\t{sequence}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store contig and path sequences once in a byte arena")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Build an arena from contig_graph.txt and assembled_paths.txt")
+    build.add_argument('--contig-graph', default='contig_graph.txt')
+    build.add_argument('--paths', default='assembled_paths.txt')
+    build.add_argument('-k', type=int, default=DEFAULT_K)
+    build.add_argument('--out', default=DEFAULT_ARENA)
+
+    export = sub.add_parser('export', help="Write assembled_paths.txt from an arena")
+    export.add_argument('arena', nargs='?', default=DEFAULT_ARENA)
+    export.add_argument('--out', default='assembled_paths.txt')
+
+    show = sub.add_parser('show', help="Print one path's sequence")
+    show.add_argument('rank', type=int)
+    show.add_argument('--arena', default=DEFAULT_ARENA)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        contig_graph = pd.read_csv(args.contig_graph, sep='\t').sort_values('CONTIG_ID')
+        sequences = contig_graph['SEQUENCE'].astype(str).tolist()
+        paths = read_paths(args.paths)
+        arena = SequenceArena.from_sequences(sequences, paths, args.k)
+        arena.save(args.out)
+
+        text_bytes = sum(len(s) for s in sequences)
+        text_bytes += int(pd.read_csv(args.paths, sep='\t')['SEQUENCE'].str.len().sum())
+        print(f"✓ Wrote {args.out} ({os.path.getsize(args.out):,} bytes)")
+        print(f"  {arena.num_contigs} contigs, {arena.num_paths} paths")
+        print(f"  Sequence letters in the text tables: {text_bytes:,}")
+        print(f"  Arena: {len(arena.arena):,} letters, {arena.nbytes():,} bytes with offsets and paths")
+    elif args.command == 'export':
+        arena = SequenceArena.load(args.arena)
+        with instrument.stage('export'):
+            arena.write_paths_table(args.out)
+        print(f"✓ Wrote {arena.num_paths} paths to {args.out}")
+    else:
+        arena = SequenceArena.load(args.arena)
+        if not 1 <= args.rank <= arena.num_paths:
+            parser.error(f"rank must be between 1 and {arena.num_paths}")
+        print(arena.path_sequence(args.rank - 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Simplify the De Bruijn graph before contig generation
+
+Three steps, each rebuilding the array graph from the edges it keeps:
+
+    1. Low-abundance filter: drop k-mers whose COUNT is below a threshold,
+       chosen automatically from the first valley of the count histogram.
+    2. Tip clipping: drop short dead-end unitigs hanging off a branch node.
+    3. Bubble collapsing: of unitigs sharing both end nodes, keep only the
+       one with the highest mean COUNT.
+
+Writes the surviving edges as graph_edges_simplified.txt (same schema as
+graph_edges.txt) and reports the nodes, edges and unitig paths each step
+removed.
+"""
+import argparse
+
+import numpy as np
+
+from compact_unitigs import find_unitigs
+from count_kmers import write_graph_edges
+from debruijn_graph import DeBruijnGraph
+
+DEFAULT_MAX_TIP = 6
+DEFAULT_MAX_BUBBLE = 12
+
+
+def auto_threshold(counts):
+    """Minimum COUNT to keep, from the count histogram
+
+    Error k-mers form a peak at count 1 that falls to a valley before the
+    coverage peak; the valley is the threshold.  If the histogram rises from
+    the start (no error peak), nothing is filtered.
+    """
+    hist = np.bincount(np.asarray(counts, dtype=np.int64))
+    for count in range(1, len(hist) - 1):
+        if hist[count] <= hist[count + 1]:
+            return count
+    return 1
+
+
+def subgraph(graph, keep):
+    """Graph made of the edges where keep is True"""
+    return DeBruijnGraph(graph.edge_codes[keep], graph.counts[keep], graph.k, graph.alphabet)
+
+
+def filter_low_abundance(graph, min_count):
+    """Mask of edges whose count is at least min_count"""
+    return graph.counts >= min_count
+
+
+def path_edges(unitigs, paths):
+    """Flat array of the edges on the given unitig paths"""
+    offsets = unitigs.offsets
+    if len(paths) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([unitigs.edges[offsets[p]:offsets[p + 1]] for p in paths])
+
+
+def tip_paths(graph, unitigs, max_length):
+    """Unitigs of at most max_length k-mers that dead-end next to a branch
+
+    A dead end leaves a node that has other outgoing edges and stops at a node
+    with none; a dead start is the mirror image.  Isolated paths are kept.
+    """
+    starts, ends = unitigs.start_nodes, unitigs.end_nodes
+    short = (unitigs.num_kmers <= max_length) & (starts != ends)
+    dead_end = (graph.out_degree[ends] == 0) & (graph.out_degree[starts] > 1)
+    dead_start = (graph.in_degree[starts] == 0) & (graph.in_degree[ends] > 1)
+    return np.flatnonzero(short & (dead_end | dead_start))
+
+
+def clip_tips(graph, max_length):
+    """Repeatedly remove tips until none are left; returns the clipped graph"""
+    while graph.num_edges:
+        unitigs = find_unitigs(graph)
+        tips = tip_paths(graph, unitigs, max_length)
+        if len(tips) == 0:
+            break
+        keep = np.ones(graph.num_edges, dtype=bool)
+        keep[path_edges(unitigs, tips)] = False
+        graph = subgraph(graph, keep)
+    return graph
+
+
+def bubble_losers(graph, unitigs, max_length):
+    """Unitigs that lose to a higher-coverage unitig between the same two nodes"""
+    lengths = unitigs.num_kmers
+    path_ids = np.repeat(np.arange(len(unitigs)), lengths)
+    coverage = np.bincount(path_ids, weights=graph.counts[unitigs.edges], minlength=len(unitigs)) / lengths
+
+    candidates = np.flatnonzero((lengths <= max_length) & (unitigs.start_nodes != unitigs.end_nodes))
+    # Group by (start, end), best coverage first; ties keep the lowest path index
+    order = np.lexsort((candidates, -coverage[candidates],
+                        unitigs.end_nodes[candidates], unitigs.start_nodes[candidates]))
+    ordered = candidates[order]
+    pair_start = np.ones(len(ordered), dtype=bool)
+    pair_start[1:] = ((unitigs.start_nodes[ordered[1:]] != unitigs.start_nodes[ordered[:-1]]) |
+                      (unitigs.end_nodes[ordered[1:]] != unitigs.end_nodes[ordered[:-1]]))
+    return ordered[~pair_start]
+
+
+def collapse_bubbles(graph, max_length):
+    """Repeatedly collapse bubbles until none are left; returns the new graph"""
+    while graph.num_edges:
+        unitigs = find_unitigs(graph)
+        losers = bubble_losers(graph, unitigs, max_length)
+        if len(losers) == 0:
+            break
+        keep = np.ones(graph.num_edges, dtype=bool)
+        keep[path_edges(unitigs, losers)] = False
+        graph = subgraph(graph, keep)
+    return graph
+
+
+def graph_size(graph):
+    return {'nodes': graph.num_nodes, 'edges': graph.num_edges, 'paths': len(find_unitigs(graph))}
+
+
+def simplify(graph, min_count=None, max_tip=DEFAULT_MAX_TIP, max_bubble=DEFAULT_MAX_BUBBLE):
+    """Run all three steps; returns (graph, report)
+
+    report is a list of (step, size before, size after) with sizes as
+    {'nodes', 'edges', 'paths'} dicts, paths being unitigs.
+    """
+    if min_count is None:
+        min_count = auto_threshold(graph.counts)
+
+    steps = [
+        (f'count >= {min_count}', lambda g: subgraph(g, filter_low_abundance(g, min_count))),
+        (f'tips <= {max_tip} k-mers', lambda g: clip_tips(g, max_tip)),
+        (f'bubbles <= {max_bubble} k-mers', lambda g: collapse_bubbles(g, max_bubble)),
+    ]
+    report = []
+    before = graph_size(graph)
+    for name, step in steps:
+        graph = step(graph)
+        after = graph_size(graph)
+        report.append((name, before, after))
+        before = after
+    return graph, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter, clip tips and collapse bubbles in the De Bruijn graph")
+    parser.add_argument('--edges', default='graph_edges.txt')
+    parser.add_argument('--out', default='graph_edges_simplified.txt')
+    parser.add_argument('--min-count', type=int,
+                        help="Drop k-mers with a lower COUNT (default: first valley of the count histogram)")
+    parser.add_argument('--max-tip', type=int, default=DEFAULT_MAX_TIP, help="Longest tip to clip, in k-mers")
+    parser.add_argument('--max-bubble', type=int, default=DEFAULT_MAX_BUBBLE,
+                        help="Longest bubble branch to collapse, in k-mers")
+    args = parser.parse_args()
+
+    graph = DeBruijnGraph.from_edges_file(args.edges)
+    print(f"Graph loaded: {graph.num_nodes} nodes, {graph.num_edges} edges")
+
+    simplified, report = simplify(graph, args.min_count, args.max_tip, args.max_bubble)
+
+    print("\n" + "="*80)
+    print("GRAPH SIMPLIFICATION")
+    print("="*80)
+    print(f"{'step':<24}{'nodes removed':>15}{'edges removed':>15}{'paths removed':>15}")
+    for name, before, after in report:
+        removed = [before[key] - after[key] for key in ('nodes', 'edges', 'paths')]
+        print(f"{name:<24}" + ''.join(f"{n:>15}" for n in removed))
+
+    final = report[-1][2]
+    initial = report[0][1]
+    print(f"\nNodes: {initial['nodes']} -> {final['nodes']}")
+    print(f"Edges: {initial['edges']} -> {final['edges']}")
+    print(f"Unitig paths: {initial['paths']} -> {final['paths']}")
+
+    write_graph_edges(args.out, simplified.edge_codes, simplified.counts, simplified.k, simplified.alphabet)
+    print(f"\n✓ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
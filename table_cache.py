@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Shared loader for the pipeline tables with a binary columnar cache
+
+Each table (k-mers, graph edges, contigs, contig graph and the De Bruijn node
+tables) is parsed from its text/Excel source once and stored under
+.table_cache/<name>/ as one .npy file per column, which later runs open with
+memory-mapping.  A cache entry is rebuilt when its source's size/mtime change
+and its SHA-256 no longer matches, and cannot be used once its source is
+gone.  Adjacency columns such as OUTGOING_CONTIGS ("57,58") are stored as
+integer CSR arrays, not strings.  Sources are only written on request through
+export_table(), in their own format: tab-separated text for the .txt tables
+and Excel for the node tables.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import instrument
+
+CACHE_DIR = '.table_cache'
+CACHE_VERSION = 2
+DEBRUIJN_COLUMNS = ['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']
+DEBRUIJN_HEADER = ['kmers', 'incoming edge', 'node number', 'merged node', 'outgoing edge']
+
+
+def read_kmers_txt(path):
+    return pd.read_csv(path, sep='\t', header=None, names=['KMER', 'COUNT'])
+
+
+def read_tsv(path):
+    return pd.read_csv(path, sep='\t')
+
+
+def read_debruijn_excel(path):
+    """Read a De Bruijn node table written by hand or by fill_missing_nodes.py
+
+    Handles the title row, the embedded 'kmers | incoming edge | ...' header
+    row and the optional leading index column.  A node number given on
+    several rows keeps one of them: the last with its outgoing edges filled
+    in, or the last one if none is.
+    """
+    raw = pd.read_excel(path, header=None)
+    is_header = raw.apply(lambda row: row.astype(str).str.strip().eq('kmers').any(), axis=1)
+    header_rows = np.flatnonzero(is_header.to_numpy())
+    if len(header_rows) == 0:
+        raise ValueError(f"{path}: no 'kmers' header row found")
+    header = raw.iloc[header_rows[0]].astype(str).str.strip()
+
+    table = raw.iloc[header_rows[0] + 1:].copy()
+    first = int(np.flatnonzero(header.eq('kmers').to_numpy())[0])
+    table = table.iloc[:, first:first + len(DEBRUIJN_COLUMNS)]
+    table.columns = DEBRUIJN_COLUMNS
+    table['node_number'] = pd.to_numeric(table['node_number'], errors='coerce')
+
+    numbered = table[table['node_number'].notna()]
+    ranked = numbered.assign(filled=numbered['outgoing_edge'].notna()).sort_values('filled', kind='stable')
+    duplicates = ranked.index[ranked.duplicated('node_number', keep='last')]
+    return table.drop(duplicates).reset_index(drop=True)
+
+
+# name -> (source file, reader, adjacency columns)
+TABLES = {
+    'kmers': ('kmers_data.txt', read_kmers_txt, []),
+    'edges': ('graph_edges.txt', read_tsv, []),
+    'contigs': ('contigs_initial.txt', read_tsv, []),
+    'contig_graph': ('contig_graph.txt', read_tsv, ['INCOMING_CONTIGS', 'OUTGOING_CONTIGS']),
+    'paths': ('assembled_paths.txt', read_tsv, []),
+    'debruijn': ('debruijn_graph_complete.xlsx', read_debruijn_excel, ['incoming_edge', 'outgoing_edge']),
+    'debruijn_updated': ('debruijn_graph_complete_updated.xlsx', read_debruijn_excel,
+                         ['incoming_edge', 'outgoing_edge']),
+    'debruijn_nodes': ('debruijn_graph_nodes_only.xlsx', read_debruijn_excel,
+                       ['incoming_edge', 'outgoing_edge']),
+}
+
+
+def parse_edge_list(value):
+    """Parse an adjacency cell ('57,58', 57, 57.0, list or missing) into a list of ints"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [int(v) for v in value]
+    if is_missing(value):
+        return []
+    return [int(float(v)) for v in str(value).split(',') if v.strip()]
+
+
+def is_missing(value):
+    """True for an empty cell (None/NaN); adjacency lists are never missing"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return False
+    return value is None or pd.isna(value)
+
+
+def format_edge_list(nodes):
+    """Render an adjacency list the way the text/Excel files store it ('57,58')"""
+    return ','.join(str(int(n)) for n in parse_edge_list(nodes))
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def cache_path(name, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, name)
+
+
+def read_meta(name, cache_dir=CACHE_DIR):
+    meta_path = os.path.join(cache_path(name, cache_dir), 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def is_fresh(name, source, cache_dir=CACHE_DIR):
+    """True when the cache entry matches the source file (by stamp, then by hash)"""
+    meta = read_meta(name, cache_dir)
+    if meta is None or meta.get('version') != CACHE_VERSION:
+        return False
+    if not os.path.exists(source):
+        # A table saved from memory needs no source; one parsed from a file is stale without it
+        return 'saved_ns' in meta
+    stamp = source_stamp(source)
+    if meta.get('stamp') == stamp:
+        return True
+    if 'saved_ns' in meta:
+        # Saved from memory without an export: fresh unless the source was edited since
+        return stamp['mtime_ns'] <= meta['saved_ns']
+    if meta.get('sha256') != file_hash(source):
+        return False
+
+    # Same content, new mtime (e.g. after a checkout): refresh the stamp only
+    meta['stamp'] = stamp
+    with open(os.path.join(cache_path(name, cache_dir), 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return True
+
+
+def write_cache(name, df, source=None, adjacency=(), cache_dir=CACHE_DIR):
+    """Store a DataFrame as one .npy file per column"""
+    target = cache_path(name, cache_dir)
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    for column in df.columns:
+        values = df[column]
+        # Series.isna() is elementwise and treats list cells as present, like is_missing
+        mask = values.isna().to_numpy(dtype=bool)
+        base = os.path.join(tmp, column)
+
+        if column in adjacency:
+            lists = [parse_edge_list(v) for v in values]
+            offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+            np.cumsum([len(nodes) for nodes in lists], out=offsets[1:])
+            flat = np.fromiter((n for nodes in lists for n in nodes), dtype=np.int64, count=int(offsets[-1]))
+            np.save(base + '.offsets.npy', offsets)
+            np.save(base + '.values.npy', flat)
+            kind = 'adjacency'
+        elif pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+            array = values.to_numpy()
+            kind = 'int' if pd.api.types.is_integer_dtype(values) else 'float'
+            np.save(base + '.npy', array.astype(np.int64 if kind == 'int' else np.float64))
+        else:
+            strings = values.where(~mask, '').astype(str).to_numpy()
+            width = max((len(s) for s in strings), default=1) or 1
+            np.save(base + '.npy', strings.astype(f'U{width}'))
+            kind = 'str'
+
+        np.save(base + '.isna.npy', mask)
+        columns.append({'name': column, 'kind': kind})
+
+    meta = {'version': CACHE_VERSION, 'rows': len(df), 'columns': columns}
+    if source is None:
+        meta['saved_ns'] = time.time_ns()
+    elif os.path.exists(source):
+        meta['source'] = source
+        meta['stamp'] = source_stamp(source)
+        meta['sha256'] = file_hash(source)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+
+def load_arrays(name, cache_dir=CACHE_DIR, refresh=True):
+    """Memory-mapped column arrays of a table (adjacency columns as (offsets, values))"""
+    if refresh:
+        ensure_cached(name, cache_dir)
+    meta = read_meta(name, cache_dir)
+    base = cache_path(name, cache_dir)
+
+    arrays = {}
+    for column in meta['columns']:
+        path = os.path.join(base, column['name'])
+        if column['kind'] == 'adjacency':
+            arrays[column['name']] = (np.load(path + '.offsets.npy', mmap_mode='r'),
+                                      np.load(path + '.values.npy', mmap_mode='r'))
+        else:
+            arrays[column['name']] = np.load(path + '.npy', mmap_mode='r')
+    return arrays
+
+
+def ensure_cached(name, cache_dir=CACHE_DIR):
+    """Parse the table's source into the cache unless the cache is already fresh"""
+    source, reader, adjacency = TABLES[name]
+    if is_fresh(name, source, cache_dir):
+        return False
+    if not os.path.exists(source):
+        raise FileNotFoundError(source)
+    write_cache(name, reader(source), source, adjacency, cache_dir)
+    return True
+
+
+def load_table(name, cache_dir=CACHE_DIR):
+    """Load a table as a DataFrame, parsing its source only when the cache is stale
+
+    Adjacency columns hold lists of ints (NaN where the source cell was empty
+    and never filled in).
+    """
+    ensure_cached(name, cache_dir)
+    meta = read_meta(name, cache_dir)
+    base = cache_path(name, cache_dir)
+
+    data = {}
+    for column in meta['columns']:
+        path = os.path.join(base, column['name'])
+        mask = np.load(path + '.isna.npy')
+        if column['kind'] == 'adjacency':
+            offsets = np.load(path + '.offsets.npy', mmap_mode='r')
+            values = np.load(path + '.values.npy', mmap_mode='r').tolist()
+            bounds = offsets.tolist()
+            data[column['name']] = [np.nan if mask[i] else values[bounds[i]:bounds[i + 1]]
+                                    for i in range(meta['rows'])]
+        elif column['kind'] == 'str':
+            strings = np.load(path + '.npy', mmap_mode='r').astype(object)
+            strings[mask] = np.nan
+            data[column['name']] = strings
+        else:
+            data[column['name']] = np.load(path + '.npy', mmap_mode='r')
+    return pd.DataFrame(data)
+
+
+def save_table(name, df, cache_dir=CACHE_DIR, export=False):
+    """Store a table produced in memory; optionally also write its Excel/text source"""
+    source, _, adjacency = TABLES[name]
+    if export:
+        export_table(name, df, source)
+    write_cache(name, df, source if export else None, adjacency, cache_dir)
+
+
+def export_table(name, df, path):
+    """Write a table in its source format: Excel for .xlsx, tab-separated text otherwise"""
+    if path.endswith('.xlsx'):
+        export_excel(name, df, path)
+    else:
+        export_text(name, df, path)
+
+
+def render_adjacency(name, df):
+    """Copy of df with adjacency lists rendered back to '57,58' strings"""
+    _, _, adjacency = TABLES[name]
+    out = df.copy()
+    for column in adjacency:
+        out[column] = [v if not isinstance(v, (list, tuple, np.ndarray)) else format_edge_list(v)
+                       for v in out[column]]
+    return out
+
+
+def display_view(name, df):
+    """Copy of df for printing: adjacency lists as '57,58', whole-number float columns as integers"""
+    out = render_adjacency(name, df)
+    for column in out.columns:
+        values = out[column]
+        if pd.api.types.is_float_dtype(values) and (values.dropna() % 1 == 0).all():
+            out[column] = values.astype('Int64')
+    return out
+
+
+@instrument.timed('export')
+def export_text(name, df, path):
+    """Write a table as tab-separated text in the layout its reader expects"""
+    instrument.count('rows_written', len(df))
+    # kmers_data.txt has no header row
+    render_adjacency(name, df).to_csv(path, sep='\t', index=False, header=name != 'kmers')
+
+
+@instrument.timed('export')
+def export_excel(name, df, path):
+    """Write a table to Excel, rendering adjacency lists back to '57,58' strings"""
+    instrument.count('rows_written', len(df))
+    out = render_adjacency(name, df)
+
+    if name.startswith('debruijn'):
+        # Node tables keep their embedded header row
+        header = pd.DataFrame([DEBRUIJN_HEADER], columns=DEBRUIJN_COLUMNS)
+        pd.concat([header, out[DEBRUIJN_COLUMNS]], ignore_index=True).to_excel(
+            path, index=False, header=False)
+    else:
+        out.to_excel(path, index=False, engine='openpyxl')
+
+
+def main():
+    print("Refreshing table cache...")
+    for name, (source, _, _) in TABLES.items():
+        if not os.path.exists(source):
+            print(f"  - {name}: {source} not found, skipped")
+            continue
+        rebuilt = ensure_cached(name)
+        meta = read_meta(name)
+        print(f"  ✓ {name}: {meta['rows']} rows ({'rebuilt' if rebuilt else 'up to date'})")
+
+
+if __name__ == "__main__":
+    main()
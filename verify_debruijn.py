@@ -2,46 +2,94 @@
 """
 Verify the completed De Bruijn graph
 """
-import pandas as pd
-
-# Read the updated file
-df = pd.read_excel('debruijn_graph_complete_updated.xlsx')
-
-# Skip header row
-df = df.iloc[1:].copy()
-df.columns = ['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']
-
-print("Updated De Bruijn Graph Summary")
-print("="*80)
-
-# Count filled vs empty
-total_rows = len(df)
-filled_nodes = df[df['node_number'].notna()]
-empty_nodes = df[df['node_number'].isna()]
-
-print(f"Total kmers: {total_rows}")
-print(f"Filled nodes: {len(filled_nodes)}")
-print(f"Empty nodes: {len(empty_nodes)}")
-
-# Show filled nodes
-print("\nFilled Nodes:")
-print(filled_nodes[['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']].head(20))
-
-if len(empty_nodes) > 0:
-    print("\nEmpty nodes (first 10):")
-    print(empty_nodes[['kmers']].head(10))
-else:
-    print("\nAll nodes are filled!")
-
-# Check for duplicate node numbers
-node_numbers = filled_nodes['node_number'].dropna()
-duplicates = node_numbers[node_numbers.duplicated()]
-if len(duplicates) > 0:
-    print(f"\nWARNING: Found {len(duplicates)} duplicate node numbers")
-    print(duplicates)
-else:
-    print("\nNo duplicate node numbers found!")
-
-# Show node number range
-print(f"\nNode numbers range: {int(node_numbers.min())} to {int(node_numbers.max())}")
-print(f"Total unique nodes: {len(node_numbers.unique())}")
+import argparse
+import os
+
+import numpy as np
+
+import instrument
+from graph_store import open_store
+from table_cache import display_view, load_table
+
+
+@instrument.timed('verify_debruijn')
+def verify_debruijn(df):
+    """Print a summary of the updated De Bruijn table and return its key counts"""
+    print("Updated De Bruijn Graph Summary")
+    print("="*80)
+
+    # Count filled vs empty
+    total_rows = len(df)
+    instrument.count('rows_scanned', total_rows)
+    filled_nodes = df[df['node_number'].notna()]
+    empty_nodes = df[df['node_number'].isna()]
+
+    print(f"Total kmers: {total_rows}")
+    print(f"Filled nodes: {len(filled_nodes)}")
+    print(f"Empty nodes: {len(empty_nodes)}")
+
+    # Show filled nodes
+    print("\nFilled Nodes:")
+    sample = display_view('debruijn_updated', filled_nodes.head(20))
+    print(sample[['kmers', 'incoming_edge', 'node_number', 'merged_node', 'outgoing_edge']])
+
+    if len(empty_nodes) > 0:
+        print("\nEmpty nodes (first 10):")
+        print(empty_nodes[['kmers']].head(10))
+    else:
+        print("\nAll nodes are filled!")
+
+    # Check for duplicate node numbers
+    node_numbers = filled_nodes['node_number'].dropna()
+    duplicates = node_numbers[node_numbers.duplicated()]
+    if len(duplicates) > 0:
+        print(f"\nWARNING: Found {len(duplicates)} duplicate node numbers")
+        print(duplicates)
+    else:
+        print("\nNo duplicate node numbers found!")
+
+    # Show node number range
+    print(f"\nNode numbers range: {int(node_numbers.min())} to {int(node_numbers.max())}")
+    print(f"Total unique nodes: {len(node_numbers.unique())}")
+
+    return {
+        'total_rows': total_rows,
+        'filled_nodes': len(filled_nodes),
+        'empty_nodes': len(empty_nodes),
+        'duplicate_node_numbers': len(duplicates),
+    }
+
+
+def check_against_contigs(df, contig_ids, source):
+    """Count node numbers that have no contig among contig_ids (read from source)"""
+    node_numbers = df['node_number'].dropna().to_numpy(dtype=np.int64)
+    unknown = np.unique(node_numbers[~np.isin(node_numbers, contig_ids)])
+    if len(unknown) > 0:
+        print(f"\nWARNING: {len(unknown)} node numbers have no contig in {source}")
+        print(unknown[:20].tolist())
+    else:
+        print(f"\nAll node numbers match a contig in {source} ({len(contig_ids)} contigs)")
+    return len(unknown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the completed De Bruijn table")
+    parser.add_argument('--graph-store', help="Also check node numbers against this graph store's contigs")
+    args = parser.parse_args()
+    if args.graph_store and not os.path.exists(args.graph_store):
+        parser.error(f"graph store not found: {args.graph_store}")
+
+    # Read the updated file
+    df = load_table('debruijn_updated')
+    verify_debruijn(df)
+    if args.graph_store:
+        # A store built from older tables falls back to contig_graph.txt
+        store = open_store(args.graph_store, source='contig_graph.txt')
+        if store is None:
+            check_against_contigs(df, load_table('contig_graph')['CONTIG_ID'].to_numpy(), 'contig_graph.txt')
+        else:
+            check_against_contigs(df, store.contig_ids, store.path)
+
+
+if __name__ == "__main__":
+    main()